@@ -72,21 +72,28 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'lab.middleware.PerfiladoMiddleware',   # primero: mide sesión, auth, CSRF y request.lab (inactivo salvo PERFILADO_ACTIVO)
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'lab.middleware.LaboratorioMiddleware',  # request.lab (requiere sesión y usuario)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Perfilado por petición: header Server-Timing + /admin/perfilado/ (buffer en memoria por proceso)
+PERFILADO_ACTIVO = env.bool('PERFILADO_ACTIVO', default=False)
+PERFILADO_BUFFER = env.int('PERFILADO_BUFFER', default=500)
+
 ROOT_URLCONF = 'evaluat.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el render cuando el perfilado está activo
+        'BACKEND': 'lab.utils.perfilado.PlantillasPerfiladas',
         'DIRS': [os.path.join(BASE_DIR, 'lab', 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -106,10 +113,27 @@ WSGI_APPLICATION = 'evaluat.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# PRAGMAs aplicados a cada conexión SQLite (init_command). WAL permite lecturas concurrentes
+# con un escritor; busy_timeout hace esperar en vez de fallar con "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',                                          # seguro con WAL
+    'busy_timeout': env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000),
+    'cache_size': env.int('SQLITE_CACHE_SIZE', default=-20000),       # negativo = KiB (~20 MB)
+    'mmap_size': env.int('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024),
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {k}={v}' for k, v in SQLITE_PRAGMAS.items()),
+            # BEGIN IMMEDIATE: el bloqueo de escritura se pide al inicio de la transacción
+            # (con espera de busy_timeout) en vez de fallar al escalar de lectura a escritura
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -164,6 +188,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'  # configurar en PythonAnywhere y mapear como Static files
 
+# Los PDF de reportes se entregan con lab:descargar_reporte (control de acceso por laboratorio);
+# no exponer MEDIA_ROOT/reportes como archivos estáticos. Modos: 'django', 'x-sendfile', 'x-accel'
+# (nginx: location /protected/ { internal; alias <MEDIA_ROOT>/; })
+REPORTE_DESCARGA_MODO = os.environ.get('REPORTE_DESCARGA_MODO', 'django')
+REPORTE_X_ACCEL_PREFIJO = os.environ.get('REPORTE_X_ACCEL_PREFIJO', '/protected/')
+
 # Opcional: S3/Backblaze B2 con django-storages
 # INSTALLED_APPS += ['storages']
 # DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
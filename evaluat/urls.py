@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import redirect
+from lab.views import perfilado_staff, monitoreo_staff
 
 
 admin.site.site_header = "EvaluaT"
@@ -10,5 +11,7 @@ admin.site.index_title = "Bienvenido a EvaluaT"
 urlpatterns = [
     path("", include(("lab.urls", "lab"), namespace="lab")),  # namespace activo
     path('admin/logout/', lambda request: redirect('/logout/', permanent=False)),
+    path('admin/perfilado/', perfilado_staff, name='perfilado'),
+    path('admin/monitoreo/', monitoreo_staff, name='monitoreo'),
     path("admin/", admin.site.urls),
 ]
@@ -1,14 +1,18 @@
+from django import forms
 from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.apps import apps
 from django.db import transaction
+from django.shortcuts import render
 from .models import PropiedadARevisar
-from .utils.propuestas import materializar_propuesta
+from .utils.propuestas import materializar_propuesta, moderar_propuestas
 from lab.models import Laboratorio
 from django.utils import timezone
 from lab.utils.estados import filled_all_month
 
 # Import only what we need for the custom logic
-from .models import Laboratorio, ProgramaLaboratorio, Prueba, LaboratorioPruebaConfig, Reporte
+from .models import Laboratorio, ProgramaLaboratorio, Programa, Prueba, LaboratorioPruebaConfig, Reporte
+from .services.asignacion import asignar_programas, mensaje_asignacion, AsignacionError
 
 # ------------ 1) Auto-register all models EXCEPT the ones we want custom ------------
 lab_app = apps.get_app_config('lab')
@@ -40,67 +44,34 @@ class ProgramaLaboratorioAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         """
-        After saving ProgramaLaboratorio, create a LaboratorioPruebaConfig row
-        for each Prueba in the selected Programa, tied to the selected Laboratorio.
-        Copies defaults from Prueba.*_seleccionado_id into the config row.
+        After saving ProgramaLaboratorio, create the missing LaboratorioPruebaConfig rows
+        for the Pruebas of the selected Programa, copying Prueba.*_seleccionado_id defaults.
         """
         # Save the ProgramaLaboratorio record first
         super().save_model(request, obj, form, change)
+        conteos = asignar_programas([obj.programa_id_id], [obj.laboratorio_id_id])
+        if conteos['configuraciones_nuevas']:
+            messages.success(
+                request,
+                f"Se crearon {conteos['configuraciones_nuevas']} configuraciones en LaboratorioPruebaConfig "
+                f"para {obj.laboratorio_id} (programa: {obj.programa_id})."
+            )
+        else:
+            messages.info(
+                request,
+                "No se crearon nuevas configuraciones; ya existían para este laboratorio y programa."
+            )
+
+
+class AsignarProgramasForm(forms.Form):
+    programas = forms.ModelMultipleChoiceField(
+        queryset=Programa.objects.order_by('nombre'), widget=forms.CheckboxSelectMultiple
+    )
+    provisionar = forms.BooleanField(
+        required=False, initial=True,
+        label="Crear las configuraciones faltantes con los valores por defecto de cada prueba",
+    )
 
-        # laboratorio = obj.laboratorio_id   # FK to Laboratorio
-        # programa    = obj.programa_id      # FK to Programa
-
-        # # Fetch all Pruebas for this Programa, including selected default relations
-        # pruebas_qs = Prueba.objects.filter(programa_id=programa).select_related(
-        #     "instrumento_seleccionado_id",
-        #     "metodo_analitico_seleccionado_id",
-        #     "reactivo_seleccionado_id",
-        #     "unidad_de_medida_seleccionado_id",
-        # )
-
-        # # Avoid duplicates: find existing configs for (laboratorio, prueba)
-        # existing_prueba_ids = set(
-        #     LaboratorioPruebaConfig.objects
-        #     .filter(laboratorio_id=laboratorio, prueba_id__in=pruebas_qs)
-        #     .values_list("prueba_id_id", flat=True)
-        # )
-
-        # to_create = []
-        # for p in pruebas_qs:
-        #     if p.id in existing_prueba_ids:
-        #         continue
-
-        #     to_create.append(
-        #         LaboratorioPruebaConfig(
-        #             laboratorio_id=laboratorio,
-        #             prueba_id=p,
-        #             instrumento_id=getattr(p, "instrumento_seleccionado_id", None),
-        #             metodo_analitico_id=getattr(p, "metodo_analitico_seleccionado_id", None),
-        #             reactivo_id=getattr(p, "reactivo_seleccionado_id", None),
-        #             unidad_de_medida_id=getattr(p, "unidad_de_medida_seleccionado_id", None),
-        #         )
-        #     )
-
-        # created_count = 0
-        # if to_create:
-        #     # UniqueConstraint on (laboratorio_id, prueba_id) prevents dupes
-        #     with transaction.atomic():
-        #         LaboratorioPruebaConfig.objects.bulk_create(
-        #             to_create, ignore_conflicts=True
-        #         )
-        #     created_count = len(to_create)
-
-        # if created_count:
-        #     messages.success(
-        #         request,
-        #         f"Se crearon {created_count} configuraciones en LaboratorioPruebaConfig "
-        #         f"para {laboratorio} (programa: {programa})."
-        #     )
-        # else:
-        #     messages.info(
-        #         request,
-        #         "No se crearon nuevas configuraciones; ya existían para este laboratorio y programa."
-        #     )
 
 # ------------ 3) Custom admin for Laboratorio to manage override flags for editing the configurations ------------
 @admin.register(Laboratorio)
@@ -114,9 +85,45 @@ class LaboratorioAdmin(admin.ModelAdmin):
     fields = ("nombre", "clave", "estado", "edicion_hasta_dia", "corte_captura_dia",
               "override_edicion_activa", "override_edicion_hasta",
               "override_captura_activa", "override_captura_hasta")
+    actions = ["asignar_programas_action"]
+
+    @admin.action(description="Asignar programas a los laboratorios seleccionados")
+    def asignar_programas_action(self, request, queryset):
+        # Página intermedia: elegir programas; "apply" vuelve aquí con la misma selección
+        form = AsignarProgramasForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            try:
+                conteos = asignar_programas(
+                    [p.id for p in form.cleaned_data['programas']],
+                    list(queryset.values_list('id', flat=True)),
+                    provisionar=form.cleaned_data['provisionar'],
+                )
+            except AsignacionError as e:
+                self.message_user(request, str(e), level=messages.ERROR)
+                return None
+            self.message_user(request, mensaje_asignacion(conteos), level=messages.SUCCESS)
+            return None
+        return render(request, 'admin/asignar_programas.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Asignar programas',
+            'opts': self.model._meta,
+            'form': form,
+            'n_labs': queryset.count(),
+            'muestra': queryset.order_by('nombre')[:20],
+            'action': 'asignar_programas_action',
+            'select_across': request.POST.get('select_across', '0'),
+            'seleccionados': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
 
     def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
+        if change:
+            # Solo los campos editados: un save completo reescribiría grid_version/membresia_version
+            # (contadores que se incrementan con F()) con el valor leído al abrir el formulario
+            campos = {f.name for f in obj._meta.concrete_fields}
+            obj.save(update_fields=[f for f in form.changed_data if f in campos])
+        else:
+            super().save_model(request, obj, form, change)
         # Si se desactiva override de captura, NO promover antes del corte
         if change and form and ('override_captura_activa' in form.changed_data) and obj.estado == 2:
             hoy = timezone.localdate()
@@ -138,34 +145,33 @@ class LaboratorioPruebaConfigAdmin(admin.ModelAdmin):
     list_display = ("laboratorio_id", "prueba_id", "instrumento_id", "metodo_analitico_id", "reactivo_id", "unidad_de_medida_id", "bloqueada")
     list_editable = ("bloqueada",)  # editable en la lista para rapidez  # [9][19]
 
-# ------------ 4) Custom admin for PropiedadARevisar with action to approve and materialize ------------
+# ------------ 4) Custom admin for PropiedadARevisar with bulk approve/reject actions ------------
 @admin.register(PropiedadARevisar)
 class PropiedadARevisarAdmin(admin.ModelAdmin):
     list_display  = ("tipoElemento", "valor", "status", "created_at")
     list_filter   = ("status", "tipoElemento", "created_at")
     search_fields = ("valor", "descripcion")
-    actions       = ["aprobar_y_materializar"]
+    actions       = ["aprobar_y_materializar", "rechazar_propuestas"]
 
+    # Ambas acciones resuelven la selección por conjuntos (ver moderar_propuestas)
     @admin.action(description="Approve and materialize selected proposals")
-    @transaction.atomic
     def aprobar_y_materializar(self, request, queryset):
-        aprobadas = 0
-        creadas   = 0
-        for prop in queryset.select_for_update():
-            # Aprobar si no lo está
-            if prop.status != 1:
-                prop.status = 1  # Aprobado
-                prop.save(update_fields=["status"])
-                aprobadas += 1
-            # Crear en tabla maestra (idempotente)
-            creado = materializar_propuesta(prop)
-            if creado:
-                creadas += 1
+        r = moderar_propuestas(queryset, aprobar=True, moderador=request.user)
         self.message_user(
             request,
-            f"Propuestas aprobadas: {aprobadas}. Registros creados/confirmados en tablas maestras: {creadas}.",
+            f"Propuestas aprobadas: {r['resueltas']}. Registros en tablas maestras: "
+            f"{r['creados']} creados, {r['confirmados']} ya existentes.",
             level=messages.SUCCESS
         )
+
+    @admin.action(description="Reject selected proposals")
+    def rechazar_propuestas(self, request, queryset):
+        r = moderar_propuestas(queryset, aprobar=False, moderador=request.user)
+        mensaje = f"Propuestas rechazadas: {r['resueltas']}."
+        if r['omitidas']:
+            mensaje += f" Omitidas por estar ya aprobadas (su registro ya está en el catálogo): {r['omitidas']}."
+        self.message_user(request, mensaje, level=messages.SUCCESS)
+
     # Cubrir el caso de edición individual en el admin
     @transaction.atomic
     def save_model(self, request, obj, form, change):
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class LabConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'lab'
\ No newline at end of file
+    name = 'lab'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,34 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from lab.services.state import avanzar_estados
+
+
+class Command(BaseCommand):
+    help = ("Avanza el estado de los laboratorios: 1→2 al cerrar la ventana de edición y "
+            "2→3 al cerrar la captura con el mes completo. Pensado para ejecutarse desde cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Solo reporta los cambios, no escribe.")
+        parser.add_argument('--fecha', help="Evalúa como si hoy fuera YYYY-MM-DD (por defecto, hoy local).")
+
+    def handle(self, *args, **options):
+        today = None
+        if options['fecha']:
+            try:
+                today = date(*map(int, options['fecha'].split('-')))
+            except Exception:
+                raise CommandError(f"Fecha inválida '{options['fecha']}' (usa YYYY-MM-DD)")
+
+        dry_run = options['dry_run']
+        reporte = avanzar_estados(today=today, dry_run=dry_run)
+
+        for transicion, labs in reporte.items():
+            verbo = "avanzarían" if dry_run else "avanzaron"
+            self.stdout.write(f"{transicion}: {len(labs)} laboratorios {verbo}")
+            for lab in labs:
+                self.stdout.write(f"  - [{lab['id']}] {lab['nombre']}")
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run: no se escribieron cambios."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Transiciones aplicadas."))
@@ -0,0 +1,116 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ESQUEMA = """
+CREATE TABLE dato (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    laboratorio_id INTEGER NOT NULL, prueba_id INTEGER NOT NULL, mes TEXT NOT NULL, valor REAL NOT NULL,
+    UNIQUE (laboratorio_id, prueba_id, mes)
+);
+CREATE TABLE avance (laboratorio_id INTEGER NOT NULL, mes TEXT NOT NULL, capturadas INTEGER NOT NULL,
+                     PRIMARY KEY (laboratorio_id, mes));
+"""
+
+
+class Command(BaseCommand):
+    help = ("Mide el throughput de escritura concurrente en SQLite con la configuración por defecto "
+            "y con los PRAGMAs/transaction_mode de settings (sobre una BD temporal).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help="Escritores concurrentes.")
+        parser.add_argument('--transacciones', type=int, default=200, help="Transacciones por escritor.")
+        parser.add_argument('--filas', type=int, default=20, help="Filas upsert por transacción.")
+        parser.add_argument('--timeout', type=float, default=5.0, help="Timeout del driver (s) en la config base.")
+
+    def handle(self, *args, **o):
+        opciones = settings.DATABASES['default'].get('OPTIONS', {})
+        ajustada = {
+            'pragmas': [c.strip() for c in opciones.get('init_command', '').split(';') if c.strip()],
+            'begin': f"BEGIN {opciones.get('transaction_mode') or 'DEFERRED'}",
+            'timeout': 0.0,          # la espera la hace busy_timeout
+            'reintentos': getattr(settings, 'SQLITE_REINTENTOS', 5),
+        }
+        base = {'pragmas': [], 'begin': 'BEGIN', 'timeout': o['timeout'], 'reintentos': 1}
+
+        self.stdout.write(f"{o['hilos']} escritores × {o['transacciones']} transacciones × {o['filas']} filas")
+        for nombre, config in (('base', base), ('ajustada', ajustada)):
+            r = self._correr(config, o['hilos'], o['transacciones'], o['filas'])
+            self.stdout.write(
+                f"{nombre:>9}: {r['ok']} ok, {r['fallidas']} 'database is locked', {r['reintentos']} reintentos, "
+                f"{r['segundos']:.2f}s -> {r['ok'] / r['segundos']:.0f} tx/s, {r['ok'] * o['filas'] / r['segundos']:.0f} filas/s"
+            )
+        if ajustada['pragmas']:
+            self.stdout.write("PRAGMAs: " + '; '.join(ajustada['pragmas']) + f"; {ajustada['begin']}")
+
+    def _conectar(self, ruta, config):
+        conn = sqlite3.connect(ruta, timeout=config['timeout'], isolation_level=None, check_same_thread=False)
+        for pragma in config['pragmas']:
+            conn.execute(pragma)
+        return conn
+
+    def _correr(self, config, hilos, transacciones, filas):
+        directorio = tempfile.mkdtemp(prefix='evaluat-bench-')
+        ruta = os.path.join(directorio, 'bench.sqlite3')
+        conn = self._conectar(ruta, config)
+        conn.executescript(ESQUEMA)
+        conn.close()
+
+        resultado = {'ok': 0, 'fallidas': 0, 'reintentos': 0}
+        candado = threading.Lock()
+
+        def escritor(lab_id):
+            conn = self._conectar(ruta, config)
+            rnd = random.Random(lab_id)
+            ok = fallidas = reintentos = 0
+            for t in range(transacciones):
+                mes = f'2026-{t % 12 + 1:02d}-01'
+                for intento in range(config['reintentos']):
+                    try:
+                        conn.execute(config['begin'])
+                        # lectura y luego escritura: el patrón de guardar_datos_mes
+                        conn.execute("SELECT COUNT(*) FROM dato WHERE laboratorio_id=? AND mes=?", (lab_id, mes)).fetchone()
+                        conn.executemany(
+                            "INSERT INTO dato (laboratorio_id, prueba_id, mes, valor) VALUES (?,?,?,?) "
+                            "ON CONFLICT (laboratorio_id, prueba_id, mes) DO UPDATE SET valor=excluded.valor",
+                            [(lab_id, p, mes, rnd.random()) for p in range(filas)],
+                        )
+                        conn.execute(
+                            "INSERT INTO avance VALUES (?,?,?) ON CONFLICT (laboratorio_id, mes) "
+                            "DO UPDATE SET capturadas=excluded.capturadas", (lab_id, mes, filas))
+                        conn.execute("COMMIT")
+                        ok += 1
+                        break
+                    except sqlite3.OperationalError as exc:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        if 'locked' not in str(exc) and 'busy' not in str(exc):
+                            raise
+                        if intento + 1 == config['reintentos']:
+                            fallidas += 1
+                        else:
+                            reintentos += 1
+                            time.sleep(0.05 * (2 ** intento) * (0.5 + rnd.random()))
+            conn.close()
+            with candado:
+                resultado['ok'] += ok
+                resultado['fallidas'] += fallidas
+                resultado['reintentos'] += reintentos
+
+        workers = [threading.Thread(target=escritor, args=(i + 1,)) for i in range(hilos)]
+        inicio = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        resultado['segundos'] = time.perf_counter() - inicio
+        for sufijo in ('', '-wal', '-shm'):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+        os.rmdir(directorio)
+        return resultado
@@ -0,0 +1,29 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from lab.services.estadisticas import calcular_ronda
+
+
+class Command(BaseCommand):
+    help = "Calcula el consenso robusto, σpt y z-scores de la ronda mensual y los guarda en EstadisticaRonda/PuntajeZ."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help="Mes YYYY-MM (por defecto, el mes vigente).")
+        parser.add_argument('--metodo', choices=['algoritmo_a', 'mediana_mad'], default='algoritmo_a')
+        parser.add_argument('--min-participantes', type=int, default=None,
+                            help="Mínimo de laboratorios para asignar σpt y z (default ESTADISTICA_MIN_PARTICIPANTES o 3).")
+
+    def handle(self, *args, **options):
+        if options['mes']:
+            try:
+                yyyy, mm = map(int, options['mes'].split('-')[:2])
+                mes = date(yyyy, mm, 1)
+            except Exception:
+                raise CommandError(f"Mes inválido '{options['mes']}' (usa YYYY-MM)")
+        else:
+            mes = timezone.localdate().replace(day=1)
+
+        pruebas, puntajes = calcular_ronda(mes, options['metodo'], options['min_participantes'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Ronda {mes:%Y-%m}: {pruebas} pruebas, {puntajes} z-scores ({options['metodo']})."
+        ))
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from lab.services.correo import enviar_pendientes
+
+
+class Command(BaseCommand):
+    help = "Envía los correos pendientes de la bandeja de salida reutilizando una conexión SMTP por lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=100, help="Correos por lote (default 100).")
+        parser.add_argument('--loop', action='store_true',
+                            help="Modo worker: sigue drenando la bandeja hasta interrumpirse.")
+        parser.add_argument('--intervalo', type=int, default=30,
+                            help="Segundos de espera entre lotes vacíos en modo --loop (default 30).")
+
+    def handle(self, *args, **options):
+        while True:
+            enviados, reintentos, fallidos = enviar_pendientes(limite=options['limite'])
+            if enviados or reintentos or fallidos:
+                self.stdout.write(f"Enviados: {enviados}. Reprogramados: {reintentos}. Fallidos: {fallidos}.")
+            if not options['loop']:
+                break
+            # Lote lleno: probablemente quedan más, continuar sin esperar
+            if enviados + reintentos + fallidos < options['limite']:
+                time.sleep(options['intervalo'])
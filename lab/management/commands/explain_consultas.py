@@ -0,0 +1,40 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from lab.services.consultas_calientes import CONSULTAS, muestra
+
+# "SCAN tabla" sin índice (SQLite >= 3.36); "SCAN tabla USING [COVERING] INDEX" sí usa índice
+SCAN_RE = re.compile(r'\bSCAN (?:TABLE )?"?(\w+)"?(?! USING (?:COVERING )?INDEX)(?:\s|$)')
+
+
+class Command(BaseCommand):
+    help = "Ejecuta EXPLAIN QUERY PLAN sobre el registro de consultas calientes y marca los recorridos completos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombres', nargs='*', help="Filtrar por prefijo de nombre (p. ej. captura).")
+        parser.add_argument('--plan', action='store_true', help="Mostrar el plan completo de cada consulta.")
+        parser.add_argument('--estricto', action='store_true', help="Terminar con error si hay recorridos completos.")
+
+    def handle(self, *args, **options):
+        m = muestra()
+        con_scan = []
+        for nombre, (construir, permitidas) in CONSULTAS.items():
+            if options['nombres'] and not any(nombre.startswith(n) for n in options['nombres']):
+                continue
+            plan = construir(m).explain()
+            scans = sorted({t for t in SCAN_RE.findall(plan) if t not in permitidas})
+            if scans:
+                con_scan.append(nombre)
+                self.stdout.write(self.style.WARNING(f"SCAN  {nombre}: {', '.join(scans)}"))
+            else:
+                self.stdout.write(f"ok    {nombre}")
+            if options['plan'] or scans:
+                for linea in plan.splitlines():
+                    self.stdout.write(f"        {linea}")
+
+        if con_scan:
+            msg = f"{len(con_scan)} consultas con recorrido completo de tabla."
+            if options['estricto']:
+                raise CommandError(msg)
+            self.stdout.write(self.style.WARNING(msg))
+        else:
+            self.stdout.write(self.style.SUCCESS("Sin recorridos completos de tabla."))
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from lab.services.sinteticos import generar_poblacion
+
+
+class Command(BaseCommand):
+    help = ("Genera una población sintética determinista (labs, usuarios, programas, pruebas, catálogos, "
+            "configuración, años de Dato, reportes y propuestas) para pruebas de carga.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--labs', type=int, default=50)
+        parser.add_argument('--programas', type=int, default=10)
+        parser.add_argument('--pruebas-por-programa', type=int, default=12)
+        parser.add_argument('--programas-por-lab', type=int, default=6)
+        parser.add_argument('--meses', type=int, default=24, help="Meses de Dato hasta el mes anterior.")
+        parser.add_argument('--catalogo', type=int, default=20, help="Elementos por catálogo.")
+        parser.add_argument('--usuarios-por-lab', type=int, default=2)
+        parser.add_argument('--propuestas', type=int, default=200)
+        parser.add_argument('--cobertura', type=float, default=0.97, help="Fracción de pruebas capturadas por mes.")
+        parser.add_argument('--semilla', type=int, default=2024)
+        parser.add_argument('--prefijo', default='Sintético')
+        parser.add_argument('--lote', type=int, default=5000, help="Tamaño de lote de bulk_create.")
+
+    def handle(self, *args, **o):
+        inicio = time.perf_counter()
+        ultimo = {'t': 0.0}
+
+        def progreso(etapa, n):
+            ahora = time.perf_counter()
+            if etapa != 'dato' or ahora - ultimo['t'] > 2:
+                ultimo['t'] = ahora
+                self.stdout.write(f"  [{ahora - inicio:6.1f}s] {etapa}: {n}")
+
+        conteo = generar_poblacion(
+            labs=o['labs'], programas=o['programas'], pruebas_por_programa=o['pruebas_por_programa'],
+            programas_por_lab=o['programas_por_lab'], meses=o['meses'], catalogo=o['catalogo'],
+            usuarios_por_lab=o['usuarios_por_lab'], propuestas=o['propuestas'], cobertura=o['cobertura'],
+            semilla=o['semilla'], prefijo=o['prefijo'], lote=o['lote'], on_progress=progreso,
+        )
+        for modelo, n in conteo.items():
+            self.stdout.write(f"{modelo:>24}: {n}")
+        self.stdout.write(self.style.SUCCESS(f"Población generada en {time.perf_counter() - inicio:.1f}s."))
@@ -0,0 +1,33 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from lab.services.reportes import generar_reportes
+
+
+class Command(BaseCommand):
+    help = "Genera los PDF de reportes mensuales o anuales en paralelo y los marca como completados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help="Mes YYYY-MM (mensual) o año YYYY (anual). Por defecto, el mes anterior.")
+        parser.add_argument('--tipo', choices=['mensual', 'anual'], default='mensual')
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Procesos para renderizar (default: núm. de CPUs; 1 = sin pool).")
+        parser.add_argument('--lab', type=int, action='append', dest='labs',
+                            help="Limitar a un laboratorio (repetible).")
+
+    def handle(self, *args, **options):
+        if options['mes']:
+            try:
+                partes = list(map(int, options['mes'].split('-')[:2]))
+                mes = date(partes[0], partes[1] if len(partes) > 1 else 1, 1)
+            except Exception:
+                raise CommandError(f"Periodo inválido '{options['mes']}' (usa YYYY-MM o YYYY)")
+        else:
+            hoy = timezone.localdate()
+            mes = date(hoy.year - (hoy.month == 1), (hoy.month - 2) % 12 + 1, 1)
+
+        reportes = generar_reportes(
+            mes, options['tipo'], lab_ids=options['labs'], workers=options['workers'],
+            on_progress=lambda rep: self.stdout.write(f"  {rep.nombre}: {rep.archivo.name}"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"{len(reportes)} reportes {options['tipo']} generados."))
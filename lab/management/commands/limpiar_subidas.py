@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from lab.services.subidas import limpiar_subidas_vencidas
+
+
+class Command(BaseCommand):
+    help = "Cancela las subidas de reportes sin actividad y borra sus archivos temporales."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=None,
+                            help="Horas sin actividad (default REPORTE_SUBIDA_EXPIRA_HORAS o 24).")
+
+    def handle(self, *args, **options):
+        n = limpiar_subidas_vencidas(options['horas'])
+        self.stdout.write(self.style.SUCCESS(f"{n} subidas canceladas."))
@@ -0,0 +1,28 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from lab.services.avance import reconstruir_avance
+
+
+def _parse_mes(valor):
+    try:
+        yyyy, mm = map(int, valor.split('-')[:2])
+        return date(yyyy, mm, 1)
+    except Exception:
+        raise CommandError(f"Mes inválido '{valor}' (usa YYYY-MM)")
+
+
+class Command(BaseCommand):
+    help = "Reconstruye AvanceMensual (pruebas requeridas/capturadas por laboratorio y mes) desde Dato y la configuración."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lab', type=int, action='append', dest='labs',
+                            help="Id de laboratorio (repetible). Por defecto, todos.")
+        parser.add_argument('--mes', action='append', dest='meses',
+                            help="Mes YYYY-MM (repetible). Por defecto, todos.")
+
+    def handle(self, *args, **options):
+        meses = [_parse_mes(m) for m in options['meses']] if options['meses'] else None
+        creadas, actualizadas = reconstruir_avance(lab_ids=options['labs'], meses=meses)
+        self.stdout.write(self.style.SUCCESS(
+            f"AvanceMensual reconstruido: {creadas} filas creadas, {actualizadas} actualizadas."
+        ))
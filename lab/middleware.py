@@ -0,0 +1,72 @@
+# lab/middleware.py
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from lab.services.membresia import laboratorio_de_sesion
+from lab.utils import perfilado
+
+
+class PerfiladoMiddleware:
+    """
+    Mide cada petición (total, SQL, plantillas), lo expone en el header Server-Timing y lo
+    guarda en el buffer en memoria que muestra /admin/perfilado/. Solo con PERFILADO_ACTIVO.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADO_ACTIVO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicion, token = perfilado.iniciar()
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(perfilado.envoltura_sql):
+                response = self.get_response(request)
+        finally:
+            perfilado.terminar(token)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        if response.streaming:
+            # El cuerpo (y su SQL) se genera después de salir de aquí: solo se conoce el
+            # tiempo hasta los encabezados; no se registra SQL/plantillas como si fuera 0
+            sql_n = sql_ms = tpl_ms = None
+            response['Server-Timing'] = f'total;dur={total_ms:.1f};desc="streaming: hasta encabezados"'
+        else:
+            sql_n, sql_ms, tpl_ms = medicion.sql_n, medicion.sql_s * 1000, medicion.plantillas_s * 1000
+            response['Server-Timing'] = (
+                f'total;dur={total_ms:.1f}, sql;dur={sql_ms:.1f};desc="{sql_n} consultas", '
+                f'tpl;dur={tpl_ms:.1f}'
+            )
+        match = getattr(request, 'resolver_match', None)
+        perfilado.registrar({
+            'url_name': (match.view_name if match else None) or request.path,
+            'path': request.get_full_path()[:300],
+            'metodo': request.method,
+            'status': response.status_code,
+            'streaming': response.streaming,
+            'total_ms': total_ms,
+            'sql_n': sql_n,
+            'sql_ms': sql_ms,
+            'tpl_ms': tpl_ms,
+            'cuando': timezone.now(),
+        })
+        return response
+
+
+class LaboratorioMiddleware:
+    """
+    Expone request.lab: el laboratorio seleccionado en sesión, validado contra la pertenencia
+    del usuario (o None). Es perezoso como request.user: solo consulta si la vista lo usa,
+    y como mucho una vez por petición. Va después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.lab = SimpleLazyObject(lambda: laboratorio_de_sesion(request))
+        return self.get_response(request)
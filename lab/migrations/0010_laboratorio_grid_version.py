@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0009_propiedadarevisar_moderation_nonce'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='laboratorio',
+            name='grid_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
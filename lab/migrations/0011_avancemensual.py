@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0010_laboratorio_grid_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvanceMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes (YYYY-MM-01)')),
+                ('requeridas', models.PositiveIntegerField(default=0)),
+                ('capturadas', models.PositiveIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('laboratorio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avances', to='lab.laboratorio')),
+            ],
+            options={
+                'verbose_name_plural': 'AvanceMensual',
+                'constraints': [models.UniqueConstraint(fields=('laboratorio', 'mes'), name='uq_avance_lab_mes')],
+            },
+        ),
+    ]
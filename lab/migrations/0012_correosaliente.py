@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0011_avancemensual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asunto', models.CharField(max_length=255)),
+                ('cuerpo', models.TextField()),
+                ('html', models.TextField(blank=True, null=True)),
+                ('remitente', models.CharField(blank=True, max_length=255, null=True)),
+                ('destinatarios', models.JSONField(default=list)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=10)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True, null=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('enviado_en', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Correos salientes',
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='lab_correos_estado_dff95d_idx')],
+            },
+        ),
+    ]
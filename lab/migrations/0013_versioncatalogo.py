@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0012_correosaliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabla', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'VersionCatalogo',
+            },
+        ),
+    ]
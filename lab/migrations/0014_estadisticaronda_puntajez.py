@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0013_versioncatalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaRonda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes (YYYY-MM-01)')),
+                ('metodo', models.CharField(choices=[('mediana_mad', 'Mediana / MAD escalada'), ('algoritmo_a', 'Algoritmo A (ISO 13528)')], default='algoritmo_a', max_length=20)),
+                ('n', models.PositiveIntegerField()),
+                ('mediana', models.FloatField()),
+                ('mad', models.FloatField()),
+                ('valor_asignado', models.FloatField()),
+                ('desviacion_pt', models.FloatField(blank=True, null=True)),
+                ('calculado_en', models.DateTimeField(auto_now=True)),
+                ('prueba', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas', to='lab.prueba')),
+            ],
+            options={
+                'verbose_name_plural': 'EstadisticaRonda',
+                'constraints': [models.UniqueConstraint(fields=('prueba', 'mes'), name='uq_estadistica_prueba_mes')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PuntajeZ',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes (YYYY-MM-01)')),
+                ('valor', models.FloatField()),
+                ('z', models.FloatField(blank=True, null=True)),
+                ('laboratorio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='puntajes_z', to='lab.laboratorio')),
+                ('prueba', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='puntajes_z', to='lab.prueba')),
+            ],
+            options={
+                'verbose_name_plural': 'PuntajeZ',
+                'indexes': [models.Index(fields=['laboratorio', 'mes'], name='lab_puntaje_laborat_97a1b4_idx')],
+                'constraints': [models.UniqueConstraint(fields=('laboratorio', 'prueba', 'mes'), name='uq_puntajez_lab_prueba_mes')],
+            },
+        ),
+    ]
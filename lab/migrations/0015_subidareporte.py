@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:37
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0014_estadisticaronda_puntajez'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaReporte',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('mensual', 'Mensual'), ('anual', 'Anual')], default='mensual', max_length=10)),
+                ('mes', models.DateField()),
+                ('nombre', models.CharField(max_length=200)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('tamano', models.PositiveBigIntegerField()),
+                ('tamano_parte', models.PositiveIntegerField()),
+                ('partes_recibidas', models.PositiveIntegerField(default=0)),
+                ('ruta_temporal', models.CharField(max_length=500)),
+                ('estado', models.CharField(choices=[('subiendo', 'Subiendo'), ('completado', 'Completado'), ('cancelado', 'Cancelado')], default='subiendo', max_length=12)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('laboratorio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas_reporte', to='lab.laboratorio')),
+                ('reporte', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='subidas', to='lab.reporte')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Subidas de reporte',
+            },
+        ),
+    ]
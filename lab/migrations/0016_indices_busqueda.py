@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:41
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0015_subidareporte'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dato',
+            index=models.Index(fields=['laboratorio_id', 'mes'], name='dato_lab_mes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dato',
+            index=models.Index(fields=['mes', 'prueba_id'], name='dato_mes_prueba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='instrumento',
+            index=models.Index(django.db.models.functions.text.Lower('nombre'), name='instrumento_nombre_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metodoanalitico',
+            index=models.Index(django.db.models.functions.text.Lower('nombre'), name='metodo_nombre_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedadarevisar',
+            index=models.Index(models.F('tipoElemento'), django.db.models.functions.text.Lower('valor'), name='prop_tipo_valor_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reactivo',
+            index=models.Index(django.db.models.functions.text.Lower('nombre'), name='reactivo_nombre_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unidaddemedida',
+            index=models.Index(django.db.models.functions.text.Lower('nombre'), name='unidad_nombre_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0016_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='laboratorio',
+            name='membresia_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0017_laboratorio_membresia_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dato',
+            index=models.Index(fields=['laboratorio_id', 'prueba_id', 'mes', 'valor'], name='dato_serie_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0018_dato_serie_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='avancemensual',
+            name='ultima_captura',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
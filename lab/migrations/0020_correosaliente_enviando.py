@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0019_avancemensual_ultima_captura'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='correosaliente',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=10),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0020_correosaliente_enviando'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='propiedadarevisar',
+            name='prop_tipo_valor_lower_idx',
+        ),
+    ]
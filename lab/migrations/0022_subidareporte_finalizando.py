@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab', '0021_quitar_prop_tipo_valor_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='subidareporte',
+            name='estado',
+            field=models.CharField(choices=[('subiendo', 'Subiendo'), ('finalizando', 'Finalizando'), ('completado', 'Completado'), ('cancelado', 'Cancelado')], default='subiendo', max_length=12),
+        ),
+    ]
@@ -3,7 +3,9 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import date
 from django.db.models import Q
+from django.db.models.functions import Lower
 import secrets
+import uuid
 # ----------- Helpers -----------
 # Helper para fecha por defecto
 def first_day_of_current_month():
@@ -26,6 +28,10 @@ class Laboratorio(models.Model):
         choices=[(1, "Configuración"), (2, "Registro"), (3, "Consulta")],
         default=1
     )
+    # Versión del grid de captura (programas/pruebas/unidades); se incrementa al editar config o programas
+    grid_version = models.PositiveIntegerField(default=0, editable=False)
+    # Versión de pertenencia (UserLaboratorio); invalida el conjunto de labs cacheado en sesión
+    membresia_version = models.PositiveIntegerField(default=0, editable=False)
     
     def __str__(self):
         return self.nombre
@@ -63,6 +69,9 @@ class Instrumento(models.Model):
 
     def __str__(self):
         return self.nombre
+
+    class Meta:
+        indexes = [models.Index(Lower('nombre'), name='instrumento_nombre_lower_idx')]
     
 class MetodoAnalitico(models.Model):
     nombre = models.CharField(max_length=255)
@@ -72,6 +81,7 @@ class MetodoAnalitico(models.Model):
         return self.nombre
     class Meta:
         verbose_name_plural = "MetodoAnalitico"
+        indexes = [models.Index(Lower('nombre'), name='metodo_nombre_lower_idx')]
 
 class Reactivo(models.Model):
     nombre = models.CharField(max_length=255)
@@ -80,6 +90,9 @@ class Reactivo(models.Model):
     def __str__(self):
         return self.nombre
 
+    class Meta:
+        indexes = [models.Index(Lower('nombre'), name='reactivo_nombre_lower_idx')]
+
 class UnidadDeMedida(models.Model):
     nombre = models.CharField(max_length=255)
     descripcion = models.TextField(blank=True, null=True)
@@ -89,6 +102,19 @@ class UnidadDeMedida(models.Model):
     
     class Meta:
         verbose_name_plural = "UnidadDeMedida"
+        indexes = [models.Index(Lower('nombre'), name='unidad_nombre_lower_idx')]
+
+
+class VersionCatalogo(models.Model):
+    """Versión por catálogo (instrumento, metodo, reactivo, unidad); se incrementa en cada escritura."""
+    tabla = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.tabla} v{self.version}"
+
+    class Meta:
+        verbose_name_plural = "VersionCatalogo"
 
 
 class PropiedadARevisar(models.Model):
@@ -184,6 +210,88 @@ class Dato(models.Model):
                 name='uq_dato_lab_prueba_mes'
             )
         ]
+        indexes = [
+            # Captura/consulta y avance: Dato de un laboratorio en un mes
+            models.Index(fields=['laboratorio_id', 'mes'], name='dato_lab_mes_idx'),
+            # Estadísticas de ronda, reportes y exportación: todos los Dato de un mes
+            models.Index(fields=['mes', 'prueba_id'], name='dato_mes_prueba_idx'),
+            # Series históricas: rango por (lab, prueba) leído solo del índice (incluye valor)
+            models.Index(fields=['laboratorio_id', 'prueba_id', 'mes', 'valor'], name='dato_serie_idx'),
+        ]
+
+
+class AvanceMensual(models.Model):
+    """
+    Progreso de captura por laboratorio y mes, mantenido en las escrituras de Dato y
+    de configuración (ver lab/services/avance.py). Reconstruible con `reconstruir_avance`.
+    """
+    laboratorio = models.ForeignKey('Laboratorio', on_delete=models.CASCADE, related_name='avances')
+    mes = models.DateField(help_text="Primer día del mes (YYYY-MM-01)")
+    requeridas = models.PositiveIntegerField(default=0)   # pruebas configuradas
+    capturadas = models.PositiveIntegerField(default=0)   # pruebas configuradas con Dato en el mes
+    ultima_captura = models.DateTimeField(null=True, blank=True)  # Max(Dato.fecha) del mes
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.laboratorio} - {self.mes:%Y-%m} ({self.capturadas}/{self.requeridas})'
+
+    @property
+    def completo(self):
+        return self.requeridas > 0 and self.capturadas >= self.requeridas
+
+    class Meta:
+        verbose_name_plural = "AvanceMensual"
+        constraints = [
+            models.UniqueConstraint(fields=['laboratorio', 'mes'], name='uq_avance_lab_mes'),
+        ]
+
+
+class EstadisticaRonda(models.Model):
+    """Estadísticos de consenso por prueba y mes (ronda), calculados por `calcular_estadisticas`."""
+    METODO_CHOICES = (
+        ('mediana_mad', 'Mediana / MAD escalada'),
+        ('algoritmo_a', 'Algoritmo A (ISO 13528)'),
+    )
+
+    prueba = models.ForeignKey('Prueba', on_delete=models.CASCADE, related_name='estadisticas')
+    mes = models.DateField(help_text="Primer día del mes (YYYY-MM-01)")
+    metodo = models.CharField(max_length=20, choices=METODO_CHOICES, default='algoritmo_a')
+    n = models.PositiveIntegerField()
+    mediana = models.FloatField()
+    mad = models.FloatField()
+    valor_asignado = models.FloatField()                    # consenso robusto x*
+    desviacion_pt = models.FloatField(null=True, blank=True)  # σpt para la evaluación de aptitud
+    calculado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.prueba} - {self.mes:%Y-%m} (x*={self.valor_asignado:g}, n={self.n})'
+
+    class Meta:
+        verbose_name_plural = "EstadisticaRonda"
+        constraints = [
+            models.UniqueConstraint(fields=['prueba', 'mes'], name='uq_estadistica_prueba_mes'),
+        ]
+
+
+class PuntajeZ(models.Model):
+    """z-score de cada laboratorio en la ronda: (valor - x*) / σpt."""
+    laboratorio = models.ForeignKey('Laboratorio', on_delete=models.CASCADE, related_name='puntajes_z')
+    prueba = models.ForeignKey('Prueba', on_delete=models.CASCADE, related_name='puntajes_z')
+    mes = models.DateField(help_text="Primer día del mes (YYYY-MM-01)")
+    valor = models.FloatField()
+    z = models.FloatField(null=True, blank=True)  # None si la ronda no tiene σpt utilizable
+
+    def __str__(self):
+        return f'{self.laboratorio} - {self.prueba} - {self.mes:%Y-%m}: z={self.z}'
+
+    class Meta:
+        verbose_name_plural = "PuntajeZ"
+        constraints = [
+            models.UniqueConstraint(fields=['laboratorio', 'prueba', 'mes'], name='uq_puntajez_lab_prueba_mes'),
+        ]
+        indexes = [
+            models.Index(fields=['laboratorio', 'mes']),
+        ]
 
 
 class KitDeReactivos(models.Model):
@@ -230,3 +338,74 @@ class Reporte(models.Model):
                                    check=Q(estado='completado', archivo__isnull=False) | ~Q(estado='completado')),
         ]
 
+
+
+class CorreoSaliente(models.Model):
+    """Bandeja de salida: los correos se encolan en la transacción del cambio y los envía `enviar_correos`."""
+    ESTADO_CHOICES = (
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),  # reclamado por un envío; proximo_intento = vencimiento del lease
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    )
+
+    asunto = models.CharField(max_length=255)
+    cuerpo = models.TextField()
+    html = models.TextField(blank=True, null=True)
+    remitente = models.CharField(max_length=255, blank=True, null=True)
+    destinatarios = models.JSONField(default=list)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True, null=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.asunto} ({self.get_estado_display()})'
+
+    class Meta:
+        verbose_name_plural = "Correos salientes"
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+
+class SubidaReporte(models.Model):
+    """
+    Sesión de subida por partes de un PDF de reporte. Las partes se escriben en un archivo
+    temporal en orden; `partes_recibidas` es la última confirmada y desde ahí se reanuda.
+    El Reporte solo se crea/actualiza al finalizar.
+    """
+    ESTADO_CHOICES = (
+        ('subiendo', 'Subiendo'),
+        ('finalizando', 'Finalizando'),  # reclamada por una petición de finalizar
+        ('completado', 'Completado'),
+        ('cancelado', 'Cancelado'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    laboratorio = models.ForeignKey('Laboratorio', on_delete=models.CASCADE, related_name='subidas_reporte')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    tipo = models.CharField(max_length=10, choices=Reporte.TIPO_CHOICES, default='mensual')
+    mes = models.DateField()
+    nombre = models.CharField(max_length=200)
+    nombre_archivo = models.CharField(max_length=255)
+    tamano = models.PositiveBigIntegerField()
+    tamano_parte = models.PositiveIntegerField()
+    partes_recibidas = models.PositiveIntegerField(default=0)
+    ruta_temporal = models.CharField(max_length=500)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='subiendo')
+    reporte = models.ForeignKey('Reporte', on_delete=models.SET_NULL, null=True, blank=True, related_name='subidas')
+    creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    @property
+    def total_partes(self):
+        return max(1, -(-self.tamano // self.tamano_parte))
+
+    def __str__(self):
+        return f'{self.nombre} ({self.partes_recibidas}/{self.total_partes})'
+
+    class Meta:
+        verbose_name_plural = "Subidas de reporte"
@@ -0,0 +1,88 @@
+# lab/services/asignacion.py
+"""
+Asignación masiva de programas a laboratorios con aprovisionamiento de configuraciones.
+Todo por conjuntos: un bulk_create de ProgramaLaboratorio para los pares que faltan y un
+bulk_create(ignore_conflicts=True) de LaboratorioPruebaConfig por lote de laboratorios,
+con los valores por defecto de cada Prueba (*_seleccionado_id).
+"""
+from lab.models import Laboratorio, Programa, ProgramaLaboratorio, Prueba, LaboratorioPruebaConfig
+from lab.services.captura import invalidar_grid
+from lab.services.avance import reconstruir_avance
+from lab.utils.sqlite import transaccion_con_reintentos
+
+LABS_POR_LOTE = 100      # lotes de configs: LABS_POR_LOTE x pruebas de los programas
+
+
+class AsignacionError(ValueError):
+    """Programas o laboratorios inexistentes (no se escribe nada)."""
+
+
+@transaccion_con_reintentos
+def asignar_programas(programa_ids, lab_ids, provisionar=True):
+    """
+    Asigna cada programa de `programa_ids` a cada laboratorio de `lab_ids` (idempotente).
+    Con `provisionar`, crea las LaboratorioPruebaConfig que falten para las pruebas de esos
+    programas. Consultas constantes salvo un INSERT por lote. Devuelve los conteos:
+    {'laboratorios', 'programas', 'asignaciones_nuevas', 'asignaciones_existentes', 'configuraciones_nuevas'}
+    """
+    programa_ids = sorted({int(p) for p in programa_ids})
+    lab_ids = sorted({int(l) for l in lab_ids})
+    if not programa_ids or not lab_ids:
+        raise AsignacionError('Indica al menos un programa y un laboratorio')
+
+    faltan_prog = set(programa_ids) - set(Programa.objects.filter(id__in=programa_ids).values_list('id', flat=True))
+    faltan_lab = set(lab_ids) - set(Laboratorio.objects.filter(id__in=lab_ids).values_list('id', flat=True))
+    if faltan_prog:
+        raise AsignacionError(f'No existen los programas {sorted(faltan_prog)}')
+    if faltan_lab:
+        raise AsignacionError(f'No existen los laboratorios {sorted(faltan_lab)}')
+
+    # 1) Asignaciones (ProgramaLaboratorio no tiene restricción única: se filtran las existentes)
+    existentes = set(ProgramaLaboratorio.objects
+                     .filter(laboratorio_id__in=lab_ids, programa_id__in=programa_ids)
+                     .values_list('laboratorio_id', 'programa_id'))
+    nuevas = [ProgramaLaboratorio(laboratorio_id_id=lab_id, programa_id_id=prog_id)
+              for lab_id in lab_ids for prog_id in programa_ids if (lab_id, prog_id) not in existentes]
+    ProgramaLaboratorio.objects.bulk_create(nuevas, batch_size=1000)
+
+    # 2) Configuraciones con los valores por defecto de cada prueba
+    configuraciones_nuevas = 0
+    if provisionar:
+        pruebas = list(Prueba.objects.filter(programa_id__in=programa_ids).values_list(
+            'id', 'instrumento_seleccionado_id', 'metodo_analitico_seleccionado_id',
+            'reactivo_seleccionado_id', 'unidad_de_medida_seleccionado_id'))
+        prueba_ids = [p[0] for p in pruebas]
+        previas = LaboratorioPruebaConfig.objects.filter(laboratorio_id__in=lab_ids, prueba_id__in=prueba_ids)
+        antes = previas.count()
+        for i in range(0, len(lab_ids), LABS_POR_LOTE):
+            LaboratorioPruebaConfig.objects.bulk_create([
+                LaboratorioPruebaConfig(
+                    laboratorio_id_id=lab_id, prueba_id_id=prueba_id,
+                    instrumento_id_id=ins, metodo_analitico_id_id=met, reactivo_id_id=rea, unidad_de_medida_id_id=uni,
+                )
+                for lab_id in lab_ids[i:i + LABS_POR_LOTE]
+                for prueba_id, ins, met, rea, uni in pruebas
+            ], ignore_conflicts=True)   # uq_laboratorio_prueba: las existentes se respetan tal cual
+        # ignore_conflicts no devuelve cuántas se insertaron
+        configuraciones_nuevas = previas.count() - antes
+
+    # bulk_create no dispara señales: grid y avance (cambian las pruebas requeridas)
+    if nuevas or configuraciones_nuevas:
+        invalidar_grid(lab_ids)
+    if configuraciones_nuevas:
+        reconstruir_avance(lab_ids=lab_ids)
+
+    return {
+        'laboratorios': len(lab_ids),
+        'programas': len(programa_ids),
+        'asignaciones_nuevas': len(nuevas),
+        'asignaciones_existentes': len(existentes),
+        'configuraciones_nuevas': configuraciones_nuevas,
+    }
+
+
+def mensaje_asignacion(conteos):
+    return (f"{conteos['asignaciones_nuevas']} asignaciones nuevas "
+            f"({conteos['asignaciones_existentes']} ya existían) y "
+            f"{conteos['configuraciones_nuevas']} configuraciones creadas en "
+            f"{conteos['laboratorios']} laboratorios para {conteos['programas']} programas.")
@@ -0,0 +1,129 @@
+# lab/services/avance.py
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from lab.models import AvanceMensual, LaboratorioPruebaConfig, Dato
+
+
+def _mes_vigente():
+    return timezone.localdate().replace(day=1)
+
+
+def recalcular_avance(lab_id, mes):
+    """Recalcula desde las filas fuente el avance de un (laboratorio, mes). 3 consultas."""
+    cfg_ids = LaboratorioPruebaConfig.objects.filter(laboratorio_id=lab_id).values('prueba_id')
+    requeridas = LaboratorioPruebaConfig.objects.filter(laboratorio_id=lab_id).count()
+    capturas = (Dato.objects.filter(laboratorio_id=lab_id, mes=mes, prueba_id__in=cfg_ids)
+                .aggregate(n=Count('id'), ultima=Max('fecha')))
+    avance, _ = AvanceMensual.objects.update_or_create(
+        laboratorio_id=lab_id, mes=mes,
+        defaults={'requeridas': requeridas, 'capturadas': capturas['n'], 'ultima_captura': capturas['ultima']},
+    )
+    return avance
+
+
+def registrar_capturas(lab_id, mes, nuevas):
+    """
+    Actualiza el avance tras escribir Dato de pruebas configuradas.
+    `nuevas` es cuántas pruebas pasaron de no tener dato a tenerlo; las actualizaciones
+    de valor solo renuevan `ultima_captura` y `actualizado_en`. Si aún no hay fila para el mes, se recalcula.
+    """
+    ahora = timezone.now()
+    actualizadas = (AvanceMensual.objects
+                    .filter(laboratorio_id=lab_id, mes=mes)
+                    .update(capturadas=F('capturadas') + nuevas, ultima_captura=ahora, actualizado_en=ahora))
+    if not actualizadas:
+        recalcular_avance(lab_id, mes)
+
+
+def ajustar_avance_por_configs(lab_id, prueba_ids, signo):
+    """
+    Ajusta el avance del lab tras crear (signo=1) o eliminar (signo=-1) las configuraciones
+    de `prueba_ids`, sin reagrupar todo el historial de Dato:
+      - mes vigente: se recalcula exacto (3 consultas)
+      - meses anteriores: un solo UPDATE con F(); requeridas ± len(prueba_ids) y capturadas ±
+        los Dato de esas pruebas en el mes (subconsulta por uq (laboratorio, prueba, mes))
+    `ultima_captura` de meses anteriores no se toca.
+    """
+    prueba_ids = list(prueba_ids)
+    if not prueba_ids:
+        return
+    mes_actual = _mes_vigente()
+    con_dato = (Dato.objects
+                .filter(laboratorio_id=lab_id, prueba_id__in=prueba_ids, mes=OuterRef('mes'))
+                .order_by().values('laboratorio_id').annotate(n=Count('id')).values('n'))
+    (AvanceMensual.objects
+     .filter(laboratorio_id=lab_id, mes__lt=mes_actual)
+     .update(requeridas=F('requeridas') + signo * len(prueba_ids),
+             capturadas=F('capturadas') + signo * Coalesce(Subquery(con_dato), Value(0)),
+             actualizado_en=timezone.now()))
+    recalcular_avance(lab_id, mes_actual)
+
+
+def avance_mes(lab, mes):
+    """Fila de avance del (laboratorio, mes) o None si no hay registro. Una consulta indexada."""
+    return AvanceMensual.objects.filter(laboratorio_id=lab.id, mes=mes).first()
+
+
+def mes_completo(lab, mes):
+    """True si todas las pruebas configuradas del lab tienen Dato en `mes`. Una consulta indexada."""
+    return AvanceMensual.objects.filter(
+        laboratorio_id=lab.id, mes=mes, requeridas__gt=0, capturadas__gte=F('requeridas')
+    ).exists()
+
+
+@transaction.atomic
+def reconstruir_avance(lab_ids=None, meses=None):
+    """
+    Reconstruye AvanceMensual desde LaboratorioPruebaConfig y Dato con consultas agrupadas.
+    Acotable por laboratorios y/o meses. Incluye siempre el mes vigente de los labs
+    con configuración (si entra en `meses`). Devuelve (creadas, actualizadas).
+    """
+    cfgs = LaboratorioPruebaConfig.objects.all()
+    datos = Dato.objects.filter(Exists(
+        LaboratorioPruebaConfig.objects.filter(
+            laboratorio_id=OuterRef('laboratorio_id'), prueba_id=OuterRef('prueba_id')
+        )
+    ))
+    existentes_qs = AvanceMensual.objects.all()
+    if lab_ids is not None:
+        cfgs = cfgs.filter(laboratorio_id__in=lab_ids)
+        datos = datos.filter(laboratorio_id__in=lab_ids)
+        existentes_qs = existentes_qs.filter(laboratorio_id__in=lab_ids)
+    if meses is not None:
+        datos = datos.filter(mes__in=meses)
+        existentes_qs = existentes_qs.filter(mes__in=meses)
+
+    requeridas = {
+        row['laboratorio_id']: row['n']
+        for row in cfgs.values('laboratorio_id').annotate(n=Count('id'))
+    }
+    capturadas = {
+        (row['laboratorio_id'], row['mes']): (row['n'], row['ultima'])
+        for row in datos.values('laboratorio_id', 'mes').annotate(n=Count('id'), ultima=Max('fecha'))
+    }
+    existentes = {(a.laboratorio_id, a.mes): a for a in existentes_qs}
+
+    claves = set(capturadas) | set(existentes)
+    mes_actual = _mes_vigente()
+    if meses is None or mes_actual in meses:
+        claves |= {(lab_id, mes_actual) for lab_id in requeridas}
+
+    ahora = timezone.now()
+    to_create, to_update = [], []
+    for lab_id, mes in claves:
+        req = requeridas.get(lab_id, 0)
+        cap, ultima = capturadas.get((lab_id, mes), (0, None))
+        avance = existentes.get((lab_id, mes))
+        if avance is None:
+            to_create.append(AvanceMensual(laboratorio_id=lab_id, mes=mes, requeridas=req, capturadas=cap,
+                                           ultima_captura=ultima))
+        elif avance.requeridas != req or avance.capturadas != cap or avance.ultima_captura != ultima:
+            avance.requeridas, avance.capturadas, avance.ultima_captura, avance.actualizado_en = req, cap, ultima, ahora
+            to_update.append(avance)
+
+    AvanceMensual.objects.bulk_create(to_create, batch_size=500)
+    AvanceMensual.objects.bulk_update(to_update, ['requeridas', 'capturadas', 'ultima_captura', 'actualizado_en'],
+                                      batch_size=500)
+    return len(to_create), len(to_update)
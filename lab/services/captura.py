@@ -0,0 +1,90 @@
+# lab/services/captura.py
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, QuerySet
+from lab.models import Laboratorio, ProgramaLaboratorio, LaboratorioPruebaConfig, Dato
+
+
+def _grid_cache_key(lab):
+    # La versión viaja en la fila del laboratorio: cualquier proceso que lea el lab
+    # ve la versión vigente, así que una entrada vieja simplemente deja de consultarse.
+    return f"lab:grid:{lab.id}:v{lab.grid_version}"
+
+
+def invalidar_grid(lab_ids):
+    """
+    Incrementa la versión del grid de los laboratorios indicados.
+    Llamar tras escrituras masivas (bulk_create/bulk_update/update) que no disparan señales.
+    """
+    if isinstance(lab_ids, int):
+        lab_ids = [lab_ids]
+    if not isinstance(lab_ids, QuerySet):
+        lab_ids = list(lab_ids)
+        if not lab_ids:
+            return 0
+    return Laboratorio.objects.filter(id__in=lab_ids).update(grid_version=F('grid_version') + 1)
+
+
+def _construir_snapshot(lab):
+    """Programas -> filas y pruebas planas del laboratorio (2 consultas)."""
+    # 1) Configuraciones del lab con prueba, programa y unidad en un solo JOIN
+    cfgs = (LaboratorioPruebaConfig.objects
+            .filter(laboratorio_id=lab)
+            .select_related("prueba_id", "prueba_id__programa_id", "unidad_de_medida_id"))
+
+    filas_por_programa = defaultdict(list)
+    pruebas = []
+    for c in cfgs:
+        p = c.prueba_id
+        unidad = c.unidad_de_medida_id.nombre if c.unidad_de_medida_id else ""
+        filas_por_programa[p.programa_id_id].append({"prueba": p, "unidad": unidad})
+        pruebas.append(p)
+
+    for filas in filas_por_programa.values():
+        filas.sort(key=lambda f: f["prueba"].nombre)
+    pruebas.sort(key=lambda p: (p.programa_id.nombre, p.nombre))
+
+    # 2) Programas asignados (se respeta el orden de asignación)
+    pls = ProgramaLaboratorio.objects.filter(laboratorio_id=lab).select_related("programa_id")
+    grupos = []
+    for pl in pls:
+        filas = filas_por_programa.get(pl.programa_id_id)
+        if not filas:
+            continue
+        grupos.append({"programa": pl.programa_id, "filas": filas})
+
+    return {"programas": grupos, "pruebas": pruebas}
+
+
+def snapshot_grid(lab):
+    """Programas y pruebas configuradas del lab desde la caché versionada (0 consultas si está vigente)."""
+    key = _grid_cache_key(lab)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _construir_snapshot(lab)
+        cache.set(key, snapshot, getattr(settings, 'GRID_CAPTURA_CACHE_TIMEOUT', 60 * 60 * 24))
+    return snapshot
+
+
+def cargar_grid_captura(lab, mes):
+    """
+    Construye la estructura de captura/consulta del laboratorio en un número fijo
+    de consultas, sin importar cuántos programas tenga asignados:
+      - programas: [{'programa': Programa, 'filas': [{'prueba': Prueba, 'unidad': str}]}]
+      - pruebas: pruebas configuradas ordenadas por programa y nombre
+      - datos_por_prueba: {prueba_id: Dato} del mes `mes`
+    La parte estructural (programas/pruebas) se sirve desde caché mientras no cambie
+    `lab.grid_version`; en ese caso solo se consulta Dato.
+    """
+    snapshot = snapshot_grid(lab)
+
+    # Datos del mes (cambian con cada captura; nunca se cachean)
+    datos_list = Dato.objects.filter(laboratorio_id=lab.id, mes=mes)
+    datos_por_prueba = {d.prueba_id_id: d for d in datos_list}
+
+    return {
+        "programas": snapshot["programas"],
+        "pruebas": snapshot["pruebas"],
+        "datos_por_prueba": datos_por_prueba,
+    }
@@ -0,0 +1,66 @@
+# lab/services/catalogos.py
+import hashlib
+import threading
+from django.db.models import F
+from lab.models import Instrumento, MetodoAnalitico, Reactivo, UnidadDeMedida, VersionCatalogo
+
+# tabla (mismo tipo que PropiedadARevisar.tipoElemento) -> (modelo, nombre en el contexto de plantillas)
+CATALOGOS = {
+    "instrumento": (Instrumento, "instrumentos"),
+    "metodo": (MetodoAnalitico, "metodos"),
+    "reactivo": (Reactivo, "reactivos"),
+    "unidad": (UnidadDeMedida, "unidades"),
+}
+TABLA_POR_MODELO = {modelo: tabla for tabla, (modelo, _) in CATALOGOS.items()}
+
+# Caché en proceso: tabla -> (version, lista ordenada por nombre, {id: nombre})
+_cache = {}
+_lock = threading.Lock()
+
+
+def versiones_catalogo():
+    """Versión vigente de cada catálogo (una consulta). Las tablas sin fila valen 0."""
+    versiones = dict.fromkeys(CATALOGOS, 0)
+    versiones.update(VersionCatalogo.objects.filter(tabla__in=CATALOGOS).values_list("tabla", "version"))
+    return versiones
+
+
+def incrementar_version(tabla):
+    """Invalida el catálogo en todos los procesos. Llamar tras bulk_create/update que no disparan señales."""
+    if not VersionCatalogo.objects.filter(tabla=tabla).update(version=F("version") + 1):
+        VersionCatalogo.objects.get_or_create(tabla=tabla, defaults={"version": 1})
+
+
+def etag_catalogos(versiones):
+    firma = ";".join(f"{t}:{v}" for t, v in sorted(versiones.items()))
+    return hashlib.sha1(firma.encode()).hexdigest()[:16]
+
+
+def _catalogo(tabla, version):
+    with _lock:
+        hit = _cache.get(tabla)
+    if hit and hit[0] == version:
+        return hit
+    modelo, _ = CATALOGOS[tabla]
+    lista = list(modelo.objects.all().order_by("nombre"))
+    entrada = (version, lista, {o.id: o.nombre for o in lista})
+    with _lock:
+        _cache[tabla] = entrada
+    return entrada
+
+
+def cargar_catalogos(versiones=None):
+    """
+    Catálogos pre-ordenados por nombre para vistas y plantillas:
+      {'instrumentos': [...], 'metodos': [...], 'reactivos': [...], 'unidades': [...],
+       'nombres': {'instrumento': {id: nombre}, ...}}
+    Con la caché caliente cuesta una sola consulta (las versiones).
+    """
+    if versiones is None:
+        versiones = versiones_catalogo()
+    ctx = {"nombres": {}}
+    for tabla, (_, nombre_ctx) in CATALOGOS.items():
+        _, lista, nombres = _catalogo(tabla, versiones[tabla])
+        ctx[nombre_ctx] = lista
+        ctx["nombres"][tabla] = nombres
+    return ctx
@@ -0,0 +1,167 @@
+# lab/services/configuracion.py
+from django.db import connection
+from django.db.models import Q
+from lab.models import (
+    Laboratorio, LaboratorioPruebaConfig, Prueba, Instrumento, MetodoAnalitico, Reactivo, UnidadDeMedida
+)
+from lab.services.captura import invalidar_grid
+from lab.services.avance import ajustar_avance_por_configs
+from lab.utils.sqlite import transaccion_con_reintentos
+
+# campo FK en LaboratorioPruebaConfig -> (clave en el payload, catálogo)
+CAMPOS_CATALOGO = {
+    "instrumento_id": ("instrumento_id", Instrumento),
+    "metodo_analitico_id": ("metodo_analitico_id", MetodoAnalitico),
+    "reactivo_id": ("reactivo_id", Reactivo),
+    "unidad_de_medida_id": ("unidad_de_medida_id", UnidadDeMedida),
+}
+
+
+def _item_key(it):
+    return str(it.get("config_id") or it.get("prueba_id") or "unknown")
+
+
+def _to_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def guardar_configuraciones_bulk(lab_id, items):
+    """
+    Guarda en bloque configuraciones del laboratorio (modos "create" y "update").
+    - Valida los ids de cada catálogo con una consulta por catálogo
+    - Valida las pruebas (existencia y programa asignado al lab) en una consulta
+    - Resuelve las configuraciones existentes del lab en una consulta
+    - Aplica bulk_create/bulk_update
+    Las lecturas de los pasos 2-4 y la escritura van en una sola transacción (ver
+    _resolver_y_escribir): dos guardados simultáneos del mismo lab no chocan en uq_laboratorio_prueba.
+    Devuelve (saved, errors) con errores por item, igual que la vista original.
+    """
+    saved = []
+    errors = {}
+
+    # 1) Validación de forma por item
+    validos = []
+    for it in items:
+        if not isinstance(it, dict):
+            errors["unknown"] = "Item inválido"
+            continue
+        key = _item_key(it)
+        mode = (it.get("mode") or "").strip().lower()
+        fks = {campo: _to_int(it.get(payload)) for campo, (payload, _) in CAMPOS_CATALOGO.items()}
+
+        if not all(it.get(payload) for payload, _ in CAMPOS_CATALOGO.values()):
+            errors[key] = "Faltan campos obligatorios"
+            continue
+        if any(v is None for v in fks.values()):
+            errors[key] = "Error: ids inválidos"
+            continue
+        if mode == "update":
+            ref = _to_int(it.get("config_id"))
+        elif mode == "create":
+            ref = _to_int(it.get("prueba_id"))
+        else:
+            errors[key] = "Modo inválido"
+            continue
+        if ref is None:
+            errors[key] = "Configuración no encontrada" if mode == "update" else "Error: prueba inválida"
+            continue
+        validos.append((it, key, mode, ref, fks))
+
+    if not validos:
+        return saved, errors
+
+    saved, errores_resolucion = _resolver_y_escribir(lab_id, validos)
+    errors.update(errores_resolucion)
+    return saved, errors
+
+
+@transaccion_con_reintentos
+def _resolver_y_escribir(lab_id, validos):
+    """Pasos 2-5 de guardar_configuraciones_bulk. Se reintenta completa ante SQLITE_BUSY."""
+    saved = []
+    errors = {}
+
+    # Serializa los guardados del mismo lab. En SQLite ya lo hace BEGIN IMMEDIATE (transaction_mode)
+    if connection.features.has_select_for_update:
+        Laboratorio.objects.select_for_update().filter(pk=lab_id).values_list("id", flat=True).first()
+
+    # 2) Validación de FKs: una consulta por catálogo
+    existentes_catalogo = {}
+    for campo, (_, modelo) in CAMPOS_CATALOGO.items():
+        ids = {fks[campo] for _, _, _, _, fks in validos}
+        existentes_catalogo[campo] = set(modelo.objects.filter(id__in=ids).values_list("id", flat=True))
+
+    # Pruebas de los items "create": deben pertenecer a un programa del laboratorio
+    prueba_ids = {ref for _, _, mode, ref, _ in validos if mode == "create"}
+    pruebas_validas = set()
+    if prueba_ids:
+        pruebas_validas = set(
+            Prueba.objects
+            .filter(id__in=prueba_ids, programa_id__laboratorios__laboratorio_id=lab_id)
+            .values_list("id", flat=True)
+        )
+
+    # 3) Configuraciones existentes del lab (por id y por prueba) en una consulta
+    config_ids = {ref for _, _, mode, ref, _ in validos if mode == "update"}
+    cfgs = list(
+        LaboratorioPruebaConfig.objects
+        .filter(laboratorio_id=lab_id)
+        .filter(Q(id__in=config_ids) | Q(prueba_id__in=prueba_ids))
+    )
+    por_id = {c.id: c for c in cfgs}
+    por_prueba = {c.prueba_id_id: c for c in cfgs}
+
+    # 4) Resolver cada item contra lo cargado
+    to_create = {}   # prueba_id -> cfg nuevo
+    to_update = {}   # cfg.id -> cfg
+    resueltos = []   # (it, mode, cfg)
+    for it, key, mode, ref, fks in validos:
+        faltantes = [campo for campo, v in fks.items() if v not in existentes_catalogo[campo]]
+        if faltantes:
+            nombres = ", ".join(c.replace("_id", "").replace("_", " ").title() for c in faltantes)
+            errors[key] = f"Error: no existe {nombres}"
+            continue
+
+        if mode == "update":
+            cfg = por_id.get(ref)
+            if cfg is None:
+                errors[key] = "Configuración no encontrada"
+                continue
+        else:
+            if ref not in pruebas_validas:
+                errors[key] = "Error: la prueba no pertenece al laboratorio"
+                continue
+            cfg = por_prueba.get(ref) or to_create.get(ref)
+            if cfg is None:
+                cfg = LaboratorioPruebaConfig(laboratorio_id_id=lab_id, prueba_id_id=ref)
+                to_create[ref] = cfg
+
+        # Asignación de FKs: usa *_id con enteros para evitar consultas extra
+        for campo, v in fks.items():
+            setattr(cfg, f"{campo}_id", v)
+        if cfg.pk:
+            to_update[cfg.pk] = cfg
+        resueltos.append((it, mode, cfg))
+
+    # 5) Escritura en bloque
+    if to_create:
+        LaboratorioPruebaConfig.objects.bulk_create(list(to_create.values()))
+    if to_update:
+        LaboratorioPruebaConfig.objects.bulk_update(list(to_update.values()), list(CAMPOS_CATALOGO))
+    if to_create or to_update:
+        invalidar_grid(lab_id)  # bulk_* no dispara señales
+    if to_create:
+        # cambia el número de pruebas requeridas
+        ajustar_avance_por_configs(lab_id, list(to_create), 1)
+
+    for it, mode, cfg in resueltos:
+        saved.append({
+            "mode": mode,
+            "config_id": cfg.id,
+            "prueba_id": it.get("prueba_id")
+        })
+
+    return saved, errors
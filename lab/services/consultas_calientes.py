@@ -0,0 +1,128 @@
+# lab/services/consultas_calientes.py
+"""
+Registro de las consultas más frecuentes de la app, usado por `explain_consultas`
+para revisar sus planes (EXPLAIN QUERY PLAN) y detectar recorridos completos de tabla.
+Cada entrada construye su QuerySet a partir de una muestra real de la BD.
+"""
+from datetime import date
+from django.db.models import F
+from django.utils import timezone
+from lab.models import (
+    Laboratorio, ProgramaLaboratorio, LaboratorioPruebaConfig, Dato, AvanceMensual,
+    PropiedadARevisar, CorreoSaliente, EstadisticaRonda, PuntajeZ, Reporte,
+)
+from lab.services.state import labs_para_registro, labs_para_consulta
+from lab.services.series import datos_serie_qs, restar_meses
+from lab.services.monitoreo import tablero_base, tablero_qs
+from lab.utils.propuestas import TIPO_TO_MODEL, filtrar_sin_mayusculas
+
+# nombre -> (constructor(muestra) -> QuerySet, tablas cuyo SCAN es aceptable)
+CONSULTAS = {}
+
+
+def consulta(nombre, permitir_scan=()):
+    def registrar(func):
+        CONSULTAS[nombre] = (func, set(permitir_scan))
+        return func
+    return registrar
+
+
+def muestra():
+    """Ids/valores representativos para parametrizar las consultas (con defaults si la BD está vacía)."""
+    dato = Dato.objects.order_by('-mes').values('laboratorio_id', 'prueba_id', 'mes').first() or {}
+    return {
+        'lab_id': dato.get('laboratorio_id') or Laboratorio.objects.values_list('id', flat=True).first() or 1,
+        'prueba_id': dato.get('prueba_id') or 1,
+        'mes': dato.get('mes') or date.today().replace(day=1),
+        'hoy': date.today(),
+    }
+
+
+@consulta('captura.datos_del_mes')
+def _datos_mes(m):
+    return Dato.objects.filter(laboratorio_id=m['lab_id'], mes=m['mes'])
+
+
+@consulta('captura.configuraciones_del_lab')
+def _cfgs_lab(m):
+    return (LaboratorioPruebaConfig.objects.filter(laboratorio_id=m['lab_id'])
+            .select_related('prueba_id', 'prueba_id__programa_id', 'unidad_de_medida_id'))
+
+
+@consulta('captura.programas_del_lab')
+def _programas_lab(m):
+    return ProgramaLaboratorio.objects.filter(laboratorio_id=m['lab_id']).select_related('programa_id')
+
+
+@consulta('avance.mes_completo')
+def _mes_completo(m):
+    return AvanceMensual.objects.filter(laboratorio_id=m['lab_id'], mes=m['mes'], requeridas__gt=0,
+                                        capturadas__gte=F('requeridas'))
+
+
+# El catálogo de laboratorios es pequeño: recorrerlo por estado es lo esperado
+@consulta('estados.labs_para_registro', permitir_scan={'lab_laboratorio'})
+def _labs_registro(m):
+    return labs_para_registro(m['hoy'])
+
+
+@consulta('estados.labs_para_consulta', permitir_scan={'lab_laboratorio'})
+def _labs_consulta(m):
+    return labs_para_consulta(m['hoy'])
+
+
+@consulta('series.rango_por_pruebas')
+def _serie_rango(m):
+    prueba_ids = list(LaboratorioPruebaConfig.objects.filter(laboratorio_id=m['lab_id'])
+                      .values_list('prueba_id', flat=True)) or [m['prueba_id']]
+    return datos_serie_qs(m['lab_id'], restar_meses(m['mes'], 23), m['mes'], prueba_ids)
+
+
+@consulta('series.etag')
+def _serie_etag(m):
+    return AvanceMensual.objects.filter(laboratorio_id=m['lab_id'], mes__gte=restar_meses(m['mes'], 23),
+                                        mes__lte=m['mes']).values('actualizado_en')
+
+
+# El tablero lista todos los laboratorios: el SCAN de lab_laboratorio es el recorrido esperado
+@consulta('monitoreo.tablero', permitir_scan={'lab_laboratorio'})
+def _tablero(m):
+    return tablero_qs(tablero_base(m['mes'], m['hoy']))[:200]
+
+
+@consulta('propuestas.feed_pendientes')
+def _feed_pendientes(m):
+    return PropiedadARevisar.objects.filter(status=0).order_by('-created_at', '-id')[:21]
+
+
+for _tipo, _modelo in TIPO_TO_MODEL.items():
+    consulta(f'catalogos.{_tipo}_por_nombre')(
+        lambda m, _modelo=_modelo: filtrar_sin_mayusculas(_modelo.objects.all(), 'nombre', 'Nombre X'))
+
+
+@consulta('estadisticas.datos_de_la_ronda')
+def _datos_ronda(m):
+    return Dato.objects.filter(mes=m['mes']).values('prueba_id', 'laboratorio_id', 'valor')
+
+
+@consulta('estadisticas.puntajes_del_lab')
+def _puntajes_lab(m):
+    return PuntajeZ.objects.filter(laboratorio_id=m['lab_id'], mes=m['mes'])
+
+
+@consulta('estadisticas.ronda_de_prueba')
+def _ronda_prueba(m):
+    return EstadisticaRonda.objects.filter(prueba_id=m['prueba_id'], mes=m['mes'])
+
+
+@consulta('reportes.del_lab')
+def _reportes_lab(m):
+    return Reporte.objects.filter(laboratorio_id=m['lab_id'], mes=m['mes'])
+
+
+@consulta('correo.pendientes')
+def _correo_pendientes(m):
+    # Igual que _reclamar_lote: pendientes vencidos y leases vencidos
+    return (CorreoSaliente.objects
+            .filter(estado__in=['pendiente', 'enviando'], proximo_intento__lte=timezone.now())
+            .order_by('proximo_intento', 'id').values_list('id', flat=True)[:100])
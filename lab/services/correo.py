@@ -0,0 +1,124 @@
+# lab/services/correo.py
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from lab.models import CorreoSaliente
+
+
+def encolar_correo(asunto, cuerpo, destinatarios, html=None, remitente=None):
+    """
+    Registra un correo en la bandeja de salida. Llamar dentro de la misma transacción
+    que el cambio que lo origina: si el cambio se revierte, el correo tampoco sale.
+    """
+    destinatarios = [d for d in destinatarios if d]
+    if not destinatarios:
+        return None
+    return CorreoSaliente.objects.create(
+        asunto=asunto,
+        cuerpo=cuerpo,
+        html=html,
+        remitente=remitente or getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        destinatarios=destinatarios,
+    )
+
+
+def _espera_reintento(intentos):
+    base = getattr(settings, 'CORREO_REINTENTO_BASE_SEGUNDOS', 60)
+    tope = getattr(settings, 'CORREO_REINTENTO_MAX_SEGUNDOS', 60 * 60 * 6)
+    return timedelta(seconds=min(base * (2 ** (intentos - 1)), tope))
+
+
+def _registrar_fallo(correo, ex, max_intentos):
+    """Marca un intento fallido; True si el correo queda como 'fallido'."""
+    correo.intentos += 1
+    correo.ultimo_error = f'{type(ex).__name__}: {ex}'
+    if correo.intentos >= max_intentos:
+        correo.estado = 'fallido'
+        return True
+    correo.estado = 'pendiente'
+    correo.proximo_intento = timezone.now() + _espera_reintento(correo.intentos)
+    return False
+
+
+def _reclamar_lote(limite):
+    """
+    Reclama hasta `limite` correos vencidos antes de abrir SMTP: pasan a 'enviando' con un
+    lease en proximo_intento. Dos envíos simultáneos (cron + --loop) nunca toman la misma fila;
+    si un proceso muere a medio lote, sus correos vuelven a ser reclamables al vencer el lease.
+    """
+    ahora = timezone.now()
+    vence = ahora + timedelta(seconds=getattr(settings, 'CORREO_LEASE_SEGUNDOS', 60 * 10))
+    vencidos = Q(estado__in=['pendiente', 'enviando'], proximo_intento__lte=ahora)
+    with transaction.atomic():
+        ids = list(
+            CorreoSaliente.objects.filter(vencidos)
+            .select_for_update(skip_locked=True)
+            .order_by('proximo_intento', 'id')
+            .values_list('id', flat=True)[:limite]
+        )
+        if not ids:
+            return []
+        # El filtro se repite en el UPDATE: solo cuentan las filas que este proceso cambió
+        CorreoSaliente.objects.filter(vencidos, id__in=ids).update(estado='enviando', proximo_intento=vence)
+    return list(CorreoSaliente.objects.filter(id__in=ids, estado='enviando', proximo_intento=vence)
+                .order_by('id'))
+
+
+def enviar_pendientes(limite=100, max_intentos=None):
+    """
+    Envía los correos pendientes vencidos sobre una única conexión SMTP.
+    El lote se reclama primero (ver _reclamar_lote), así que es seguro correr varios envíos a la vez.
+    Los fallos se reprograman con backoff exponencial; al agotar `max_intentos`
+    quedan como 'fallido'. Devuelve (enviados, reintentos, fallidos).
+    """
+    if max_intentos is None:
+        max_intentos = getattr(settings, 'CORREO_MAX_INTENTOS', 5)
+    lote = _reclamar_lote(limite)
+    if not lote:
+        return 0, 0, 0
+
+    enviados = reintentos = fallidos = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as ex:
+        # Servidor caído: se reprograma el lote completo sin intentar mensaje por mensaje
+        for correo in lote:
+            if _registrar_fallo(correo, ex, max_intentos):
+                fallidos += 1
+            else:
+                reintentos += 1
+    else:
+        try:
+            for correo in lote:
+                msg = EmailMultiAlternatives(
+                    subject=correo.asunto,
+                    body=correo.cuerpo,
+                    from_email=correo.remitente,
+                    to=correo.destinatarios,
+                    connection=connection,
+                )
+                if correo.html:
+                    msg.attach_alternative(correo.html, 'text/html')
+                try:
+                    msg.send()
+                except Exception as ex:
+                    if _registrar_fallo(correo, ex, max_intentos):
+                        fallidos += 1
+                    else:
+                        reintentos += 1
+                else:
+                    correo.intentos += 1
+                    correo.estado = 'enviado'
+                    correo.enviado_en = timezone.now()
+                    enviados += 1
+        finally:
+            connection.close()
+
+    CorreoSaliente.objects.bulk_update(
+        lote, ['estado', 'intentos', 'proximo_intento', 'ultimo_error', 'enviado_en']
+    )
+    return enviados, reintentos, fallidos
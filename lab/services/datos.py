@@ -0,0 +1,63 @@
+# lab/services/datos.py
+from django.utils import timezone
+from lab.models import LaboratorioPruebaConfig, Dato
+from lab.services.avance import registrar_capturas
+from lab.utils.sqlite import transaccion_con_reintentos
+
+
+def pruebas_configuradas_ids(lab, prueba_ids=None):
+    """Ids de prueba configurados para el laboratorio (opcionalmente acotados a `prueba_ids`)."""
+    qs = LaboratorioPruebaConfig.objects.filter(laboratorio_id=lab)
+    if prueba_ids is not None:
+        qs = qs.filter(prueba_id__in=prueba_ids)
+    return set(qs.values_list('prueba_id', flat=True))
+
+
+@transaccion_con_reintentos
+def guardar_datos_mes(lab, mes, valores):
+    """
+    Guarda en bloque los valores capturados de un laboratorio para un mes.
+    `valores` es {prueba_id: valor} (se respeta el orden de inserción).
+    - 1 consulta para validar las pruebas contra la configuración del lab
+    - 1 consulta para traer los Dato existentes del mes
+    - bulk_create para nuevos y bulk_update para los que cambiaron
+    - actualiza AvanceMensual en la misma transacción (reintentada si SQLite está ocupada)
+    Devuelve (saved_list, skipped_existing_list, no_configuradas).
+    """
+    saved_list = []              # [{'prueba_id': int, 'valor': float}]
+    skipped_existing_list = []   # [{'prueba_id': int}]
+    if not valores:
+        return saved_list, skipped_existing_list, []
+
+    configuradas = pruebas_configuradas_ids(lab, valores.keys())
+    no_configuradas = [pid for pid in valores if pid not in configuradas]
+
+    existentes = {
+        d.prueba_id_id: d
+        for d in Dato.objects.filter(laboratorio_id=lab.id, mes=mes, prueba_id__in=configuradas)
+    }
+
+    ahora = timezone.now()
+    to_create, to_update = [], []
+    for prueba_id, valor in valores.items():
+        if prueba_id not in configuradas:
+            continue
+        obj = existentes.get(prueba_id)
+        if obj is None:
+            to_create.append(Dato(laboratorio_id_id=lab.id, prueba_id_id=prueba_id, mes=mes, valor=valor))
+            saved_list.append({'prueba_id': prueba_id, 'valor': valor})
+        elif obj.valor != valor:
+            obj.valor, obj.fecha = valor, ahora   # una corrección es una nueva captura
+            to_update.append(obj)
+            saved_list.append({'prueba_id': prueba_id, 'valor': valor})
+        else:
+            skipped_existing_list.append({'prueba_id': prueba_id})
+
+    if to_create:
+        Dato.objects.bulk_create(to_create)
+    if to_update:
+        Dato.objects.bulk_update(to_update, ['valor', 'fecha'])
+    if to_create or to_update:
+        registrar_capturas(lab.id, mes, len(to_create))
+
+    return saved_list, skipped_existing_list, no_configuradas
@@ -0,0 +1,105 @@
+# lab/services/estadisticas.py
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from lab.models import Dato, EstadisticaRonda, PuntajeZ
+
+# Constantes de ISO 13528 (anexo C)
+FACTOR_MAD = 1.483        # MAD -> desviación estándar robusta
+FACTOR_ALG_A = 1.134      # corrección de s* en el Algoritmo A
+DELTA_ALG_A = 1.5         # límite de winsorización δ = 1.5 s*
+
+
+def _medianas_por_grupo(valores, inicios, conteos):
+    """Mediana de cada grupo contiguo de `valores` (ordenado dentro de cada grupo)."""
+    lo = inicios + (conteos - 1) // 2
+    hi = inicios + conteos // 2
+    return (valores[lo] + valores[hi]) / 2.0
+
+
+def estadisticos_por_grupo(grupo, valores, metodo="algoritmo_a", max_iter=50, tol=1e-6):
+    """
+    Estadísticos robustos de todos los grupos en una sola pasada vectorizada.
+    `grupo` y `valores` son arreglos paralelos. Devuelve (claves, n, mediana, mad, x*, s*, orden)
+    donde `orden` reordena las entradas originales por (grupo, valor).
+    """
+    orden = np.lexsort((valores, grupo))
+    g_ord, v_ord = grupo[orden], valores[orden]
+    claves, inicios, conteos = np.unique(g_ord, return_index=True, return_counts=True)
+    idx = np.repeat(np.arange(len(claves)), conteos)  # índice de grupo por elemento
+
+    mediana = _medianas_por_grupo(v_ord, inicios, conteos)
+    desv = np.abs(v_ord - mediana[idx])
+    desv_ord = desv[np.lexsort((desv, idx))]
+    mad = _medianas_por_grupo(desv_ord, inicios, conteos)
+
+    x_est = mediana.copy()
+    s_est = FACTOR_MAD * mad
+    if metodo == "algoritmo_a":
+        gl = np.maximum(conteos - 1, 1)
+        for _ in range(max_iter):
+            delta = DELTA_ALG_A * s_est
+            recortados = np.clip(v_ord, (x_est - delta)[idx], (x_est + delta)[idx])
+            x_nuevo = np.add.reduceat(recortados, inicios) / conteos
+            cuad = np.add.reduceat((recortados - x_nuevo[idx]) ** 2, inicios)
+            s_nuevo = FACTOR_ALG_A * np.sqrt(cuad / gl)
+            convergio = (np.allclose(x_nuevo, x_est, rtol=tol, atol=0)
+                         and np.allclose(s_nuevo, s_est, rtol=tol, atol=0))
+            x_est, s_est = x_nuevo, s_nuevo
+            if convergio:
+                break
+
+    return claves, conteos, mediana, mad, x_est, s_est, orden
+
+
+@transaction.atomic
+def calcular_ronda(mes, metodo="algoritmo_a", min_participantes=None):
+    """
+    Calcula y persiste los estadísticos de consenso y los z-scores de todas las pruebas de `mes`.
+    Carga todos los Dato del mes en arreglos NumPy y resuelve todas las pruebas a la vez.
+    Reemplaza los resultados previos del mes. Devuelve (pruebas, puntajes).
+    """
+    if min_participantes is None:
+        min_participantes = getattr(settings, "ESTADISTICA_MIN_PARTICIPANTES", 3)
+
+    filas = list(Dato.objects.filter(mes=mes).values_list("prueba_id", "laboratorio_id", "valor"))
+    EstadisticaRonda.objects.filter(mes=mes).delete()
+    PuntajeZ.objects.filter(mes=mes).delete()
+    if not filas:
+        return 0, 0
+
+    datos = np.array(filas, dtype=float)
+    prueba_ids = datos[:, 0].astype(np.int64)
+    lab_ids = datos[:, 1].astype(np.int64)
+    valores = datos[:, 2]
+
+    claves, n, mediana, mad, x_est, s_est, orden = estadisticos_por_grupo(prueba_ids, valores, metodo)
+
+    # σpt utilizable: suficientes participantes y dispersión no nula
+    sigma_ok = (n >= min_participantes) & (s_est > 0)
+    sigma = np.where(sigma_ok, s_est, np.nan)
+
+    idx = np.repeat(np.arange(len(claves)), n)
+    v_ord = valores[orden]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (v_ord - x_est[idx]) / sigma[idx]
+
+    EstadisticaRonda.objects.bulk_create([
+        EstadisticaRonda(
+            prueba_id=int(claves[i]), mes=mes, metodo=metodo, n=int(n[i]),
+            mediana=float(mediana[i]), mad=float(mad[i]), valor_asignado=float(x_est[i]),
+            desviacion_pt=float(sigma[i]) if sigma_ok[i] else None,
+        )
+        for i in range(len(claves))
+    ], batch_size=500)
+
+    p_ord, l_ord = prueba_ids[orden], lab_ids[orden]
+    PuntajeZ.objects.bulk_create([
+        PuntajeZ(
+            laboratorio_id=int(l_ord[k]), prueba_id=int(p_ord[k]), mes=mes,
+            valor=float(v_ord[k]), z=None if np.isnan(z[k]) else float(z[k]),
+        )
+        for k in range(len(v_ord))
+    ], batch_size=1000)
+
+    return len(claves), len(v_ord)
@@ -0,0 +1,98 @@
+# lab/services/exportacion.py
+import csv
+from django.conf import settings
+from django.db.models import F, FilteredRelation, Q
+from lab.models import Dato, Prueba
+
+# (encabezado, ruta de campo) de la exportación plana
+COLUMNAS_EXPORT = [
+    ('mes', 'mes'),
+    ('laboratorio_id', 'laboratorio_id'),
+    ('laboratorio_clave', 'laboratorio_id__clave'),
+    ('laboratorio', 'laboratorio_id__nombre'),
+    ('programa', 'prueba_id__programa_id__nombre'),
+    ('prueba_id', 'prueba_id'),
+    ('prueba', 'prueba_id__nombre'),
+    ('valor', 'valor'),
+    ('instrumento', 'cfg__instrumento_id__nombre'),
+    ('metodo', 'cfg__metodo_analitico_id__nombre'),
+    ('reactivo', 'cfg__reactivo_id__nombre'),
+    ('unidad', 'cfg__unidad_de_medida_id__nombre'),
+    ('capturado_en', 'fecha'),
+]
+
+
+class _Eco:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def _chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def datos_export_qs(desde=None, hasta=None, programa_ids=None, lab_ids=None):
+    """
+    Dato filtrado por rango de meses (inclusive), programas y laboratorios, unido en la
+    misma consulta a la configuración del lab para esa prueba (FilteredRelation, LEFT JOIN).
+    """
+    qs = Dato.objects.annotate(
+        cfg=FilteredRelation('laboratorio_id__laboratorios',
+                             condition=Q(laboratorio_id__laboratorios__prueba_id=F('prueba_id'))),
+    )
+    if desde:
+        qs = qs.filter(mes__gte=desde)
+    if hasta:
+        qs = qs.filter(mes__lte=hasta)
+    if programa_ids:
+        qs = qs.filter(prueba_id__programa_id__in=programa_ids)
+    if lab_ids:
+        qs = qs.filter(laboratorio_id__in=lab_ids)
+    return qs
+
+
+def filas_csv(qs):
+    """Genera las líneas CSV (encabezado incluido) leyendo la consulta por bloques."""
+    writer = csv.writer(_Eco())
+    yield writer.writerow([h for h, _ in COLUMNAS_EXPORT])
+    campos = [c for _, c in COLUMNAS_EXPORT]
+    for row in qs.order_by('mes', 'laboratorio_id', 'prueba_id').values_list(*campos).iterator(chunk_size=_chunk_size()):
+        yield writer.writerow(['' if v is None else v for v in row])
+
+
+def filas_csv_pivote(mes, programa_ids=None, lab_ids=None):
+    """
+    Genera un CSV laboratorios × pruebas para un mes. Las columnas se conocen de antemano
+    (una consulta); las filas se arman al vuelo porque los datos vienen ordenados por laboratorio.
+    """
+    # Condiciones sobre `datos` en un mismo filter(): un solo JOIN, ambas sobre el mismo Dato
+    con_datos = {'datos__mes': mes}
+    if lab_ids:
+        con_datos['datos__laboratorio_id__in'] = lab_ids
+    pruebas = Prueba.objects.filter(**con_datos)
+    if programa_ids:
+        pruebas = pruebas.filter(programa_id__in=programa_ids)
+    pruebas = list(pruebas.distinct().order_by('programa_id__nombre', 'nombre')
+                   .values_list('id', 'programa_id__nombre', 'nombre'))
+    columna = {pid: i for i, (pid, _, _) in enumerate(pruebas)}
+
+    writer = csv.writer(_Eco())
+    yield writer.writerow(['laboratorio_id', 'laboratorio_clave', 'laboratorio']
+                          + [f'{prog} / {nombre}' for _, prog, nombre in pruebas])
+
+    qs = datos_export_qs(mes, mes, programa_ids, lab_ids).filter(prueba_id__in=list(columna))
+    actual, fila = None, None
+    for lab_id, clave, nombre, prueba_id, valor in (
+        qs.order_by('laboratorio_id').values_list(
+            'laboratorio_id', 'laboratorio_id__clave', 'laboratorio_id__nombre', 'prueba_id', 'valor')
+        .iterator(chunk_size=_chunk_size())
+    ):
+        if lab_id != actual:
+            if fila is not None:
+                yield writer.writerow(fila)
+            actual, fila = lab_id, [lab_id, clave, nombre] + [''] * len(pruebas)
+        fila[3 + columna[prueba_id]] = valor
+    if fila is not None:
+        yield writer.writerow(fila)
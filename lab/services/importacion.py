@@ -0,0 +1,187 @@
+# lab/services/importacion.py
+import csv
+import io
+import re
+from datetime import date
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from lab.models import Laboratorio, LaboratorioPruebaConfig, Dato
+from lab.services.avance import reconstruir_avance
+
+VALOR_RE = re.compile(r'^[+-]?(?:\d+(?:\.\d*)?|\d*\.\d+)(?:[eE][+-]?\d+)?$')
+BATCH_UPSERT = 500
+
+
+class ImportacionError(ValueError):
+    """El archivo no se puede procesar (encabezados faltantes, codificación, etc.)."""
+
+
+def _abrir_csv(archivo):
+    """
+    Lector DictReader sobre el archivo subido sin cargarlo completo en memoria.
+    Detecta ',' o ';' como separador a partir de la primera línea.
+    """
+    raw = getattr(archivo, 'file', archivo)
+    texto = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+    try:
+        primera = texto.readline()
+    except UnicodeDecodeError:
+        raise ImportacionError('El archivo debe estar codificado en UTF-8')
+    delimitador = ';' if primera.count(';') > primera.count(',') else ','
+    encabezados = [h.strip().lower() for h in next(csv.reader([primera], delimiter=delimitador), [])]
+    return csv.DictReader(texto, fieldnames=encabezados, delimiter=delimitador), encabezados
+
+
+def _parse_mes(valor):
+    yyyy, mm = map(int, valor.strip().split('-')[:2])
+    return date(yyyy, mm, 1)
+
+
+def _leer_filas(archivo, multi_lab, mes_defecto):
+    """
+    Primera pasada (streaming): validación sintáctica de cada fila.
+    Devuelve (filas, errores) con filas = [(num_fila, lab_key, prueba_key, programa, valor, mes)].
+    """
+    reader, encabezados = _abrir_csv(archivo)
+    if 'valor' not in encabezados or not ({'prueba_id', 'prueba'} & set(encabezados)):
+        raise ImportacionError("Encabezados requeridos: 'prueba_id' o 'prueba', y 'valor'")
+    if multi_lab and not ({'laboratorio_id', 'laboratorio_clave'} & set(encabezados)):
+        raise ImportacionError("Encabezados requeridos: 'laboratorio_id' o 'laboratorio_clave'")
+
+    filas, errores = [], []
+    try:
+        for num, row in enumerate(reader, start=2):
+            if not any((v or '').strip() for v in row.values() if isinstance(v, str)):
+                continue
+            crudo = (row.get('valor') or '').strip().replace(',', '.')
+            if not VALOR_RE.match(crudo):
+                errores.append({'fila': num, 'error': 'Valor inválido'})
+                continue
+            try:
+                mes = _parse_mes(row['mes']) if (row.get('mes') or '').strip() else mes_defecto
+            except (ValueError, IndexError):
+                errores.append({'fila': num, 'error': 'Mes inválido (usa YYYY-MM)'})
+                continue
+            if mes is None:
+                errores.append({'fila': num, 'error': 'Falta el mes'})
+                continue
+
+            prueba_id = (row.get('prueba_id') or '').strip()
+            if prueba_id:
+                if not prueba_id.isdigit():
+                    errores.append({'fila': num, 'error': 'prueba_id inválido'})
+                    continue
+                prueba_key = int(prueba_id)
+            else:
+                prueba_key = (row.get('prueba') or '').strip().lower()
+                if not prueba_key:
+                    errores.append({'fila': num, 'error': 'Falta la prueba'})
+                    continue
+
+            lab_key = None
+            if multi_lab:
+                lab_id = (row.get('laboratorio_id') or '').strip()
+                if lab_id:
+                    if not lab_id.isdigit():
+                        errores.append({'fila': num, 'error': 'laboratorio_id inválido'})
+                        continue
+                    lab_key = int(lab_id)
+                else:
+                    lab_key = (row.get('laboratorio_clave') or '').strip().lower()
+                    if not lab_key:
+                        errores.append({'fila': num, 'error': 'Falta el laboratorio'})
+                        continue
+
+            programa = (row.get('programa') or '').strip().lower()
+            filas.append((num, lab_key, prueba_key, programa, float(crudo), mes))
+    except UnicodeDecodeError:
+        raise ImportacionError('El archivo debe estar codificado en UTF-8')
+    except csv.Error as e:
+        raise ImportacionError(f'CSV inválido: {e}')
+    return filas, errores
+
+
+def _indice_configuraciones(lab_ids):
+    """
+    Una consulta: configuraciones de los labs indexadas por id y por nombre de prueba.
+    por_id: {lab_id: {prueba_id}}; por_nombre: {(lab_id, nombre): [(programa, prueba_id)]}
+    """
+    por_id, por_nombre = {}, {}
+    cfgs = (LaboratorioPruebaConfig.objects
+            .filter(laboratorio_id__in=lab_ids)
+            .annotate(nombre_l=Lower('prueba_id__nombre'), programa_l=Lower('prueba_id__programa_id__nombre'))
+            .values_list('laboratorio_id', 'prueba_id', 'nombre_l', 'programa_l'))
+    for lab_id, prueba_id, nombre, programa in cfgs:
+        por_id.setdefault(lab_id, set()).add(prueba_id)
+        por_nombre.setdefault((lab_id, nombre), []).append((programa, prueba_id))
+    return por_id, por_nombre
+
+
+@transaction.atomic
+def importar_datos_csv(archivo, lab=None, mes=None, meses_permitidos=None):
+    """
+    Importa valores desde un CSV (stream) y los escribe con un upsert por lotes sobre
+    uq_dato_lab_prueba_mes. Columnas: prueba_id o prueba (+ programa opcional para
+    desambiguar), valor, mes (YYYY-MM, opcional si se pasa `mes`). Sin `lab`, el archivo
+    es multi-laboratorio y requiere laboratorio_id o laboratorio_clave.
+    Las filas inválidas se omiten y se reportan. Devuelve (guardados, errores).
+    """
+    multi_lab = lab is None
+    filas, errores = _leer_filas(archivo, multi_lab, mes)
+
+    # Resolver laboratorios (1 consulta)
+    if multi_lab:
+        ids = {k for _, k, *_ in filas if isinstance(k, int)}
+        claves = {k for _, k, *_ in filas if isinstance(k, str)}
+        labs = Laboratorio.objects.annotate(clave_l=Lower('clave')).filter(Q(id__in=ids) | Q(clave_l__in=claves))
+        lab_por_key = {}
+        for l_id, clave_l in labs.values_list('id', 'clave_l'):
+            lab_por_key[l_id] = l_id
+            lab_por_key.setdefault(clave_l or '', l_id)
+    else:
+        lab_por_key = {None: lab.id}
+
+    # Validar contra las configuraciones (1 consulta)
+    por_id, por_nombre = _indice_configuraciones(set(lab_por_key.values()))
+    objetos, vistos = {}, set()
+    for num, lab_key, prueba_key, programa, valor, mes_fila in filas:
+        lab_id = lab_por_key.get(lab_key)
+        if lab_id is None:
+            errores.append({'fila': num, 'error': 'Laboratorio no encontrado'})
+            continue
+        if meses_permitidos is not None and mes_fila not in meses_permitidos:
+            errores.append({'fila': num, 'error': 'Mes fuera del periodo de captura'})
+            continue
+        if isinstance(prueba_key, int):
+            prueba_id = prueba_key if prueba_key in por_id.get(lab_id, ()) else None
+        else:
+            candidatos = [pid for prog, pid in por_nombre.get((lab_id, prueba_key), [])
+                          if not programa or prog == programa]
+            if len(candidatos) > 1:
+                errores.append({'fila': num, 'error': 'Nombre de prueba ambiguo; indica programa o prueba_id'})
+                continue
+            prueba_id = candidatos[0] if candidatos else None
+        if prueba_id is None:
+            errores.append({'fila': num, 'error': 'Prueba no configurada para el laboratorio'})
+            continue
+        clave = (lab_id, prueba_id, mes_fila)
+        if clave in vistos:
+            errores.append({'fila': num, 'error': 'Fila duplicada en el archivo'})
+            continue
+        vistos.add(clave)
+        objetos[clave] = Dato(laboratorio_id_id=lab_id, prueba_id_id=prueba_id, mes=mes_fila, valor=valor)
+
+    if objetos:
+        Dato.objects.bulk_create(
+            list(objetos.values()), batch_size=BATCH_UPSERT,
+            update_conflicts=True, unique_fields=['laboratorio_id', 'prueba_id', 'mes'], update_fields=['valor', 'fecha'],
+        )
+        # bulk_create no dispara señales: reconstruir el avance de lo tocado
+        lab_ids, meses = {k[0] for k in objetos}, {k[2] for k in objetos}
+        # (las correcciones renuevan Dato.fecha, así que ultima_captura y actualizado_en
+        # también cambian e invalidan los ETag de las series históricas)
+        reconstruir_avance(lab_ids=lab_ids, meses=meses)
+
+    errores.sort(key=lambda e: e['fila'])
+    return len(objetos), errores
@@ -0,0 +1,86 @@
+# lab/services/membresia.py
+"""
+Laboratorio activo de la petición (request.lab) y pertenencia usuario-laboratorio.
+
+La sesión guarda {lab_id: membresia_version} de los laboratorios del usuario. El lab que
+la petición ya lee trae su versión vigente; cualquier alta/baja en UserLaboratorio la
+incrementa (ver signals.py), así que una versión distinta obliga a releer el conjunto.
+"""
+from django.db.models import F, QuerySet
+from lab.models import Laboratorio
+
+SESION_LAB = 'laboratorio_seleccionado'
+SESION_MEMBRESIAS = 'membresias_lab'
+
+
+def invalidar_membresias(lab_ids):
+    """
+    Incrementa la versión de pertenencia de los laboratorios indicados.
+    Llamar tras escrituras masivas de UserLaboratorio que no disparan señales.
+    """
+    if isinstance(lab_ids, int):
+        lab_ids = [lab_ids]
+    if not isinstance(lab_ids, QuerySet):
+        lab_ids = list(lab_ids)
+        if not lab_ids:
+            return 0
+    return Laboratorio.objects.filter(id__in=lab_ids).update(membresia_version=F('membresia_version') + 1)
+
+
+def refrescar_membresias(request, laboratorios=None):
+    """
+    Guarda en sesión los laboratorios del usuario con su versión (1 consulta).
+    Si la vista ya listó los labs del usuario, se pasan en `laboratorios` y no se consulta.
+    """
+    if laboratorios is None:
+        pares = Laboratorio.objects.filter(usuarios__user_id=request.user).values_list('id', 'membresia_version')
+    else:
+        pares = [(lab.id, lab.membresia_version) for lab in laboratorios]
+    membresias = {str(lab_id): version for lab_id, version in pares}
+    if request.session.get(SESION_MEMBRESIAS) != membresias:
+        request.session[SESION_MEMBRESIAS] = membresias   # solo se reescribe la sesión si cambió
+    return membresias
+
+
+def pertenece(request, lab_id):
+    """
+    ¿`lab_id` está en el conjunto del usuario? Sin consultas si ya está en sesión;
+    un fallo relee una vez (pudo haber un alta posterior al último refresco).
+    """
+    clave = str(lab_id)
+    membresias = request.session.get(SESION_MEMBRESIAS)
+    if membresias is not None and clave in membresias:
+        return True
+    return clave in refrescar_membresias(request)
+
+
+def es_miembro(request, lab):
+    """
+    Pertenencia del usuario a `lab` (instancia). El staff tiene acceso a todo.
+    Sin consultas mientras la versión en sesión coincida con la del laboratorio.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    membresias = request.session.get(SESION_MEMBRESIAS)
+    if membresias is not None and membresias.get(str(lab.id)) == lab.membresia_version:
+        return True
+    # Sin conjunto, lab ausente o versión vieja (alta/baja reciente): releer una vez
+    return str(lab.id) in refrescar_membresias(request)
+
+
+def laboratorio_de_sesion(request):
+    """
+    Laboratorio seleccionado en sesión si el usuario sigue perteneciendo a él (1 consulta).
+    Una selección inválida se descarta para no repetir la comprobación en cada petición.
+    """
+    lab_id = request.session.get(SESION_LAB)
+    if not lab_id or not request.user.is_authenticated:
+        return None
+    lab = Laboratorio.objects.filter(pk=lab_id).first()
+    if lab is None or not es_miembro(request, lab):
+        request.session.pop(SESION_LAB, None)
+        return None
+    return lab
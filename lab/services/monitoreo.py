@@ -0,0 +1,79 @@
+# lab/services/monitoreo.py
+"""
+Tablero de la ronda para staff: una fila por laboratorio con estado, ventanas, avance,
+última captura y reporte del mes. Todo sale de una consulta sobre Laboratorio con LEFT JOIN
+a AvanceMensual y Reporte (por sus índices únicos) y las ventanas resueltas en SQL.
+"""
+from django.db.models import BooleanField, Case, Count, F, FilteredRelation, Q, Value, When
+from django.db.models.functions import Coalesce, NullIf
+from lab.models import Laboratorio
+
+COLUMNAS_TABLERO = (
+    'id', 'nombre', 'clave', 'estado', 'edicion_abierta', 'captura_abierta',
+    'requeridas', 'capturadas', 'ultima_captura', 'reporte_estado', 'reporte_archivo',
+)
+
+
+def _vigente(activa, hasta, hoy):
+    return Q(**{activa: True}) & (Q(**{f'{hasta}__isnull': True}) | Q(**{f'{hasta}__gte': hoy}))
+
+
+def _q_edicion(hoy):
+    return Q(limite_edicion__gte=hoy.day) | _vigente('override_edicion_activa', 'override_edicion_hasta', hoy)
+
+
+def _q_captura(hoy):
+    return Q(corte__gte=hoy.day) | _vigente('override_captura_activa', 'override_captura_hasta', hoy)
+
+
+def tablero_base(mes, hoy, estado=None, incompletos=False, buscar=None):
+    """
+    Laboratorios anotados para `mes` (primer día). Mismos criterios que
+    get_allow_edit_now / puede_capturar_datos, evaluados en SQL para poder filtrar y ordenar.
+    """
+    qs = (Laboratorio.objects
+          .annotate(
+              avance_mes=FilteredRelation('avances', condition=Q(avances__mes=mes)),
+              reporte_mes=FilteredRelation('reportes', condition=Q(reportes__mes=mes, reportes__tipo='mensual')),
+          )
+          .alias(
+              limite_edicion=Coalesce(NullIf(F('edicion_hasta_dia'), Value(0)), Value(15)),
+              corte=Coalesce(NullIf(F('corte_captura_dia'), Value(0)), Value(25)),
+          )
+          .annotate(
+              edicion_abierta=Case(When(_q_edicion(hoy), then=Value(True)), default=Value(False),
+                                   output_field=BooleanField()),
+              captura_abierta=Case(When(_q_captura(hoy), then=Value(True)), default=Value(False),
+                                   output_field=BooleanField()),
+              requeridas=Coalesce(F('avance_mes__requeridas'), Value(0)),
+              capturadas=Coalesce(F('avance_mes__capturadas'), Value(0)),
+              ultima_captura=F('avance_mes__ultima_captura'),
+              reporte_estado=F('reporte_mes__estado'),
+              reporte_archivo=F('reporte_mes__archivo'),
+          ))
+    if estado:
+        qs = qs.filter(estado=estado)
+    if incompletos:
+        qs = qs.filter(Q(requeridas=0) | Q(capturadas__lt=F('requeridas')))
+    if buscar:
+        qs = qs.filter(Q(nombre__icontains=buscar) | Q(clave__icontains=buscar))
+    return qs
+
+
+def tablero_qs(base):
+    """Filas del tablero como dicts (sin instanciar modelos), ordenadas por nombre."""
+    return base.order_by('nombre', 'id').values(*COLUMNAS_TABLERO)
+
+
+def resumen_tablero(base, hoy):
+    """
+    Totales del tablero (1 consulta agregada sobre el mismo queryset, sin paginar).
+    La ventana se filtra con la condición y no con la anotación booleana: dentro de
+    FILTER Django la referencia por su alias y SQLite lo toma como un literal.
+    """
+    return base.order_by().aggregate(
+        total=Count('id'),
+        completos=Count('id', filter=Q(requeridas__gt=0, capturadas__gte=F('requeridas'))),
+        captura_abierta=Count('id', filter=_q_captura(hoy)),
+        con_reporte=Count('id', filter=Q(reporte_estado='completado')),
+    )
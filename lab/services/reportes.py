@@ -0,0 +1,162 @@
+# lab/services/reportes.py
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from django.core.files import File
+from django.db import connections, transaction
+from django.utils import timezone
+from lab.models import (
+    Laboratorio, LaboratorioPruebaConfig, Dato, EstadisticaRonda, PuntajeZ, Reporte
+)
+from lab.utils.pdf import renderizar_reporte
+
+
+def _periodo(mes, tipo):
+    if tipo == 'anual':
+        inicio = date(mes.year, 1, 1)
+        return inicio, date(mes.year + 1, 1, 1), f'{mes.year}'
+    inicio = mes.replace(day=1)
+    fin = date(inicio.year + (inicio.month == 12), inicio.month % 12 + 1, 1)
+    return inicio, fin, f'{inicio:%Y-%m}'
+
+
+def cargar_payloads(mes, tipo='mensual', lab_ids=None):
+    """
+    Arma en el proceso principal los datos de cada reporte (tipos simples, serializables)
+    con un número fijo de consultas. Devuelve (inicio, payloads).
+    """
+    inicio, fin, periodo = _periodo(mes, tipo)
+    datos = Dato.objects.filter(mes__gte=inicio, mes__lt=fin)
+    cfgs = LaboratorioPruebaConfig.objects.all()
+    puntajes = PuntajeZ.objects.filter(mes__gte=inicio, mes__lt=fin)
+    labs = Laboratorio.objects.all()
+    if lab_ids is not None:
+        datos = datos.filter(laboratorio_id__in=lab_ids)
+        cfgs = cfgs.filter(laboratorio_id__in=lab_ids)
+        puntajes = puntajes.filter(laboratorio_id__in=lab_ids)
+        labs = labs.filter(id__in=lab_ids)
+
+    unidades = {
+        (lab_id, prueba_id): unidad or ''
+        for lab_id, prueba_id, unidad in cfgs.values_list('laboratorio_id', 'prueba_id', 'unidad_de_medida_id__nombre')
+    }
+    z_por = {(l, p, m): z for l, p, m, z in puntajes.values_list('laboratorio_id', 'prueba_id', 'mes', 'z')}
+    stats = {
+        (p, m): (x, s)
+        for p, m, x, s in EstadisticaRonda.objects.filter(mes__gte=inicio, mes__lt=fin)
+        .values_list('prueba_id', 'mes', 'valor_asignado', 'desviacion_pt')
+    }
+
+    # lab -> programa -> prueba -> [(mes, valor)]
+    arbol = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    nombres_programa, nombres_prueba = {}, {}
+    for row in datos.values_list(
+        'laboratorio_id', 'prueba_id', 'mes', 'valor',
+        'prueba_id__nombre', 'prueba_id__programa_id', 'prueba_id__programa_id__nombre',
+    ):
+        lab_id, prueba_id, m, valor, prueba_nombre, programa_id, programa_nombre = row
+        arbol[lab_id][programa_id][prueba_id].append((m, valor))
+        nombres_programa[programa_id] = programa_nombre
+        nombres_prueba[prueba_id] = prueba_nombre
+
+    titulo = 'Reporte anual' if tipo == 'anual' else 'Reporte mensual'
+    payloads = []
+    for lab in labs.filter(id__in=list(arbol)).values('id', 'nombre', 'clave'):
+        programas = []
+        for programa_id in sorted(arbol[lab['id']], key=lambda pid: nombres_programa[pid]):
+            filas = []
+            por_prueba = arbol[lab['id']][programa_id]
+            for prueba_id in sorted(por_prueba, key=lambda pid: nombres_prueba[pid]):
+                valores = por_prueba[prueba_id]
+                unidad = unidades.get((lab['id'], prueba_id), '')
+                if tipo == 'anual':
+                    vs = [v for _, v in valores]
+                    zs = [abs(z) for m, _ in valores
+                          if (z := z_por.get((lab['id'], prueba_id, m))) is not None]
+                    filas.append({
+                        'prueba': nombres_prueba[prueba_id], 'unidad': unidad, 'meses': len(vs),
+                        'promedio': sum(vs) / len(vs), 'minimo': min(vs), 'maximo': max(vs),
+                        'z_abs_medio': sum(zs) / len(zs) if zs else None,
+                    })
+                else:
+                    m, valor = valores[0]
+                    asignado, sigma = stats.get((prueba_id, m), (None, None))
+                    filas.append({
+                        'prueba': nombres_prueba[prueba_id], 'unidad': unidad, 'valor': valor,
+                        'asignado': asignado, 'sigma': sigma, 'z': z_por.get((lab['id'], prueba_id, m)),
+                    })
+            programas.append({'id': programa_id, 'nombre': nombres_programa[programa_id], 'filas': filas})
+        payloads.append({
+            'lab_id': lab['id'], 'lab_nombre': lab['nombre'], 'lab_clave': lab['clave'],
+            'tipo': tipo, 'titulo': f"{titulo} {periodo}", 'periodo': periodo,
+            'programas': programas,
+            'prueba_ids': sorted(pid for por_prueba in arbol[lab['id']].values() for pid in por_prueba),
+        })
+    return inicio, payloads
+
+
+def _guardar_reporte(payload, ruta, mes, tipo):
+    """Sube el PDF al storage en streaming y marca el reporte como completado en una transacción."""
+    nombre = f"{payload['titulo']} - {payload['lab_nombre']}"
+    rep, _ = Reporte.objects.get_or_create(
+        laboratorio_id=payload['lab_id'], tipo=tipo, mes=mes,
+        defaults={'nombre': nombre, 'fecha': timezone.localdate(), 'estado': 'trabajando'},
+    )
+    anterior = rep.archivo.name if rep.archivo else None
+    filename = f"reporte_{tipo}_{payload['periodo']}_{payload['lab_clave'] or payload['lab_id']}.pdf"
+    storage = rep.archivo.storage
+    with open(ruta, 'rb') as fh:
+        guardado = storage.save(rep.archivo.field.generate_filename(rep, filename), File(fh))
+
+    with transaction.atomic():
+        rep = Reporte.objects.select_for_update().get(pk=rep.pk)
+        rep.archivo.name = guardado
+        rep.nombre = nombre
+        rep.estado = 'completado'
+        rep.fecha = timezone.localdate()
+        rep.save(update_fields=['archivo', 'nombre', 'estado', 'fecha'])
+        rep.programas.set([p['id'] for p in payload['programas']])
+        rep.pruebas.set(payload['prueba_ids'])
+
+    if anterior and anterior != guardado:
+        storage.delete(anterior)
+    return rep
+
+
+def generar_reportes(mes, tipo='mensual', lab_ids=None, workers=None, on_progress=None):
+    """
+    Genera los reportes del periodo para todos los laboratorios con datos (o `lab_ids`).
+    El renderizado se reparte en un pool de procesos; la subida y el cambio de estado
+    se hacen en el proceso principal, uno por reporte. Devuelve la lista de Reporte generados.
+    """
+    inicio, payloads = cargar_payloads(mes, tipo, lab_ids)
+    if not payloads:
+        return []
+
+    generados = []
+    directorio = tempfile.mkdtemp(prefix='evaluat-reportes-')
+    try:
+        if workers == 1:
+            for payload in payloads:
+                ruta = renderizar_reporte(payload, directorio)
+                generados.append(_guardar_reporte(payload, ruta, inicio, tipo))
+                os.remove(ruta)
+                on_progress and on_progress(generados[-1])
+        else:
+            # Los workers no tocan la BD; no heredar conexiones abiertas
+            connections.close_all()
+            # Se envía una función de lab.utils.pdf (no importa Django): con el arranque
+            # `spawn` (Windows/macOS) cada worker reimporta el módulo antes de django.setup()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futuros = {pool.submit(renderizar_reporte, p, directorio): p for p in payloads}
+                for fut in as_completed(futuros):
+                    payload, ruta = futuros[fut], fut.result()
+                    generados.append(_guardar_reporte(payload, ruta, inicio, tipo))
+                    os.remove(ruta)
+                    on_progress and on_progress(generados[-1])
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    return generados
@@ -0,0 +1,101 @@
+# lab/services/series.py
+"""
+Series históricas de Dato por laboratorio y prueba (sparklines y tendencias).
+Se leen con un rango sobre el índice cubriente (laboratorio, prueba, mes, valor), sin tocar
+la tabla, y los rangos largos se agregan en cubetas de meses de tamaño fijo.
+"""
+import hashlib
+import math
+from collections import defaultdict
+from datetime import date
+from django.conf import settings
+from django.db.models import Max
+from lab.models import Dato, AvanceMensual
+
+
+def _indice_mes(mes):
+    return mes.year * 12 + mes.month - 1
+
+
+def _mes_de_indice(i):
+    return date(i // 12, i % 12 + 1, 1)
+
+
+def meses_entre(desde, hasta):
+    """Número de meses del rango cerrado [desde, hasta]."""
+    return _indice_mes(hasta) - _indice_mes(desde) + 1
+
+
+def restar_meses(mes, n):
+    return _mes_de_indice(_indice_mes(mes) - n)
+
+
+def tamano_cubeta(desde, hasta, puntos):
+    """Meses por cubeta para que el rango quepa en `puntos` (1 = sin agregar)."""
+    return max(1, math.ceil(meses_entre(desde, hasta) / max(1, puntos)))
+
+
+def datos_serie_qs(lab_id, desde, hasta, prueba_ids=None):
+    """
+    (prueba_id, mes, valor) del rango. Solo columnas de dato_serie_idx y sin ORDER BY: con
+    ORDER BY + IN, SQLite prefiere el índice único (sin valor) y vuelve a leer la tabla.
+    """
+    qs = Dato.objects.filter(laboratorio_id=lab_id, mes__gte=desde, mes__lte=hasta)
+    if prueba_ids is not None:
+        qs = qs.filter(prueba_id__in=prueba_ids)
+    return qs.order_by().values_list('prueba_id', 'mes', 'valor')
+
+
+def serie_datos(lab_id, desde, hasta, prueba_ids=None, puntos=None):
+    """
+    Valores del laboratorio entre `desde` y `hasta` (primeros de mes, inclusive). 1 consulta.
+    Devuelve {'cubeta_meses': k, 'series': {prueba_id: {...}}} con listas paralelas:
+      - k == 1: 'meses' ('YYYY-MM') y 'valores'
+      - k > 1:  'meses' (inicio de cubeta), 'valores' (promedio), 'min', 'max' y 'n'
+    Las cubetas se alinean en `desde` y solo se incluyen las que tienen datos; el orden
+    se resuelve aquí (la consulta no ordena, ver datos_serie_qs).
+    """
+    puntos = puntos or getattr(settings, 'SERIE_PUNTOS_DEFAULT', 24)
+    k = tamano_cubeta(desde, hasta, puntos)
+
+    base = _indice_mes(desde)
+    cubetas = defaultdict(dict)       # {prueba_id: {cubeta: [suma, min, max, n]}}
+    for prueba_id, mes, valor in datos_serie_qs(lab_id, desde, hasta, prueba_ids).iterator(chunk_size=2000):
+        b = (_indice_mes(mes) - base) // k
+        acc = cubetas[prueba_id].get(b)
+        if acc is None:
+            cubetas[prueba_id][b] = [valor, valor, valor, 1]
+        else:
+            acc[0] += valor
+            acc[1] = min(acc[1], valor)
+            acc[2] = max(acc[2], valor)
+            acc[3] += 1
+
+    series = {}
+    for prueba_id, por_cubeta in cubetas.items():
+        orden = sorted(por_cubeta)
+        serie = {
+            'meses': [_mes_de_indice(base + b * k).strftime('%Y-%m') for b in orden],
+            'valores': [por_cubeta[b][0] / por_cubeta[b][3] for b in orden],
+        }
+        if k > 1:
+            serie['min'] = [por_cubeta[b][1] for b in orden]
+            serie['max'] = [por_cubeta[b][2] for b in orden]
+            serie['n'] = [por_cubeta[b][3] for b in orden]
+        series[prueba_id] = serie
+    return {'cubeta_meses': k, 'series': series}
+
+
+def etag_serie(lab_id, desde, hasta, prueba_ids, puntos):
+    """
+    ETag de una serie: parámetros + último AvanceMensual.actualizado_en del lab en el rango
+    (1 consulta sobre el índice único (laboratorio, mes), sin leer Dato). La captura renueva
+    el del mes vigente y la importación CSV el de los meses que corrige, así que un rango de
+    meses cerrados conserva su ETag mientras nadie corrija esos meses.
+    """
+    actualizado = (AvanceMensual.objects
+                   .filter(laboratorio_id=lab_id, mes__gte=desde, mes__lte=hasta)
+                   .aggregate(m=Max('actualizado_en'))['m'])
+    firma = (f"{lab_id}:{desde:%Y-%m}:{hasta:%Y-%m}:{puntos}:"
+             f"{','.join(map(str, sorted(prueba_ids or [])))}:{actualizado.timestamp() if actualizado else 0}")
+    return hashlib.sha1(firma.encode()).hexdigest()[:16]
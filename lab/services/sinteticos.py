@@ -0,0 +1,193 @@
+# lab/services/sinteticos.py
+"""
+Población sintética para pruebas de carga: inserciones por lotes y semilla fija,
+de modo que dos corridas con los mismos parámetros generan exactamente los mismos datos.
+"""
+from datetime import timedelta
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from lab.models import (
+    Laboratorio, UserLaboratorio, Programa, ProgramaLaboratorio, Prueba, LaboratorioPruebaConfig,
+    Instrumento, MetodoAnalitico, Reactivo, UnidadDeMedida, PropiedadARevisar, Dato, Reporte,
+)
+from lab.services.avance import reconstruir_avance
+from lab.services.captura import invalidar_grid
+from lab.services.catalogos import CATALOGOS, incrementar_version
+
+CATALOGO_MODELOS = [
+    ('instrumento_id', Instrumento, 'Instrumento'),
+    ('metodo_analitico_id', MetodoAnalitico, 'Método'),
+    ('reactivo_id', Reactivo, 'Reactivo'),
+    ('unidad_de_medida_id', UnidadDeMedida, 'Unidad'),
+]
+
+
+def _mes_menos(mes, n):
+    total = mes.year * 12 + mes.month - 1 - n
+    return mes.replace(year=total // 12, month=total % 12 + 1, day=1)
+
+
+def _lotes(iterable, tamano):
+    lote = []
+    for obj in iterable:
+        lote.append(obj)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+@transaction.atomic
+def generar_poblacion(labs=50, programas=10, pruebas_por_programa=12, programas_por_lab=6, meses=24,
+                      catalogo=20, usuarios_por_lab=2, propuestas=200, cobertura=0.97, semilla=2024,
+                      prefijo='Sintético', lote=5000, on_progress=None):
+    """
+    Genera laboratorios con usuarios, programas y pruebas, catálogos, configuración completa,
+    `meses` meses de Dato (hasta el mes anterior), reportes mensuales y propuestas.
+    Todo va en bloques de `lote` filas; los valores siguen un modelo de ronda: valor verdadero por prueba y mes, sesgo por
+    laboratorio, ruido proporcional y ~2% de valores atípicos. Devuelve {modelo: filas}.
+    """
+    rng = np.random.default_rng(semilla)
+    avisar = on_progress or (lambda *_: None)
+    conteo = {}
+    hoy = timezone.localdate()
+    mes_actual = hoy.replace(day=1)
+    User = get_user_model()
+
+    # ----- Catálogos, programas y pruebas -----
+    catalogos = {}
+    for campo, modelo, etiqueta in CATALOGO_MODELOS:
+        catalogos[campo] = modelo.objects.bulk_create(
+            [modelo(nombre=f'{prefijo} {etiqueta} {i + 1}') for i in range(catalogo)], batch_size=lote)
+        conteo[modelo.__name__] = catalogo
+
+    progs = Programa.objects.bulk_create(
+        [Programa(nombre=f'{prefijo} Programa {i + 1}') for i in range(programas)], batch_size=lote)
+    pruebas = Prueba.objects.bulk_create([
+        Prueba(programa_id=p, nombre=f'{prefijo} Prueba {i + 1}.{j + 1}')
+        for i, p in enumerate(progs) for j in range(pruebas_por_programa)
+    ], batch_size=lote)
+    pruebas_por_prog = {p.id: pruebas[i * pruebas_por_programa:(i + 1) * pruebas_por_programa]
+                        for i, p in enumerate(progs)}
+    conteo.update({'Programa': len(progs), 'Prueba': len(pruebas)})
+    avisar('catálogos, programas y pruebas', len(pruebas))
+
+    # ----- Laboratorios, usuarios y membresías -----
+    corte = rng.integers(20, 29, size=labs)
+    laboratorios = Laboratorio.objects.bulk_create([
+        Laboratorio(nombre=f'{prefijo} Laboratorio {i + 1:04d}', clave=f'SIN{semilla % 1000:03d}-{i + 1:04d}',
+                    estado=2, edicion_hasta_dia=15, corte_captura_dia=int(corte[i]))
+        for i in range(labs)
+    ], batch_size=lote)
+    password = make_password(None)   # inutilizable; se asigna con changepassword si hace falta
+    usuarios = User.objects.bulk_create([
+        User(username=f'sintetico-{semilla}-{i + 1:04d}-{u + 1}', email=f'lab{i + 1}.{u + 1}@example.com',
+             password=password)
+        for i in range(labs) for u in range(usuarios_por_lab)
+    ], batch_size=lote)
+    UserLaboratorio.objects.bulk_create([
+        UserLaboratorio(user_id=usuario, laboratorio=laboratorios[n // usuarios_por_lab])
+        for n, usuario in enumerate(usuarios)
+    ], batch_size=lote)
+    conteo.update({'Laboratorio': labs, 'User': len(usuarios), 'UserLaboratorio': len(usuarios)})
+    avisar('laboratorios y usuarios', labs)
+
+    # ----- Programas asignados y configuración completa -----
+    asignaciones, cfgs = [], []
+    for i, lab in enumerate(laboratorios):
+        elegidos = rng.choice(len(progs), size=min(programas_por_lab, len(progs)), replace=False)
+        for k in sorted(elegidos):
+            prog = progs[k]
+            asignaciones.append(ProgramaLaboratorio(laboratorio_id=lab, programa_id=prog))
+            for prueba in pruebas_por_prog[prog.id]:
+                sel = rng.integers(0, catalogo, size=4)
+                cfgs.append(LaboratorioPruebaConfig(
+                    laboratorio_id=lab, prueba_id=prueba,
+                    **{campo: catalogos[campo][int(s)] for (campo, _, _), s in zip(CATALOGO_MODELOS, sel)},
+                ))
+    ProgramaLaboratorio.objects.bulk_create(asignaciones, batch_size=lote)
+    LaboratorioPruebaConfig.objects.bulk_create(cfgs, batch_size=lote)
+    conteo.update({'ProgramaLaboratorio': len(asignaciones), 'LaboratorioPruebaConfig': len(cfgs)})
+    avisar('configuraciones', len(cfgs))
+
+    # ----- Dato: verdadero por (prueba, mes) + sesgo del lab + ruido + atípicos -----
+    indice_prueba = {p.id: n for n, p in enumerate(pruebas)}
+    meses_lista = [_mes_menos(mes_actual, m) for m in range(meses, 0, -1)]
+    base = rng.lognormal(mean=3.0, sigma=1.2, size=len(pruebas))                 # escala por prueba
+    verdadero = base[:, None] * (1 + rng.normal(0, 0.05, size=(len(pruebas), meses)))
+    sesgo_lab = rng.normal(0, 0.02, size=labs)
+    pos_lab = {lab.id: n for n, lab in enumerate(laboratorios)}
+    lab_de_cfg = np.fromiter((pos_lab[c.laboratorio_id_id] for c in cfgs), dtype=np.int64, count=len(cfgs))
+    prueba_de_cfg = np.fromiter((indice_prueba[c.prueba_id_id] for c in cfgs), dtype=np.int64, count=len(cfgs))
+
+    # Dato es la tabla grande: se inserta con executemany sobre tuplas ya adaptadas.
+    # bulk_create gasta >85% del tiempo construyendo instancias y compilando el INSERT.
+    ops, qn = connection.ops, connection.ops.quote_name
+    campos = [Dato._meta.get_field(f) for f in ('laboratorio_id', 'prueba_id', 'mes', 'valor', 'fecha')]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        qn(Dato._meta.db_table), ', '.join(qn(f.column) for f in campos), ', '.join(['%s'] * len(campos)))
+    fecha = ops.adapt_datetimefield_value(timezone.now())
+    lab_ids = np.fromiter((c.laboratorio_id_id for c in cfgs), dtype=np.int64, count=len(cfgs))
+    prueba_ids = np.fromiter((c.prueba_id_id for c in cfgs), dtype=np.int64, count=len(cfgs))
+
+    # Matriz (configuración × mes); las filas salen en orden (lab, prueba, mes), el del índice único,
+    # para que las inserciones sean casi secuenciales en los índices
+    forma = (len(cfgs), len(meses_lista))
+    presentes = rng.random(forma) < cobertura
+    atipico = np.where(rng.random(forma) < 0.02, rng.choice([0.5, 1.5, 3.0], size=forma), 1.0)
+    valores = np.round(verdadero[prueba_de_cfg, :] * (1 + sesgo_lab[lab_de_cfg, None]
+                       + rng.normal(0, 0.03, size=forma)) * atipico, 4)
+    meses_db = np.array([ops.adapt_datefield_value(mes) for mes in meses_lista], dtype=object)
+
+    def datos():
+        for inicio in range(0, len(cfgs), 1000):
+            filas, cols = np.nonzero(presentes[inicio:inicio + 1000])
+            filas += inicio
+            yield from zip(lab_ids[filas].tolist(), prueba_ids[filas].tolist(), meses_db[cols].tolist(),
+                           valores[filas, cols].tolist(), [fecha] * len(filas))
+
+    total = 0
+    with connection.cursor() as cursor:
+        for bloque in _lotes(datos(), lote):
+            cursor.executemany(sql, bloque)
+            total += len(bloque)
+            avisar('dato', total)
+    conteo['Dato'] = total
+
+    # ----- Reportes mensuales (en trabajo: sin archivo) -----
+    reportes = Reporte.objects.bulk_create([
+        Reporte(laboratorio=lab, mes=mes, tipo='mensual', estado='trabajando',
+                fecha=_mes_menos(mes, -1), nombre=f'Reporte mensual {mes:%Y-%m} - {lab.nombre}')
+        for lab in laboratorios for mes in meses_lista
+    ], batch_size=lote)
+    conteo['Reporte'] = len(reportes)
+
+    # ----- Propuestas con estados y fechas repartidas -----
+    tipos = [t for t, _ in PropiedadARevisar.TIPO_ELEMENTO_CHOICES]
+    status = rng.choice([0, 1, 2], size=propuestas, p=[0.3, 0.5, 0.2])
+    autor = rng.integers(0, max(1, len(usuarios)), size=propuestas)
+    ahora = timezone.now()
+    props = PropiedadARevisar.objects.bulk_create([
+        PropiedadARevisar(
+            tipoElemento=tipos[i % len(tipos)], valor=f'{prefijo} propuesta {i + 1}', status=int(status[i]),
+            propuesto_por=usuarios[int(autor[i])] if usuarios else None,
+            resolved_at=ahora if status[i] else None,
+        )
+        for i in range(propuestas)
+    ], batch_size=lote)
+    # created_at es auto_now_add: se reparte en el tiempo para que la paginación sea realista
+    for n, p in enumerate(props):
+        p.created_at = ahora - timedelta(hours=int(n * 7 % (24 * 30 * max(meses, 1))))
+    PropiedadARevisar.objects.bulk_update(props, ['created_at'], batch_size=lote)
+    conteo['PropiedadARevisar'] = len(props)
+
+    # ----- Derivados: bulk_create no dispara señales -----
+    reconstruir_avance(lab_ids=[lab.id for lab in laboratorios])
+    invalidar_grid([lab.id for lab in laboratorios])
+    for tabla in CATALOGOS:
+        incrementar_version(tabla)
+    return conteo
@@ -2,7 +2,10 @@
 from datetime import date
 from django.utils import timezone
 from django.db import transaction
-from lab.models import Laboratorio, Prueba, Dato
+from django.db.models import Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Coalesce, NullIf
+from lab.models import Laboratorio, AvanceMensual
+from lab.services.avance import mes_completo
 
 def today_local():
     return timezone.localdate()
@@ -11,25 +14,65 @@ def first_of_month(d: date) -> date:
     return date(d.year, d.month, 1)
 
 def filled_all_month(lab: Laboratorio, mes: date) -> bool:
-    total_pruebas = Prueba.objects.count()
-    capturadas = Dato.objects.filter(laboratorio=lab, mes=mes).count()
-    return total_pruebas > 0 and capturadas >= total_pruebas
+    return mes_completo(lab, mes)
+
+def labs_para_registro(today: date):
+    """1 -> 2: ventana de edición cerrada (día > edicion_hasta_dia) y sin override de edición vigente."""
+    ed_override = Q(override_edicion_activa=True) & (
+        Q(override_edicion_hasta__isnull=True) | Q(override_edicion_hasta__gte=today)
+    )
+    return (Laboratorio.objects
+            .filter(estado=1)
+            .alias(limite=Coalesce(NullIf(F('edicion_hasta_dia'), Value(0)), Value(15)))
+            .filter(limite__lt=today.day)
+            .exclude(ed_override))
+
+def labs_para_consulta(today: date):
+    """2 -> 3: ventana de captura cerrada (día > corte_captura_dia), sin override de captura vigente y mes completo."""
+    mes = first_of_month(today)
+    cap_override = Q(override_captura_activa=True) & (
+        Q(override_captura_hasta__isnull=True) | Q(override_captura_hasta__gte=today)
+    )
+    completo = AvanceMensual.objects.filter(
+        laboratorio_id=OuterRef('pk'), mes=mes, requeridas__gt=0, capturadas__gte=F('requeridas')
+    )
+    return (Laboratorio.objects
+            .filter(estado=2)
+            .alias(corte=Coalesce(NullIf(F('corte_captura_dia'), Value(0)), Value(25)))
+            .filter(corte__lt=today.day)
+            .exclude(cap_override)
+            .filter(Exists(completo)))
 
 @transaction.atomic
-def avanzar_estado_si_corresponde(lab: Laboratorio, mes: date, today: date | None = None) -> Laboratorio:
+def avanzar_estados(today: date | None = None, lab_ids=None, dry_run: bool = False) -> dict:
+    """
+    Evalúa las transiciones 1→2 y 2→3 para todos los laboratorios (o `lab_ids`)
+    con un SELECT y un UPDATE por transición. Devuelve {'1->2': [...], '2->3': [...]}
+    con id/nombre de los laboratorios afectados; con dry_run no escribe nada.
+    """
     if today is None:
         today = today_local()
+    transiciones = {
+        '1->2': (labs_para_registro(today), 2),
+        '2->3': (labs_para_consulta(today), 3),
+    }
+    # Se evalúan ambas antes de escribir: un lab no avanza dos estados en la misma corrida
+    reporte, pendientes = {}, []
+    for nombre, (qs, nuevo_estado) in transiciones.items():
+        if lab_ids is not None:
+            qs = qs.filter(id__in=lab_ids)
+        filas = list(qs.values('id', 'nombre'))
+        reporte[nombre] = filas
+        pendientes.append((qs, [f['id'] for f in filas], nuevo_estado))
 
-    # 1 -> 2 al llegar al día 16 si no hay override de edición
-    ed_override = lab.override_edicion_activa and (lab.override_edicion_hasta is None or today <= lab.override_edicion_hasta)
-    if lab.estado == 1 and not ed_override and today.day >= 16:
-        lab.estado = 2
-        lab.save(update_fields=['estado', 'actualizado_en'])
-
-    # 2 -> 3 por completitud sin override de captura
-    cap_override = lab.override_captura_activa and (lab.override_captura_hasta is None or today <= lab.override_captura_hasta)
-    if lab.estado == 2 and not cap_override and filled_all_month(lab, mes):
-        lab.estado = 3
-        lab.save(update_fields=['estado', 'actualizado_en'])
+    if not dry_run:
+        for qs, ids, nuevo_estado in pendientes:
+            if ids:
+                qs.filter(id__in=ids).update(estado=nuevo_estado)
+    return reporte
 
+def avanzar_estado_si_corresponde(lab: Laboratorio, mes: date | None = None, today: date | None = None) -> Laboratorio:
+    """Aplica a un solo laboratorio las mismas reglas que `avanzar_estados`."""
+    avanzar_estados(today=today, lab_ids=[lab.id])
+    lab.refresh_from_db(fields=['estado'])
     return lab
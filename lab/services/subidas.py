@@ -0,0 +1,155 @@
+# lab/services/subidas.py
+"""
+Subida por partes (reanudable) de PDFs de reporte:
+  1) iniciar_subida -> sesión con tamaño de parte y total de partes
+  2) recibir_parte(n) -> la parte n se escribe en streaming al archivo temporal
+  3) finalizar_subida -> se valida, se sube al storage y se crea/actualiza el Reporte
+Si la conexión se corta, el cliente consulta la sesión y reanuda en `partes_recibidas`.
+"""
+import os
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from lab.models import Reporte, SubidaReporte
+
+PDF_MAGIC = b'%PDF-'
+BLOQUE_LECTURA = 64 * 1024
+
+
+class SubidaError(ValueError):
+    def __init__(self, mensaje, status=400, campo='non_field'):
+        super().__init__(mensaje)
+        self.status = status
+        self.campo = campo
+
+
+def _directorio():
+    ruta = getattr(settings, 'REPORTE_SUBIDAS_DIR', os.path.join(tempfile.gettempdir(), 'evaluat-subidas'))
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+def iniciar_subida(lab, mes, tipo, nombre, nombre_archivo, tamano, usuario=None):
+    max_bytes = getattr(settings, 'REPORTE_MAX_BYTES', 100 * 1024 * 1024)
+    if tamano <= len(PDF_MAGIC):
+        raise SubidaError('Archivo vacío', campo='tamano')
+    if tamano > max_bytes:
+        raise SubidaError(f'El archivo excede el máximo de {max_bytes // (1024 * 1024)} MB', campo='tamano')
+    if tipo == 'anual':
+        mes = mes.replace(month=1, day=1)
+
+    subida = SubidaReporte(
+        laboratorio=lab, usuario=usuario, tipo=tipo, mes=mes, nombre=nombre,
+        nombre_archivo=os.path.basename(nombre_archivo or 'reporte.pdf'), tamano=tamano,
+        tamano_parte=getattr(settings, 'REPORTE_TAMANO_PARTE', 1024 * 1024),
+    )
+    subida.ruta_temporal = os.path.join(_directorio(), f'{subida.id}.part')
+    open(subida.ruta_temporal, 'wb').close()
+    subida.save()
+    return subida
+
+
+def recibir_parte(subida, n, stream, longitud):
+    """
+    Escribe la parte `n` leyendo `stream` por bloques (sin cargarla en memoria).
+    Reenviar una parte ya confirmada es idempotente; saltarse partes devuelve 409.
+    """
+    if subida.estado != 'subiendo':
+        raise SubidaError('La subida ya no está activa', status=409)
+    if n > subida.partes_recibidas or n >= subida.total_partes:
+        raise SubidaError(f'Se esperaba la parte {subida.partes_recibidas}', status=409)
+
+    inicio = n * subida.tamano_parte
+    esperado = min(subida.tamano_parte, subida.tamano - inicio)
+    if longitud != esperado:
+        raise SubidaError(f'La parte {n} debe medir {esperado} bytes', campo='parte')
+
+    with open(subida.ruta_temporal, 'r+b') as fh:
+        fh.seek(inicio)
+        restante, cabecera = esperado, b''
+        while restante:
+            bloque = stream.read(min(BLOQUE_LECTURA, restante))
+            if not bloque:
+                raise SubidaError(f'La parte {n} llegó incompleta', campo='parte')
+            if n == 0 and len(cabecera) < len(PDF_MAGIC):
+                cabecera += bloque[:len(PDF_MAGIC) - len(cabecera)]
+                if not PDF_MAGIC.startswith(cabecera):
+                    raise SubidaError('Solo PDF es permitido', campo='archivo')
+            fh.write(bloque)
+            restante -= len(bloque)
+
+    # Confirmar solo si es la siguiente parte esperada (reenvíos no mueven el contador)
+    if n == subida.partes_recibidas:
+        SubidaReporte.objects.filter(pk=subida.pk, partes_recibidas=n).update(
+            partes_recibidas=n + 1, actualizado_en=timezone.now())
+        subida.partes_recibidas = n + 1
+    return subida
+
+
+def finalizar_subida(subida):
+    """
+    Sube el temporal al storage y crea (o reemplaza el archivo de) el Reporte del periodo.
+    La subida se reclama primero con un UPDATE condicional: si llegan dos finalizar a la vez
+    (p. ej. un reintento del cliente) solo uno avanza y el otro recibe 409.
+    """
+    if subida.estado != 'subiendo':
+        raise SubidaError('La subida ya no está activa', status=409)
+    if subida.partes_recibidas < subida.total_partes:
+        raise SubidaError(f'Faltan partes: recibidas {subida.partes_recibidas} de {subida.total_partes}', status=409)
+    if not SubidaReporte.objects.filter(pk=subida.pk, estado='subiendo').update(
+            estado='finalizando', actualizado_en=timezone.now()):
+        raise SubidaError('La subida ya no está activa', status=409)
+
+    # Desde aquí el temporal es de esta petición
+    storage = Reporte._meta.get_field('archivo').storage
+    guardado = None
+    try:
+        if os.path.getsize(subida.ruta_temporal) != subida.tamano:
+            raise SubidaError('El tamaño recibido no coincide', status=409)
+        with open(subida.ruta_temporal, 'rb') as fh:
+            periodo = Reporte(laboratorio=subida.laboratorio, tipo=subida.tipo, mes=subida.mes)
+            guardado = storage.save(periodo.archivo.field.generate_filename(periodo, subida.nombre_archivo), File(fh))
+
+        with transaction.atomic():
+            rep, _ = Reporte.objects.select_for_update().get_or_create(
+                laboratorio=subida.laboratorio, tipo=subida.tipo, mes=subida.mes,
+                defaults={'nombre': subida.nombre, 'fecha': timezone.localdate()},
+            )
+            anterior = rep.archivo.name if rep.archivo else None
+            rep.archivo.name = guardado
+            rep.nombre = subida.nombre
+            rep.estado = 'completado'
+            rep.fecha = timezone.localdate()
+            rep.save()
+            SubidaReporte.objects.filter(pk=subida.pk).update(
+                estado='completado', reporte=rep, actualizado_en=timezone.now())
+    except Exception:
+        # Liberar la subida para que el cliente pueda reintentar, sin dejar huérfano en el storage
+        if guardado:
+            storage.delete(guardado)
+        SubidaReporte.objects.filter(pk=subida.pk, estado='finalizando').update(
+            estado='subiendo', actualizado_en=timezone.now())
+        raise
+
+    subida.estado = 'completado'
+    os.remove(subida.ruta_temporal)
+    if anterior and anterior != guardado:
+        storage.delete(anterior)
+    return rep
+
+
+def limpiar_subidas_vencidas(horas=None):
+    """Cancela las subidas sin actividad y borra sus temporales. Devuelve cuántas se cancelaron."""
+    horas = horas or getattr(settings, 'REPORTE_SUBIDA_EXPIRA_HORAS', 24)
+    # 'finalizando' vencida: el proceso que la reclamó murió antes de terminar
+    vencidas = SubidaReporte.objects.filter(
+        estado__in=['subiendo', 'finalizando'], actualizado_en__lt=timezone.now() - timedelta(hours=horas))
+    n = 0
+    for pk, ruta, estado in vencidas.values_list('pk', 'ruta_temporal', 'estado'):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        n += SubidaReporte.objects.filter(pk=pk, estado=estado).update(estado='cancelado')
+    return n
@@ -0,0 +1,94 @@
+# lab/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from lab.models import (
+    ProgramaLaboratorio, LaboratorioPruebaConfig, Prueba, Programa, Dato, UserLaboratorio,
+    Instrumento, MetodoAnalitico, Reactivo, UnidadDeMedida
+)
+from lab.services.captura import invalidar_grid
+from lab.services.avance import recalcular_avance, ajustar_avance_por_configs
+from lab.services.catalogos import incrementar_version, TABLA_POR_MODELO
+from lab.services.membresia import invalidar_membresias
+
+
+# --------------------------
+# Invalidación del grid de captura por laboratorio
+# (admin, vistas de configuración y asignación de programas pasan por aquí)
+# --------------------------
+@receiver([post_save, post_delete], sender=LaboratorioPruebaConfig)
+@receiver([post_save, post_delete], sender=ProgramaLaboratorio)
+def invalidar_grid_por_lab(sender, instance, **kwargs):
+    invalidar_grid(instance.laboratorio_id_id)
+
+
+@receiver(post_save, sender=Prueba)
+def invalidar_grid_por_prueba(sender, instance, created, **kwargs):
+    if created:
+        return  # una prueba nueva aún no está configurada en ningún lab
+    invalidar_grid(
+        LaboratorioPruebaConfig.objects.filter(prueba_id=instance).values('laboratorio_id')
+    )
+
+
+@receiver(post_save, sender=Programa)
+def invalidar_grid_por_programa(sender, instance, created, **kwargs):
+    if created:
+        return
+    invalidar_grid(
+        ProgramaLaboratorio.objects.filter(programa_id=instance).values('laboratorio_id')
+    )
+
+
+@receiver(post_save, sender=UnidadDeMedida)
+def invalidar_grid_por_unidad(sender, instance, created, **kwargs):
+    if created:
+        return
+    invalidar_grid(
+        LaboratorioPruebaConfig.objects.filter(unidad_de_medida_id=instance).values('laboratorio_id')
+    )
+
+
+# --------------------------
+# Mantenimiento de AvanceMensual en escrituras individuales (admin, shell).
+# Las rutas en bloque (captura, guardado masivo) lo actualizan explícitamente.
+# --------------------------
+@receiver([post_save, post_delete], sender=Dato)
+def actualizar_avance_por_dato(sender, instance, **kwargs):
+    recalcular_avance(instance.laboratorio_id_id, instance.mes)
+
+
+@receiver(post_save, sender=LaboratorioPruebaConfig)
+def actualizar_avance_por_config_creada(sender, instance, created, **kwargs):
+    if created:
+        ajustar_avance_por_configs(instance.laboratorio_id_id, [instance.prueba_id_id], 1)
+
+
+@receiver(post_delete, sender=LaboratorioPruebaConfig)
+def actualizar_avance_por_config_eliminada(sender, instance, **kwargs):
+    ajustar_avance_por_configs(instance.laboratorio_id_id, [instance.prueba_id_id], -1)
+
+
+# --------------------------
+# Versión de catálogos: cualquier alta/edición/baja invalida la caché de todos los procesos
+# --------------------------
+@receiver([post_save, post_delete], sender=Instrumento)
+@receiver([post_save, post_delete], sender=MetodoAnalitico)
+@receiver([post_save, post_delete], sender=Reactivo)
+@receiver([post_save, post_delete], sender=UnidadDeMedida)
+def invalidar_catalogo(sender, instance, **kwargs):
+    incrementar_version(TABLA_POR_MODELO[sender])
+
+
+# --------------------------
+# Pertenencia usuario-laboratorio: invalida los conjuntos cacheados en sesión
+# --------------------------
+@receiver(pre_save, sender=UserLaboratorio)
+def invalidar_membresias_lab_anterior(sender, instance, **kwargs):
+    if instance.pk:
+        # Reasignación desde el admin: el lab anterior también pierde al usuario
+        invalidar_membresias(UserLaboratorio.objects.filter(pk=instance.pk).values('laboratorio_id'))
+
+
+@receiver([post_save, post_delete], sender=UserLaboratorio)
+def invalidar_membresias_por_usuario(sender, instance, **kwargs):
+    invalidar_membresias(instance.laboratorio_id)
@@ -0,0 +1,63 @@
+"""
+Moderación de propuestas en lote desde el admin (acciones aprobar/rechazar).
+
+    python manage.py test lab.tests.test_propuestas
+"""
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from lab.models import PropiedadARevisar, Reactivo
+
+
+class ModeracionEnLoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.proponente = User.objects.create_user('proponente', 'p@example.com', 'x')
+        cls.moderador = User.objects.create_superuser('moderador', 'm@example.com', 'x')
+        cls.antes = timezone.now() - timedelta(days=3)
+        cls.aprobada = PropiedadARevisar.objects.create(
+            tipoElemento='reactivo', valor='Reactivo aprobado', status=1, propuesto_por=cls.proponente,
+            resolved_by=cls.proponente, resolved_at=cls.antes)
+        Reactivo.objects.create(nombre='Reactivo aprobado')
+        cls.pendientes = [
+            PropiedadARevisar.objects.create(tipoElemento='reactivo', valor=f'Reactivo {i}', propuesto_por=cls.proponente)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.moderador)
+
+    def _accion(self, accion, propuestas):
+        return self.client.post(reverse('admin:lab_propiedadarevisar_changelist'), {
+            'action': accion,
+            '_selected_action': [p.pk for p in propuestas],
+        }, follow=True)
+
+    def test_rechazar_seleccion_mixta_no_toca_aprobadas(self):
+        r = self._accion('rechazar_propuestas', [self.aprobada, *self.pendientes])
+
+        aprobada = PropiedadARevisar.objects.get(pk=self.aprobada.pk)
+        self.assertEqual(aprobada.status, 1)
+        self.assertEqual(aprobada.resolved_by, self.proponente)
+        self.assertEqual(aprobada.resolved_at, self.antes)
+        self.assertTrue(Reactivo.objects.filter(nombre='Reactivo aprobado').exists())
+
+        rechazadas = PropiedadARevisar.objects.filter(pk__in=[p.pk for p in self.pendientes])
+        self.assertEqual({p.status for p in rechazadas}, {2})
+        self.assertEqual({p.resolved_by_id for p in rechazadas}, {self.moderador.pk})
+
+        mensaje = [str(m) for m in get_messages(r.wsgi_request)]
+        self.assertIn('Propuestas rechazadas: 3.', mensaje[0])
+        self.assertIn('ya aprobadas', mensaje[0])
+
+    def test_aprobar_crea_solo_los_faltantes(self):
+        self._accion('aprobar_y_materializar', [self.aprobada, *self.pendientes])
+
+        self.assertEqual(PropiedadARevisar.objects.filter(status=1).count(), 4)
+        self.assertEqual(Reactivo.objects.filter(nombre__startswith='Reactivo').count(), 4)
+        self.assertEqual(PropiedadARevisar.objects.get(pk=self.aprobada.pk).resolved_at, self.antes)
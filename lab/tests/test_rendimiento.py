@@ -0,0 +1,237 @@
+"""
+Presupuestos de consultas y latencia por vista sobre un dataset realista.
+
+    python manage.py test lab.tests.test_rendimiento
+    BENCHMARK_GRABAR=1 python manage.py test lab.tests.test_rendimiento   # regraba presupuestos.json
+
+Cada vista se mide con la caché vacía (consultas_frias) y luego en caliente
+(consultas y mediana de latencia en ms). La prueba falla si alguna medición supera
+el presupuesto grabado; BENCHMARK_FACTOR_LATENCIA escala los ms en máquinas lentas.
+"""
+import json
+import os
+import statistics
+import time
+from datetime import date
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from lab.models import (
+    Laboratorio, UserLaboratorio, Programa, ProgramaLaboratorio, Prueba, LaboratorioPruebaConfig,
+    Instrumento, MetodoAnalitico, Reactivo, UnidadDeMedida, PropiedadARevisar, Dato, Reporte,
+)
+from lab.services.avance import reconstruir_avance
+
+PRESUPUESTOS = Path(__file__).with_name('presupuestos.json')
+GRABAR = os.environ.get('BENCHMARK_GRABAR') == '1'
+FACTOR_LATENCIA = float(os.environ.get('BENCHMARK_FACTOR_LATENCIA', '1'))
+REPETICIONES = 5
+HOLGURA_MS = 3.0      # al grabar: presupuesto = max(medido * 3, medido + 20 ms)
+
+N_LABS, N_PROGRAMAS, PRUEBAS_POR_PROGRAMA, PROGRAMAS_POR_LAB, N_MESES = 40, 8, 12, 6, 12
+N_CATALOGO, N_PROPUESTAS = 15, 60
+
+# mediciones de la corrida (nivel módulo: los atributos de setUpTestData se copian por prueba)
+RESULTADOS = {}
+
+
+def _mes_anterior(mes, n):
+    total = mes.year * 12 + mes.month - 1 - n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+@tag('benchmark')
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class PresupuestoVistasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        hoy = timezone.localdate()
+        cls.mes = hoy.replace(day=1)
+
+        catalogos = [
+            Instrumento.objects.bulk_create([Instrumento(nombre=f'Instrumento {i}') for i in range(N_CATALOGO)]),
+            MetodoAnalitico.objects.bulk_create([MetodoAnalitico(nombre=f'Método {i}') for i in range(N_CATALOGO)]),
+            Reactivo.objects.bulk_create([Reactivo(nombre=f'Reactivo {i}') for i in range(N_CATALOGO)]),
+            UnidadDeMedida.objects.bulk_create([UnidadDeMedida(nombre=f'Unidad {i}') for i in range(N_CATALOGO)]),
+        ]
+        programas = Programa.objects.bulk_create([Programa(nombre=f'Programa {i}') for i in range(N_PROGRAMAS)])
+        pruebas_por_programa = {
+            p.id: Prueba.objects.bulk_create([
+                Prueba(programa_id=p, nombre=f'Prueba {p.nombre[-1]}.{j}') for j in range(PRUEBAS_POR_PROGRAMA)
+            ])
+            for p in programas
+        }
+        labs = Laboratorio.objects.bulk_create([
+            Laboratorio(nombre=f'Laboratorio {i:02d}', clave=f'LAB{i:02d}', estado=2,
+                        edicion_hasta_dia=31, corte_captura_dia=31)
+            for i in range(N_LABS)
+        ])
+        cls.lab = labs[0]
+
+        cls.usuario = User.objects.create_user('bench', 'bench@example.com', 'x')
+        cls.multi = User.objects.create_user('bench-multi', 'multi@example.com', 'x')
+        cls.staff = User.objects.create_user('bench-staff', 'staff@example.com', 'x', is_staff=True)
+        UserLaboratorio.objects.bulk_create(
+            [UserLaboratorio(user_id=cls.usuario, laboratorio=cls.lab)]
+            + [UserLaboratorio(user_id=cls.multi, laboratorio=lab) for lab in labs[:5]]
+        )
+
+        pls, cfgs = [], []
+        for i, lab in enumerate(labs):
+            for k in range(PROGRAMAS_POR_LAB):
+                prog = programas[(i + k) % N_PROGRAMAS]
+                pls.append(ProgramaLaboratorio(laboratorio_id=lab, programa_id=prog))
+                for n, prueba in enumerate(pruebas_por_programa[prog.id]):
+                    # el lab principal deja un programa sin configurar (pruebas pendientes en estado 1)
+                    if lab is cls.lab and k == PROGRAMAS_POR_LAB - 1:
+                        continue
+                    cfgs.append(LaboratorioPruebaConfig(
+                        laboratorio_id=lab, prueba_id=prueba,
+                        **{campo: cat[(i + n) % N_CATALOGO] for campo, cat in zip(
+                            ('instrumento_id', 'metodo_analitico_id', 'reactivo_id', 'unidad_de_medida_id'), catalogos)},
+                    ))
+        ProgramaLaboratorio.objects.bulk_create(pls)
+        LaboratorioPruebaConfig.objects.bulk_create(cfgs, batch_size=1000)
+
+        datos = [
+            Dato(laboratorio_id_id=c.laboratorio_id_id, prueba_id_id=c.prueba_id_id,
+                 mes=_mes_anterior(cls.mes, m), valor=100 + (c.id * 7 + m) % 13)
+            for c in cfgs for m in range(1, N_MESES + 1)
+        ]
+        Dato.objects.bulk_create(datos, batch_size=2000)
+        reconstruir_avance()
+
+        for m in range(1, N_MESES + 1):
+            rep = Reporte.objects.create(laboratorio=cls.lab, mes=_mes_anterior(cls.mes, m), tipo='mensual',
+                                         nombre=f'Reporte {m}', fecha=hoy, estado='trabajando')
+            rep.programas.set(programas[:PROGRAMAS_POR_LAB])
+            rep.pruebas.set(pruebas_por_programa[programas[0].id])
+
+        PropiedadARevisar.objects.bulk_create([
+            PropiedadARevisar(tipoElemento='reactivo', valor=f'Propuesta {i}', status=i % 3, propuesto_por=cls.usuario)
+            for i in range(N_PROPUESTAS)
+        ])
+
+        cls.cfgs_lab = list(LaboratorioPruebaConfig.objects.filter(laboratorio_id=cls.lab)
+                            .values_list('id', 'prueba_id', 'instrumento_id', 'metodo_analitico_id',
+                                         'reactivo_id', 'unidad_de_medida_id'))
+        cls.catalogo_ids = [[o.id for o in cat] for cat in catalogos]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if GRABAR and RESULTADOS:
+            actuales = json.loads(PRESUPUESTOS.read_text(encoding='utf-8')) if PRESUPUESTOS.exists() else {}
+            actuales.update(RESULTADOS)
+            PRESUPUESTOS.write_text(json.dumps(actuales, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+
+    def setUp(self):
+        # Flujo real: con un solo laboratorio, select_lab lo deja en sesión junto con la pertenencia
+        self.client.force_login(self.usuario)
+        self.client.get(reverse('lab:select_lab'))
+
+    def _estado(self, estado):
+        Laboratorio.objects.filter(pk=self.lab.pk).update(estado=estado)
+
+    def medir(self, nombre, peticion, status=200):
+        """Corre `peticion(i)` con caché vacía y REPETICIONES veces en caliente; compara con el presupuesto."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as frias:
+            r = peticion(0)
+        self.assertEqual(r.status_code, status, f'{nombre}: status {r.status_code}')
+
+        tiempos, calientes = [], 0
+        for i in range(1, REPETICIONES + 1):
+            with CaptureQueriesContext(connection) as q:
+                inicio = time.perf_counter()
+                r = peticion(i)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            self.assertEqual(r.status_code, status, f'{nombre}: status {r.status_code}')
+            calientes = len(q)
+
+        medido = {'consultas_frias': len(frias), 'consultas': calientes, 'ms': round(statistics.median(tiempos), 1)}
+        if GRABAR:
+            RESULTADOS[nombre] = {
+                'consultas_frias': medido['consultas_frias'],
+                'consultas': medido['consultas'],
+                'ms': round(max(medido['ms'] * HOLGURA_MS, medido['ms'] + 20)),
+            }
+            return medido
+
+        presupuestos = json.loads(PRESUPUESTOS.read_text(encoding='utf-8'))
+        self.assertIn(nombre, presupuestos, f'{nombre}: sin presupuesto grabado (usa BENCHMARK_GRABAR=1)')
+        p = presupuestos[nombre]
+        self.assertLessEqual(medido['consultas_frias'], p['consultas_frias'],
+                             f"{nombre}: {medido['consultas_frias']} consultas en frío (presupuesto {p['consultas_frias']})")
+        self.assertLessEqual(medido['consultas'], p['consultas'],
+                             f"{nombre}: {medido['consultas']} consultas (presupuesto {p['consultas']})")
+        self.assertLessEqual(medido['ms'], p['ms'] * FACTOR_LATENCIA,
+                             f"{nombre}: {medido['ms']} ms (presupuesto {p['ms'] * FACTOR_LATENCIA:.0f} ms)")
+        return medido
+
+    # ----- LabMainView por estado -----
+    def test_labmain_estado_1(self):
+        self._estado(1)
+        self.medir('labmain_estado_1', lambda i: self.client.get(reverse('lab:labmainview')))
+
+    def test_labmain_estado_2(self):
+        self._estado(2)
+        self.medir('labmain_estado_2', lambda i: self.client.get(reverse('lab:labmainview')))
+
+    def test_labmain_estado_3(self):
+        self._estado(3)
+        self.medir('labmain_estado_3', lambda i: self.client.get(reverse('lab:labmainview')))
+
+    # ----- Otras vistas -----
+    def test_reportes(self):
+        self.medir('reportes', lambda i: self.client.get(reverse('lab:reports')))
+
+    def test_accept_configurations(self):
+        self._estado(1)
+        self.medir('accept_configurations', lambda i: self.client.get(reverse('lab:accept_configurations')))
+
+    def test_lab_data_entry(self):
+        def peticion(i):
+            valores = {f'valor_{prueba_id}': str(50 + i) for _, prueba_id, *_ in self.cfgs_lab}
+            return self.client.post(reverse('lab:lab_data_entry'), valores)
+        self.medir('lab_data_entry', peticion)
+
+    def test_bulk_save_configs(self):
+        instrumentos = self.catalogo_ids[0]
+
+        def peticion(i):
+            items = [{
+                'mode': 'update', 'config_id': cfg_id,
+                'instrumento_id': instrumentos[(n + i) % N_CATALOGO], 'metodo_analitico_id': met,
+                'reactivo_id': rea, 'unidad_de_medida_id': uni,
+            } for n, (cfg_id, _, _, met, rea, uni) in enumerate(self.cfgs_lab)]
+            return self.client.post(reverse('lab:bulk_save_configs'), json.dumps(items),
+                                    content_type='application/json')
+        self.medir('bulk_save_configs', peticion)
+
+    def test_series_datos(self):
+        # Sparklines de la revisión: todas las pruebas configuradas, 24 meses
+        self.medir('series_datos', lambda i: self.client.get(reverse('lab:series_datos')))
+
+    def test_monitoreo_staff(self):
+        self.client.force_login(self.staff)
+        self.medir('monitoreo_staff', lambda i: self.client.get(reverse('monitoreo')))
+
+    def test_select_lab(self):
+        self.client.force_login(self.multi)
+        self.medir('select_lab', lambda i: self.client.get(reverse('lab:select_lab')))
+
+    def test_select_lab_post(self):
+        self.client.force_login(self.multi)
+        self.medir('select_lab_post', lambda i: self.client.post(
+            reverse('lab:select_lab'), {'laboratorio_id': self.lab.id}), status=302)
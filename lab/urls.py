@@ -14,15 +14,27 @@ urlpatterns = [
     path("select-lab/", views.select_lab, name='select_lab'), # protegida con login_required
     path('lab/route/', views.lab_route, name='lab_route'),        # decide landing por estado
     path('lab/data-entry/', views.lab_data_entry, name='lab_data_entry'),  # captura de datos
+    path('lab/data-import/', views.lab_import_csv, name='lab_import_csv'),
     path("accept-configurations/", views.accept_configurations, name='accept_configurations'),
     path('propose-property/', views.propose_property, name='propose_property'),  # propuestas desde modal
     path('lab/report-upload/', views.ReportUploadView.as_view(), name='lab_report_upload'),
+    path('lab/report-upload/start/', views.reporte_subida_iniciar, name='reporte_subida_iniciar'),
+    path('lab/report-upload/<uuid:subida_id>/', views.reporte_subida_estado, name='reporte_subida_estado'),
+    path('lab/report-upload/<uuid:subida_id>/<int:n>/', views.reporte_subida_parte, name='reporte_subida_parte'),
+    path('lab/report-upload/<uuid:subida_id>/finalize/', views.reporte_subida_finalizar, name='reporte_subida_finalizar'),
     path('lab/report-list/', views.ReportListView.as_view(), name='lab_report_list'),
+    path('lab/reportes/<int:reporte_id>/pdf/', views.descargar_reporte, name='descargar_reporte'),
+    path('lab/series/', views.series_datos_json, name='series_datos'),
     path('proposals/accept/', views.proposal_accept, name='proposal_accept'),
     path('propuestas/mias/', views.MisPropuestasListView.as_view(), name='mis_propuestas'),
+    path('propuestas/feed/', views.propuestas_feed, name='propuestas_feed'),
     path('proposals/reject/', views.proposal_reject, name='proposal_reject'),
     path("lab/reports/", views.ReportesView.as_view(), name="reports"),
     path("config/bulk-save/", views.bulk_save_configs, name="bulk_save_configs"),
     path('lab/staff/toggle-edit/', views.staff_toggle_edit_window, name='staff_toggle_edit'),
+    path('catalogos/', views.catalogos_json, name='catalogos_json'),
+    path('staff/export/datos.csv', views.exportar_datos_csv, name='exportar_datos_csv'),
+    path('staff/import/datos/', views.staff_import_csv, name='staff_import_csv'),
+    path('staff/programas/asignar/', views.staff_asignar_programas, name='staff_asignar_programas'),
     # path('propose-property/', views.propose_property, name='propose_property'),
 ]
\ No newline at end of file
@@ -0,0 +1,99 @@
+# lab/utils/descargas.py
+"""
+Entrega de archivos protegidos: respuestas condicionales (ETag/Last-Modified -> 304),
+rangos de bytes (206) y delegación de la transferencia al servidor web frontal.
+
+REPORTE_DESCARGA_MODO:
+  - 'django' (default): el archivo se lee en bloques desde el storage.
+  - 'x-sendfile': Apache/lighttpd con mod_xsendfile (ruta absoluta en X-Sendfile).
+  - 'x-accel': nginx; X-Accel-Redirect = REPORTE_X_ACCEL_PREFIJO + nombre en el storage
+    (location `internal` que apunta a MEDIA_ROOT).
+"""
+import re
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+BLOQUE = 64 * 1024
+RANGO_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_rango(header, tamano):
+    """
+    (inicio, fin) inclusivo para un rango simple 'bytes=a-b', 'bytes=a-' o 'bytes=-n'.
+    None si no hay rango aplicable (se responde completo); 'invalido' si no es satisfacible.
+    """
+    m = RANGO_RE.match((header or '').strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    a, b = m.groups()
+    if not a:
+        n = int(b)
+        if n == 0:
+            return 'invalido'
+        return max(0, tamano - n), tamano - 1
+    inicio = int(a)
+    fin = min(int(b), tamano - 1) if b else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return 'invalido'
+    return inicio, fin
+
+
+def _leer(storage, nombre, inicio, longitud):
+    with storage.open(nombre, 'rb') as fh:
+        fh.seek(inicio)
+        while longitud > 0:
+            bloque = fh.read(min(BLOQUE, longitud))
+            if not bloque:
+                break
+            longitud -= len(bloque)
+            yield bloque
+
+
+def respuesta_archivo(request, storage, nombre, filename, content_type='application/pdf'):
+    """Responde el archivo `nombre` del storage respetando condicionales, rangos y el modo de descarga."""
+    tamano = storage.size(nombre)
+    modificado = storage.get_modified_time(nombre)
+    last_modified = int(modificado.timestamp())
+    etag = quote_etag(f'{last_modified:x}-{tamano:x}')
+
+    condicional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if condicional is not None:
+        condicional['ETag'] = etag
+        return condicional
+
+    modo = getattr(settings, 'REPORTE_DESCARGA_MODO', 'django')
+    if modo == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = storage.path(nombre)
+    elif modo == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        prefijo = getattr(settings, 'REPORTE_X_ACCEL_PREFIJO', '/protected/')
+        response['X-Accel-Redirect'] = prefijo.rstrip('/') + '/' + nombre.lstrip('/')
+    else:
+        rango = parse_rango(request.headers.get('Range'), tamano)
+        # If-Range: si el validador no coincide, se ignora el rango y se envía completo
+        if_range = request.headers.get('If-Range')
+        if rango is not None and if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+            rango = None
+        if rango == 'invalido':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{tamano}'
+            return response
+        if rango is None:
+            response = StreamingHttpResponse(_leer(storage, nombre, 0, tamano), content_type=content_type)
+            response['Content-Length'] = str(tamano)
+        else:
+            inicio, fin = rango
+            response = StreamingHttpResponse(_leer(storage, nombre, inicio, fin - inicio + 1),
+                                             content_type=content_type, status=206)
+            response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+            response['Content-Length'] = str(fin - inicio + 1)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
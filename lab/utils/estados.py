@@ -1,32 +1,14 @@
 # lab/utils/estados.py
 from django.utils import timezone
-from django.db.models import Count
-from lab.models import LaboratorioPruebaConfig, Dato  # ajusta import según tu estructura
+from lab.services.avance import mes_completo
 
 def filled_all_month(lab, mes):
     """
     True si TODAS las pruebas configuradas del laboratorio `lab`
     tienen al menos un Dato en el mes `mes` (date con day=1).
+    Lee el contador mantenido en AvanceMensual (una consulta indexada).
     """
-    # Pruebas configuradas (ids únicos)
-    pruebas_cfg = list(
-        LaboratorioPruebaConfig.objects
-        .filter(laboratorio_id=lab.id)
-        .values_list('prueba_id', flat=True)
-        .distinct()
-    )
-    if not pruebas_cfg:
-        return False  # sin configuración no se considera completo
-
-    # Datos presentes en el mes por prueba
-    datos_por_prueba = (
-        Dato.objects
-        .filter(laboratorio_id=lab.id, mes=mes, prueba_id__in=pruebas_cfg)
-        .values('prueba_id')
-        .annotate(n=Count('id'))
-    )
-    pruebas_con_dato = {row['prueba_id'] for row in datos_por_prueba if row['n'] > 0}
-    return set(pruebas_cfg).issubset(pruebas_con_dato)
+    return mes_completo(lab, mes)
 
 def es_mes_completo(lab):
     """Azúcar sintáctico usando el mes vigente (día 1 del mes actual)."""
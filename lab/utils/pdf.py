@@ -0,0 +1,122 @@
+# lab/utils/pdf.py
+"""
+Generador mínimo de PDF de texto (Helvetica, A4) sin dependencias externas.
+No importa Django: las funciones de aquí corren en procesos del pool de reportes.
+"""
+import os
+import tempfile
+
+ANCHO, ALTO = 595, 842          # A4 en puntos
+MARGEN_X, MARGEN_Y = 50, 60
+INTERLINEA = 14
+LINEAS_POR_PAGINA = (ALTO - 2 * MARGEN_Y) // INTERLINEA
+
+
+def _escapar(texto):
+    # WinAnsiEncoding (cp1252) no tiene letras griegas: los textos fijos evitan σ y similares
+    crudo = str(texto).encode('cp1252', errors='replace')
+    return crudo.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+class DocumentoPDF:
+    """Acumula líneas (texto, negrita) y las pagina automáticamente."""
+
+    def __init__(self):
+        self.paginas = [[]]
+
+    def linea(self, texto='', negrita=False):
+        if len(self.paginas[-1]) >= LINEAS_POR_PAGINA:
+            self.paginas.append([])
+        self.paginas[-1].append((texto, negrita))
+
+    def _contenido(self, lineas):
+        partes = [b'BT', f'{INTERLINEA} TL'.encode(), f'{MARGEN_X} {ALTO - MARGEN_Y} Td'.encode()]
+        fuente_actual = None
+        for texto, negrita in lineas:
+            fuente = b'/F2' if negrita else b'/F1'
+            if fuente != fuente_actual:
+                partes.append(fuente + b' 10 Tf')
+                fuente_actual = fuente
+            partes.append(b'(' + _escapar(texto) + b') Tj T*')
+        partes.append(b'ET')
+        return b'\n'.join(partes)
+
+    def escribir(self, fh):
+        """Escribe el PDF en el archivo binario `fh`."""
+        n_paginas = len(self.paginas)
+        # 1 catálogo, 2 páginas, 3-4 fuentes, luego (página, contenido) por hoja
+        objetos = {
+            1: b'<< /Type /Catalog /Pages 2 0 R >>',
+            3: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            4: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        }
+        kids = []
+        for i, lineas in enumerate(self.paginas):
+            num_pag, num_cont = 5 + 2 * i, 6 + 2 * i
+            kids.append(f'{num_pag} 0 R')
+            objetos[num_pag] = (
+                f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ANCHO} {ALTO}] '
+                f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {num_cont} 0 R >>'
+            ).encode()
+            contenido = self._contenido(lineas)
+            objetos[num_cont] = (f'<< /Length {len(contenido)} >>\nstream\n'.encode()
+                                 + contenido + b'\nendstream')
+        objetos[2] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {n_paginas} >>'.encode()
+
+        pos = fh.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = {}
+        for num in sorted(objetos):
+            offsets[num] = pos
+            pos += fh.write(f'{num} 0 obj\n'.encode() + objetos[num] + b'\nendobj\n')
+        total = max(objetos) + 1
+        xref = [f'xref\n0 {total}\n0000000000 65535 f \n']
+        xref += [f'{offsets[n]:010d} 00000 n \n' for n in range(1, total)]
+        fh.write(''.join(xref).encode())
+        fh.write(f'trailer\n<< /Size {total} /Root 1 0 R >>\nstartxref\n{pos}\n%%EOF\n'.encode())
+
+
+def _evaluacion(z):
+    if z is None:
+        return '-'
+    az = abs(z)
+    if az <= 2:
+        return 'Satisfactorio'
+    if az < 3:
+        return 'Cuestionable'
+    return 'No satisfactorio'
+
+
+def _fmt(v, digitos=4):
+    return '-' if v is None else f'{v:.{digitos}g}'
+
+
+def renderizar_reporte(payload, directorio):
+    """
+    Renderiza el reporte de un laboratorio a un PDF temporal en `directorio`.
+    `payload` solo contiene tipos simples (se envía entre procesos). Devuelve la ruta del archivo.
+    """
+    doc = DocumentoPDF()
+    doc.linea('EvaluaT - Evaluación externa de la calidad', negrita=True)
+    doc.linea(payload['titulo'], negrita=True)
+    doc.linea(f"Laboratorio: {payload['lab_nombre']} ({payload['lab_clave']})")
+    doc.linea(f"Periodo: {payload['periodo']}")
+    doc.linea()
+
+    for programa in payload['programas']:
+        doc.linea(programa['nombre'], negrita=True)
+        if payload['tipo'] == 'anual':
+            doc.linea('Prueba | Meses | Promedio | Mínimo | Máximo | |z| medio | Unidad')
+            for f in programa['filas']:
+                doc.linea(f"{f['prueba']} | {f['meses']} | {_fmt(f['promedio'])} | {_fmt(f['minimo'])} | "
+                          f"{_fmt(f['maximo'])} | {_fmt(f['z_abs_medio'], 3)} | {f['unidad']}")
+        else:
+            doc.linea('Prueba | Valor | Unidad | Valor asignado | sigma_pt | z | Evaluación')
+            for f in programa['filas']:
+                doc.linea(f"{f['prueba']} | {_fmt(f['valor'])} | {f['unidad']} | {_fmt(f['asignado'])} | "
+                          f"{_fmt(f['sigma'])} | {_fmt(f['z'], 3)} | {_evaluacion(f['z'])}")
+        doc.linea()
+
+    fd, ruta = tempfile.mkstemp(suffix='.pdf', dir=directorio)
+    with os.fdopen(fd, 'wb') as fh:
+        doc.escribir(fh)
+    return ruta
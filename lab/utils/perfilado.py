@@ -0,0 +1,110 @@
+# lab/utils/perfilado.py
+"""
+Perfilado por petición (opt-in con PERFILADO_ACTIVO): tiempo total, consultas SQL y su
+tiempo, y tiempo de render de plantillas. Las mediciones viajan en un ContextVar y al
+terminar se guardan en un buffer circular en memoria del proceso.
+"""
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+_medicion_actual = ContextVar('perfilado_medicion', default=None)
+_lock = threading.Lock()
+_buffer = deque(maxlen=getattr(settings, 'PERFILADO_BUFFER', 500))
+
+
+class Medicion:
+    __slots__ = ('sql_n', 'sql_s', 'plantillas_s')
+
+    def __init__(self):
+        self.sql_n = 0
+        self.sql_s = 0.0
+        self.plantillas_s = 0.0
+
+
+def iniciar():
+    medicion = Medicion()
+    return medicion, _medicion_actual.set(medicion)
+
+
+def terminar(token):
+    _medicion_actual.reset(token)
+
+
+def envoltura_sql(execute, sql, params, many, context):
+    """Para connection.execute_wrapper(): cuenta y cronometra cada consulta."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql_n += 1
+        medicion.sql_s += time.perf_counter() - inicio
+
+
+def registrar(entrada):
+    with _lock:
+        _buffer.append(entrada)
+
+
+def entradas():
+    with _lock:
+        return list(_buffer)
+
+
+def capacidad():
+    """Cuántas peticiones guarda el buffer de este proceso (PERFILADO_BUFFER)."""
+    return _buffer.maxlen
+
+
+# ----- Backend de plantillas que mide el render (los {% include %} quedan dentro) -----
+class PlantillaPerfilada(Template):
+    def render(self, context=None, request=None):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion.plantillas_s += time.perf_counter() - inicio
+
+
+class PlantillasPerfiladas(DjangoTemplates):
+    """DjangoTemplates cuyas plantillas acumulan su tiempo de render en la medición activa."""
+
+    def from_string(self, template_code):
+        return PlantillaPerfilada(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        plantilla = super().get_template(template_name)
+        return PlantillaPerfilada(plantilla.template, self)
+
+
+def resumen_por_url(lista, limite=20):
+    """
+    Agrupa por nombre de URL y ordena por el máximo tiempo total (más lentas primero).
+    Las respuestas en streaming no tienen SQL medido y no entran en el promedio de consultas.
+    """
+    grupos = {}
+    for e in lista:
+        grupos.setdefault(e['url_name'], []).append(e)
+    filas = []
+    for nombre, es in grupos.items():
+        peor = max(es, key=lambda e: e['total_ms'])
+        medidas = [e['sql_n'] for e in es if not e['streaming']]
+        filas.append({
+            'url_name': nombre,
+            'n': len(es),
+            'prom_ms': sum(e['total_ms'] for e in es) / len(es),
+            'max_ms': peor['total_ms'],
+            'prom_sql_n': sum(medidas) / len(medidas) if medidas else None,
+            'peor': peor,
+        })
+    filas.sort(key=lambda f: f['max_ms'], reverse=True)
+    return filas[:limite]
@@ -1,5 +1,13 @@
+import base64
+import json
+from collections import defaultdict
+from datetime import datetime
 from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from django.utils import timezone
 from ..models import Instrumento, MetodoAnalitico, Reactivo, UnidadDeMedida
+from ..services.catalogos import incrementar_version, TABLA_POR_MODELO
 
 TIPO_TO_MODEL = {
     "instrumento": Instrumento,
@@ -8,6 +16,15 @@ TIPO_TO_MODEL = {
     "unidad": UnidadDeMedida,
 }
 
+def filtrar_sin_mayusculas(qs, campo, valor):
+    """
+    Igualdad sin distinguir mayúsculas que aprovecha el índice Lower(campo).
+    En SQLite `__iexact` se traduce a LIKE, que no usa índices de expresión.
+    """
+    alias = f"{campo}_lower"
+    return qs.alias(**{alias: Lower(campo)}).filter(**{alias: Lower(Value(valor))})
+
+
 @transaction.atomic
 def materializar_propuesta(propuesta):
     """
@@ -19,7 +36,7 @@ def materializar_propuesta(propuesta):
         return None
 
     # Evitar duplicados por nombre (case-insensitive)
-    existente = modelo.objects.filter(nombre__iexact=propuesta.valor).first()
+    existente = filtrar_sin_mayusculas(modelo.objects.all(), "nombre", propuesta.valor).first()
     if existente:
         return existente
 
@@ -30,3 +47,111 @@ def materializar_propuesta(propuesta):
 
     creado = modelo.objects.create(**campos)
     return creado
+
+
+# --------------------------
+# Moderación en lote (acciones del admin)
+# --------------------------
+def materializar_en_lote(propuestas):
+    """
+    Versión por conjuntos de materializar_propuesta: agrupa por tipo, busca los nombres
+    existentes con una consulta por tabla (índice Lower(nombre)) y crea los faltantes
+    con un bulk_create. Devuelve (confirmados, creados).
+    """
+    por_tipo = defaultdict(dict)
+    for prop in propuestas:
+        if prop.tipoElemento in TIPO_TO_MODEL:
+            # La primera propuesta de cada nombre (sin mayúsculas) define la descripción
+            por_tipo[prop.tipoElemento].setdefault(prop.valor.lower(), prop)
+
+    confirmados = creados = 0
+    for tipo, por_nombre in por_tipo.items():
+        modelo = TIPO_TO_MODEL[tipo]
+        existentes = set(
+            n.lower() for n in modelo.objects
+            .alias(nombre_lower=Lower("nombre"))
+            .filter(nombre_lower__in=[Lower(Value(p.valor)) for p in por_nombre.values()])
+            .values_list("nombre", flat=True)
+        )
+        nuevos = [
+            modelo(nombre=p.valor, descripcion=p.descripcion or "")
+            for clave, p in por_nombre.items() if clave not in existentes
+        ]
+        if nuevos:
+            modelo.objects.bulk_create(nuevos)
+            # bulk_create no dispara señales: invalidar el catálogo a mano
+            incrementar_version(TABLA_POR_MODELO[modelo])
+        confirmados += len(por_nombre) - len(nuevos)
+        creados += len(nuevos)
+    return confirmados, creados
+
+
+@transaction.atomic
+def moderar_propuestas(queryset, aprobar, moderador):
+    """
+    Aprueba (y materializa) o rechaza las propuestas de `queryset` en un número fijo de
+    consultas por tipo. El cambio de estado es un solo UPDATE que registra quién y cuándo
+    resolvió; las propuestas que ya estaban en el estado destino no se tocan.
+    Rechazar solo afecta a las pendientes: una aprobada ya tiene su registro en el catálogo
+    y se cuenta en 'omitidas'.
+    Devuelve {'resueltas', 'omitidas', 'confirmados', 'creados'}.
+    """
+    status = 1 if aprobar else 2
+    propuestas = list(queryset.select_for_update().only("id", "tipoElemento", "valor", "descripcion", "status"))
+
+    confirmados = creados = 0
+    if aprobar:
+        # Igual que la acción anterior: también se confirman las ya aprobadas (idempotente)
+        confirmados, creados = materializar_en_lote(propuestas)
+
+    if aprobar:
+        candidatas = queryset.model.objects.exclude(status=status)
+        omitidas = 0
+    else:
+        candidatas = queryset.model.objects.filter(status=0)
+        omitidas = sum(1 for p in propuestas if p.status == 1)
+    ids = [p.id for p in propuestas if p.status != status]
+    resueltas = 0
+    if ids:
+        ahora = timezone.now()
+        resueltas = candidatas.filter(id__in=ids).update(
+            status=status,
+            resolved_by=moderador,
+            resolved_at=ahora,
+            moderation_nonce=None,  # invalida los enlaces del correo de moderación
+            updated_at=ahora,
+        )
+    return {"resueltas": resueltas, "omitidas": omitidas, "confirmados": confirmados, "creados": creados}
+
+
+# --------------------------
+# Paginación por keyset (created_at, id) para el feed de propuestas
+# --------------------------
+def codificar_cursor(prop):
+    crudo = json.dumps([prop.created_at.isoformat(), prop.id])
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (created_at, id) o None si el cursor no es válido."""
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = json.loads(crudo)
+        return datetime.fromisoformat(created_at), int(pk)
+    except Exception:
+        return None
+
+
+def pagina_propuestas(qs, cursor=None, limite=20):
+    """
+    Página de propuestas más recientes primero, sin OFFSET ni COUNT(*).
+    Devuelve (items, next_cursor); next_cursor es None en la última página.
+    """
+    qs = qs.order_by("-created_at", "-id")
+    pos = decodificar_cursor(cursor) if cursor else None
+    if pos:
+        created_at, pk = pos
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    items = list(qs[:limite + 1])
+    next_cursor = codificar_cursor(items[limite - 1]) if len(items) > limite else None
+    return items[:limite], next_cursor
@@ -0,0 +1,39 @@
+# lab/utils/sqlite.py
+import functools
+import random
+import time
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+MENSAJES_BLOQUEO = ('database is locked', 'database is busy', 'database table is locked')
+
+
+def es_bloqueo(exc):
+    return isinstance(exc, OperationalError) and any(m in str(exc).lower() for m in MENSAJES_BLOQUEO)
+
+
+def transaccion_con_reintentos(func=None, *, intentos=None, espera_base=None):
+    """
+    Decorador: ejecuta `func` en transaction.atomic() y la reintenta con backoff exponencial
+    (con jitter) si SQLite responde SQLITE_BUSY. Dentro de una transacción externa no reintenta:
+    la transacción completa es la que debe repetirse, así que el error se propaga.
+    """
+    def decorador(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if connection.in_atomic_block:
+                with transaction.atomic():
+                    return f(*args, **kwargs)
+            max_intentos = intentos or getattr(settings, 'SQLITE_REINTENTOS', 5)
+            base = espera_base if espera_base is not None else getattr(settings, 'SQLITE_REINTENTO_BASE_SEGUNDOS', 0.05)
+            for intento in range(1, max_intentos + 1):
+                try:
+                    with transaction.atomic():
+                        return f(*args, **kwargs)
+                except OperationalError as exc:
+                    if not es_bloqueo(exc) or intento == max_intentos:
+                        raise
+                    time.sleep(base * (2 ** (intento - 1)) * (0.5 + random.random()))
+        return wrapper
+
+    return decorador(func) if func is not None else decorador
@@ -1,11 +1,13 @@
 import json, os
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, HttpResponseForbidden, HttpResponseBadRequest
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse, HttpResponseForbidden, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib import admin
 from django.urls import reverse, reverse_lazy
 from django.db import transaction, IntegrityError
 from django.utils import timezone
@@ -14,64 +16,109 @@ from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from datetime import date
 import re
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives
 from django.core import signing
 from django.core.signing import BadSignature, SignatureExpired
 from django.conf import settings
 from django.views.generic import ListView
 from django.contrib.auth import get_user_model
-from lab.utils.estados import filled_all_month, puede_capturar_datos
+from lab.utils.estados import puede_capturar_datos
 from .utils.allow_edit_now import get_allow_edit_now
+from .services.captura import cargar_grid_captura, snapshot_grid
+from .services.datos import guardar_datos_mes
+from .services.configuracion import guardar_configuraciones_bulk
+from .services.membresia import SESION_LAB, refrescar_membresias, pertenece, es_miembro
+from .services.correo import encolar_correo
+from .services.catalogos import cargar_catalogos, versiones_catalogo, etag_catalogos
+from .services.subidas import iniciar_subida, recibir_parte, finalizar_subida, SubidaError, PDF_MAGIC
+from .services.importacion import importar_datos_csv, ImportacionError
+from .services.exportacion import datos_export_qs, filas_csv, filas_csv_pivote
+from .services.series import serie_datos, etag_serie, restar_meses
+from .services.monitoreo import tablero_base, tablero_qs, resumen_tablero
+from .services.asignacion import asignar_programas, AsignacionError
+from .utils.propuestas import pagina_propuestas
+from .utils.descargas import respuesta_archivo
+from .utils import perfilado
 
 
 from .models import (
     UserLaboratorio, ProgramaLaboratorio, Prueba, LaboratorioPruebaConfig,
     Instrumento, MetodoAnalitico, Reactivo, UnidadDeMedida, PropiedadARevisar,
-    Laboratorio, Dato, Reporte
+    Laboratorio, Dato, Reporte, SubidaReporte
 )
 
 class MisPropuestasListView(LoginRequiredMixin, ListView):
-    template_name = 'templates/propuestas/mis_propuestas.html'
+    template_name = 'propuestas/mis_propuestas.html'
     context_object_name = 'propuestas'
-    paginate_by = 20
 
     def get_queryset(self):
-        qs = _propuestas_queryset_for(self.request.user).order_by('-created_at')
-        if self.request.user.is_staff:
-            return qs
-        return qs.filter(propuesto_por=self.request.user)
+        # Keyset (created_at, id): sin OFFSET ni COUNT(*) por página
+        qs = _propuestas_filtradas(self.request)
+        items, self.next_cursor = pagina_propuestas(qs, self.request.GET.get('cursor'), PROPUESTAS_POR_PAGINA)
+        return items
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx['next_cursor'] = self.next_cursor
+        ctx['status'] = self.request.GET.get('status', '')
+        return ctx
 
 
 # ----------- Helpers -----------
+# FKs que pinta _config_row.html por cada configuración (evita una consulta por celda)
+CONFIG_RELACIONES = ('prueba_id', 'instrumento_id', 'metodo_analitico_id', 'reactivo_id', 'unidad_de_medida_id')
+PROPUESTAS_POR_PAGINA = 20
+
 def _propuestas_queryset_for(user):
     qs = PropiedadARevisar.objects.all().order_by('-created_at')
     return qs if user.is_staff else qs.filter(propuesto_por=user)
 
+def _propuestas_filtradas(request, mias=False):
+    """Propuestas visibles para el usuario, opcionalmente solo las suyas y por status (?status=0|1|2)."""
+    qs = _propuestas_queryset_for(request.user)
+    if mias or request.GET.get('mias') in ('1', 'true'):
+        qs = qs.filter(propuesto_por=request.user)
+    status = request.GET.get('status')
+    if status in ('0', '1', '2'):
+        qs = qs.filter(status=int(status))
+    return qs
+
 def user_labs_str(user):
     names = list(UserLaboratorio.objects.filter(user_id=user).values_list('laboratorio__nombre', flat=True))
     return ", ".join(names) if names else "Sin laboratorio"
 
+def _encolar_correos_resolucion(prop, moderador, resultado, resultado_titulo):
+    """Encola los avisos de propuesta resuelta (al proponente y al staff). Llamar dentro de la transacción."""
+    labs = user_labs_str(prop.propuesto_por)
+    nombre = prop.valor
+    tipo = prop.tipoElemento
+    desc = prop.descripcion or "(sin descripción)"
+    proponente = prop.propuesto_por.get_username() if prop.propuesto_por else "(desconocido)"
+    detalle = (
+        f'Propiedad propuesta por {proponente} - {labs}\n'
+        f'Tipo: {tipo}\n'
+        f'Valor: {nombre}\n'
+        f'Descripción: {desc}\n'
+    )
+
+    # correo a usuario proponente
+    if prop.propuesto_por and prop.propuesto_por.email:
+        encolar_correo(
+            f'[Evaluat] Propuesta {resultado} #{prop.id} — {nombre}',
+            f'La propuesta "{nombre}" fue {resultado}\n\n' + detalle,
+            [prop.propuesto_por.email],
+        )
+
+    # correo a staff
+    User = get_user_model()
+    staff = list(User.objects.filter(is_staff=True, is_active=True).exclude(email='').values_list('email', flat=True))
+    if staff:
+        encolar_correo(
+            f'[Evaluat] Propuesta resuelta ({resultado_titulo}) #{prop.id} — {nombre}',
+            f'La propuesta "{nombre}" fue {resultado} por {moderador.get_username()}\n\n' + detalle,
+            staff,
+        )
 
-def avanzar_estado_si_corresponde(lab, *, persistir: bool = True):
-    """
-    Reglas:
-    - 1→2: desde el día 16 local si no hay override de edición.
-    - 2→3: por completitud del mes (todas las pruebas requeridas) si no hay override de captura.
-    - 3 se respeta; solo cambia por acción de admin u override de captura.
-    """
-    from django.utils import timezone
-    hoy = timezone.localdate()
-    if lab.estado == 3:
-        return lab
-    ed_override = lab.override_edicion_activa and (lab.override_edicion_hasta is None or hoy <= lab.override_edicion_hasta)
-    if lab.estado == 1 and not ed_override and hoy.day >= 16:
-        lab.estado = 2
-        if persistir:
-            lab.save(update_fields=['estado'])
-        return lab
-    cap_override = lab.override_captura_activa and (lab.override_captura_hasta is None or hoy <= lab.override_captura_hasta)
-    # El cierre por completitud se evalúa después del guardado en la vista de data_entry
-    return lab
 
 # def avanzar_estado_si_corresponde(lab: Laboratorio, *, persistir: bool = True) -> Laboratorio:
 #     """
@@ -194,30 +241,21 @@ def logout_user(request):
 # GET: Vista principal de laboratorio
 # - Única definición consolidada
 # - Pasa captura_bloqueada al template para controlar disabled en inputs
-# - Promueve 2→3 solo si la ventana de captura está cerrada y el mes está completo
+# - Solo lectura: 1→2 y 2→3 los aplica el comando programado `avanzar_estados`
 # ---------------------------------------------
 class LabMainView(LoginRequiredMixin, View):
     template_name = 'labmain.html'
     login_url = reverse_lazy('lab:homepage')
 
     def get(self, request):
-        lab_id = request.session.get("laboratorio_seleccionado")
-        lab = Laboratorio.objects.filter(id=lab_id).first() if lab_id else None
+        lab = request.lab
         if not lab:
             messages.error(request, "No hay laboratorio asociado a tu usuario.")
             return redirect('lab:homepage')
 
-        lab = avanzar_estado_si_corresponde(lab, persistir=True)
-        # Ventana de captura
+        # Ventana de captura (las transiciones de estado las aplica `manage.py avanzar_estados`)
         cap_window_open = puede_capturar_datos(lab)
 
-        # Promover 2→3 solo fuera de ventana y con mes completo
-        if lab.estado == 2 and not cap_window_open:
-            mes_vigente = timezone.localdate().replace(day=1)
-            if filled_all_month(lab, mes_vigente):
-                lab.estado = 3
-                lab.save(update_fields=['estado'])
-
         ctx = {
             'lab': lab,
             'today': timezone.localdate(),
@@ -232,7 +270,9 @@ class LabMainView(LoginRequiredMixin, View):
 
             pruebas_laboratorio = Prueba.objects.filter(programa_id__in=programas_ids)
 
-            accepted_configs = LaboratorioPruebaConfig.objects.filter(laboratorio_id=lab)
+            accepted_configs = (LaboratorioPruebaConfig.objects
+                                .filter(laboratorio_id=lab)
+                                .select_related(*CONFIG_RELACIONES))
             accepted_prueba_ids = accepted_configs.values_list('prueba_id', flat=True)
 
             pending_pruebas = pruebas_laboratorio.exclude(id__in=accepted_prueba_ids)
@@ -242,66 +282,28 @@ class LabMainView(LoginRequiredMixin, View):
                 {"obj": c, "can_edit": puede_editar_config(lab, c)}
                 for c in accepted_configs
             ]
-            instrumentos = Instrumento.objects.all().order_by('nombre')
-            metodos = MetodoAnalitico.objects.all().order_by('nombre')
-            reactivos = Reactivo.objects.all().order_by('nombre')
-            unidades = UnidadDeMedida.objects.all().order_by('nombre')
 
-            # NUEVO: propuestas (ajusta filtro si aplican visibilidades por usuario/lab)
-            propuestas = PropiedadARevisar.objects.all().order_by('-id')
+            # Propuestas del usuario: solo la primera página, el resto se carga bajo demanda
+            propuestas, propuestas_next_cursor = pagina_propuestas(
+                _propuestas_filtradas(request, mias=True), None, PROPUESTAS_POR_PAGINA
+            )
 
             ctx.update({
                 'pending_pruebas': pending_pruebas,
                 'accepted_configs': accepted_configs,
                 'accepted_configs_wrapped': accepted_configs_wrapped,
-                'instrumentos': instrumentos,
-                'metodos': metodos,
-                'reactivos': reactivos,
-                'unidades': unidades,
                 'propuestas': propuestas,
+                'propuestas_next_cursor': propuestas_next_cursor,
             })
+            # Catálogos desde caché versionada (instrumentos, metodos, reactivos, unidades, nombres)
+            ctx.update(cargar_catalogos())
             ctx['allow_edit_now'] = get_allow_edit_now(lab, ctx['today'])
             return render(request, self.template_name, ctx)
 
-        # Estados 2 y 3: captura/consulta (sin cambios)
-        cfgs = (LaboratorioPruebaConfig.objects
-                .filter(laboratorio_id=lab)
-                .select_related("prueba_id", "unidad_de_medida_id"))
-        unidades_por_prueba = {
-            c.prueba_id_id: (c.unidad_de_medida_id.nombre if c.unidad_de_medida_id else "")
-            for c in cfgs
-        }
-        pruebas_cfg_ids = list(unidades_por_prueba.keys())
-
-        pls = ProgramaLaboratorio.objects.filter(laboratorio_id=lab).select_related("programa_id")
-
-        grupos = []
-        for pl in pls:
-            pruebas = (Prueba.objects
-                       .filter(programa_id=pl.programa_id, id__in=pruebas_cfg_ids)
-                       .order_by("nombre"))
-            if not pruebas.exists():
-                continue
-            filas = []
-            for p in pruebas:
-                unidad = unidades_por_prueba.get(p.id, "")
-                filas.append({"prueba": p, "unidad": unidad})
-            grupos.append({"programa": pl.programa_id, "filas": filas})
-
+        # Estados 2 y 3: captura/consulta (grid en número fijo de consultas)
         mes_vigente = timezone.localdate().replace(day=1)
-        datos_list = Dato.objects.filter(laboratorio_id=lab.id, mes=mes_vigente)
-        datos_por_prueba = {d.prueba_id_id: d for d in datos_list}
-
-        pruebas_flat = (Prueba.objects
-                        .filter(id__in=pruebas_cfg_ids)
-                        .order_by("programa_id__nombre", "nombre"))
-
-        ctx.update({
-            "programas": grupos,
-            "pruebas": pruebas_flat,
-            "datos_por_prueba": datos_por_prueba,
-            "mes_vigente": mes_vigente,
-        })
+        ctx.update(cargar_grid_captura(lab, mes_vigente))
+        ctx["mes_vigente"] = mes_vigente
 
         if lab.estado == 3:
             reportes = (Reporte.objects
@@ -317,37 +319,12 @@ class ReportesView(LoginRequiredMixin, View):
     login_url = "lab:homepage"
 
     def get(self, request):
-        lab_id = request.session.get("laboratorio_seleccionado")
-        lab = Laboratorio.objects.filter(id=lab_id).first() if lab_id else None
+        lab = request.lab
         if not lab:
             return redirect("lab:homepage")
 
-        cfgs = (LaboratorioPruebaConfig.objects
-                .filter(laboratorio_id=lab)
-                .select_related("prueba_id", "unidad_de_medida_id"))
-        unidades_por_prueba = {
-            c.prueba_id_id: (c.unidad_de_medida_id.nombre if c.unidad_de_medida_id else "")
-            for c in cfgs
-        }
-        pruebas_cfg_ids = list(unidades_por_prueba.keys())
-
-        pls = ProgramaLaboratorio.objects.filter(laboratorio_id=lab).select_related("programa_id")
-        grupos = []
-        for pl in pls:
-            pruebas = (Prueba.objects
-                       .filter(programa_id=pl.programa_id, id__in=pruebas_cfg_ids)
-                       .order_by("nombre"))
-            if not pruebas.exists():
-                continue
-            filas = []
-            for p in pruebas:
-                unidad = unidades_por_prueba.get(p.id, "")
-                filas.append({"prueba": p, "unidad": unidad})
-            grupos.append({"programa": pl.programa_id, "filas": filas})
-
         mes_vigente = timezone.localdate().replace(day=1)
-        datos_list = Dato.objects.filter(laboratorio_id=lab.id, mes=mes_vigente)
-        datos_por_prueba = {d.prueba_id_id: d for d in datos_list}
+        grid = cargar_grid_captura(lab, mes_vigente)
 
         # Obtener reportes del laboratorio (sin depender del estado)
         reportes = (Reporte.objects
@@ -358,8 +335,8 @@ class ReportesView(LoginRequiredMixin, View):
         ctx = {
             'lab': lab,
             'today': timezone.localdate(),
-            'programas': grupos,
-            'datos_por_prueba': datos_por_prueba,
+            'programas': grid['programas'],
+            'datos_por_prueba': grid['datos_por_prueba'],
             'mes_vigente': mes_vigente,
             'reportes': reportes,
         }
@@ -530,13 +507,10 @@ class ReportesView(LoginRequiredMixin, View):
 @login_required
 @require_POST
 def crear_o_actualizar_configuracion(request):
-    lab_id = request.session.get('laboratorio_seleccionado')
-    if not lab_id:
+    lab = request.lab
+    if not lab:
         return JsonResponse({'success': False, 'error': 'Laboratorio no seleccionado'}, status=400)
 
-    # NUEVO: obtener instancia de laboratorio
-    lab = get_object_or_404(Laboratorio, pk=lab_id)
-
     prueba_id = request.POST.get('prueba_id')
     ins_id = request.POST.get('instrumento_id')
     met_id = request.POST.get('metodo_analitico_id')
@@ -570,11 +544,11 @@ def actualizar_configuracion(request, config_id):
     """
     Actualiza una configuración existente y retorna JSON si es AJAX.
     """
-    lab_id = request.session.get('laboratorio_seleccionado')
-    if not lab_id:
+    lab = request.lab
+    if not lab:
         return JsonResponse({'success': False, 'error': 'Laboratorio no seleccionado'}, status=400)
 
-    cfg = get_object_or_404(LaboratorioPruebaConfig, id=config_id, laboratorio_id=lab_id)
+    cfg = get_object_or_404(LaboratorioPruebaConfig, id=config_id, laboratorio_id=lab.id)
 
     ins_id = request.POST.get('instrumento_id')
     met_id = request.POST.get('metodo_analitico_id')
@@ -648,20 +622,20 @@ def aceptar_configuracion(request, config_id):
 # --------------------------
 @login_required
 def accept_configurations(request):
-    lab_id = request.session.get('laboratorio_seleccionado')
-    if not lab_id:
+    laboratorio = request.lab
+    if not laboratorio:
         messages.error(request, "No hay laboratorio asociado a tu usuario.")
         return redirect('lab:select_lab')
 
-    laboratorio = get_object_or_404(Laboratorio, pk=lab_id)
-
     programas_ids = ProgramaLaboratorio.objects.filter(
         laboratorio_id=laboratorio.id
     ).values_list('programa_id', flat=True)
 
     pruebas_laboratorio = Prueba.objects.filter(programa_id__in=programas_ids)
 
-    accepted_configs = LaboratorioPruebaConfig.objects.filter(laboratorio_id=laboratorio)
+    accepted_configs = (LaboratorioPruebaConfig.objects
+                        .filter(laboratorio_id=laboratorio)
+                        .select_related(*CONFIG_RELACIONES))
     accepted_prueba_ids = accepted_configs.values_list('prueba_id', flat=True)
 
     pending_pruebas = pruebas_laboratorio.exclude(id__in=accepted_prueba_ids)
@@ -676,14 +650,13 @@ def accept_configurations(request):
         "pending_pruebas": pending_pruebas,
         "accepted_configs": accepted_configs,  # si lo usas en otro lado
         "accepted_configs_wrapped": accepted_configs_wrapped,  # LO QUE USA EL PARCIAL
-        "instrumentos": Instrumento.objects.all(),
-        "metodos": MetodoAnalitico.objects.all(),
-        "reactivos": Reactivo.objects.all(),
-        "unidades": UnidadDeMedida.objects.all(),
-        'propuestas': _propuestas_queryset_for(request.user),
         "laboratorio": laboratorio,
         "today": timezone.localdate(),
     }
+    context.update(cargar_catalogos())
+    context["propuestas"], context["propuestas_next_cursor"] = pagina_propuestas(
+        _propuestas_filtradas(request, mias=True), None, PROPUESTAS_POR_PAGINA
+    )
     # Renderizar labmain para que traiga topbar/sidebar/footer y dentro incluya el parcial
     context["allow_edit_now"] = get_allow_edit_now(laboratorio, context["today"])
     return render(request, "labmain.html", context)
@@ -698,11 +671,11 @@ def actualizar_configuracion(request, config_id):
     if request.method != "POST":
         return JsonResponse({"success": False, "error": "Método no permitido"}, status=405)  # [22]
 
-    config = get_object_or_404(LaboratorioPruebaConfig, id=config_id)
+    config = get_object_or_404(LaboratorioPruebaConfig.objects.select_related('laboratorio_id'), id=config_id)
     laboratorio = config.laboratorio_id
 
-    # Seguridad: pertenencia usuario-lab
-    if not UserLaboratorio.objects.filter(user_id=request.user, laboratorio_id=laboratorio.id).exists():
+    # Seguridad: pertenencia usuario-lab (conjunto en sesión, sin consulta)
+    if not es_miembro(request, laboratorio):
         return JsonResponse({"success": False, "error": "Acceso denegado"}, status=403)  # [22]
 
     # Ventana de edición y bloqueos
@@ -765,26 +738,6 @@ def select_lab(request):
     Selector de laboratorio del usuario (UserLaboratorio/Laboratorio).
     Si el usuario solo tiene 1 laboratorio, se salta la selección.
     """
-    laboratorios_usuario_qs = Laboratorio.objects.filter(
-        usuarios__user_id=request.user
-    ).distinct().order_by('nombre')
-    laboratorios_usuario = list(laboratorios_usuario_qs)
-
-    if request.method == 'GET':
-        if not laboratorios_usuario:
-            messages.error(request, "No tienes laboratorios asignados. Contacta al administrador.")
-            return render(request, 'select_lab.html', {'laboratorios': []})
-
-        lab_id_sesion = request.session.get('laboratorio_seleccionado')
-        if lab_id_sesion and laboratorios_usuario_qs.filter(id=lab_id_sesion).exists():
-            return redirect('lab:lab_route')
-
-        if len(laboratorios_usuario) == 1:
-            request.session['laboratorio_seleccionado'] = laboratorios_usuario[0].id
-            return redirect('lab:lab_route')
-
-        return render(request, 'select_lab.html', {'laboratorios': laboratorios_usuario})
-
     if request.method == 'POST':
         laboratorio_id = request.POST.get("laboratorio_id")
         try:
@@ -793,11 +746,30 @@ def select_lab(request):
             messages.error(request, "Selecciona un laboratorio válido.")
             return redirect('lab:select_lab')
 
-        if not laboratorios_usuario_qs.filter(id=laboratorio_id).exists():
+        # Pertenencia contra el conjunto en sesión (solo consulta si no está)
+        if not pertenece(request, laboratorio_id):
             messages.error(request, "No tienes acceso a ese laboratorio.")
             return redirect('lab:select_lab')
 
-        request.session["laboratorio_seleccionado"] = laboratorio_id
+        request.session[SESION_LAB] = laboratorio_id
+        return redirect('lab:lab_route')
+
+    # GET: el listado trae la versión de cada lab, así que también refresca la sesión
+    laboratorios_usuario = list(Laboratorio.objects.filter(
+        usuarios__user_id=request.user
+    ).distinct().order_by('nombre'))
+    membresias = refrescar_membresias(request, laboratorios_usuario)
+
+    if not laboratorios_usuario:
+        messages.error(request, "No tienes laboratorios asignados. Contacta al administrador.")
+        return render(request, 'select_lab.html', {'laboratorios': []})
+
+    lab_id_sesion = request.session.get(SESION_LAB)
+    if lab_id_sesion and str(lab_id_sesion) in membresias:
+        return redirect('lab:lab_route')
+
+    if len(laboratorios_usuario) == 1:
+        request.session[SESION_LAB] = laboratorios_usuario[0].id
         return redirect('lab:lab_route')
 
     return render(request, 'select_lab.html', {'laboratorios': laboratorios_usuario})
@@ -806,11 +778,8 @@ def select_lab(request):
 # solo decide y envía a “/lab”
 @login_required
 def lab_route(request):
-    lab_id = request.session.get('laboratorio_seleccionado')
-    if not lab_id:
+    if not request.lab:
         return redirect('lab:select_lab')
-    lab = get_object_or_404(Laboratorio, pk=lab_id)
-    avanzar_estado_si_corresponde(lab, persistir=True)
     return redirect('lab:labmainview')
 
 
@@ -878,45 +847,46 @@ def propose_property(request):
     if tipo not in {'instrumento','metodo','reactivo','unidad'} or not valor:
         return JsonResponse({'error': 'Datos inválidos'}, status=400)
 
-    prop = PropiedadARevisar(
-        tipoElemento=tipo, valor=valor, descripcion=desc, status=0, propuesto_por=request.user
-    )
-    prop.ensure_nonce(force=True)
-    prop.save()
-
-    payload = {'id': prop.id, 'n': prop.moderation_nonce}
-    token = signing.dumps(payload, salt='prop-moderation')
-    accept_url = request.build_absolute_uri(reverse('lab:proposal_accept') + f'?t={token}')
-    reject_url = request.build_absolute_uri(reverse('lab:proposal_reject') + f'?t={token}')
     labs = user_labs_str(request.user)
-    ts = timezone.now().strftime('%Y%m%d-%H%M%S')
-
-    # Acuse al proponente (subject único)
-    subj_user = f'[Evaluat] Propuesta registrada #{prop.id} — {tipo} — {valor} — {ts}'
-    if request.user.email:
-        send_mail(
-            subj_user,
-            f'Propiedad propuesta por {request.user.get_username()} - {labs}\nTipo: {tipo}\nValor: {valor}\nDescripción: {desc or "(sin descripción)"}',
-            getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-            [request.user.email],
-            fail_silently=True
-        )
-
-    # Aviso al staff (subject único)
     User = get_user_model()
     recipients = list(User.objects.filter(is_staff=True, is_active=True).exclude(email='').values_list('email', flat=True))
-    if recipients:
-        subj_staff = f'[Evaluat] Nueva propuesta #{prop.id} — {tipo} — {valor} — {ts}'
-        text_body = (f'Propiedad propuesta por {request.user.get_username()} - {labs}\n'
-                     f'Tipo: {tipo}\nValor: {valor}\nDescripción: {desc or "(sin descripción)"}\n\n'
-                     f'Aceptar: {accept_url}\nRechazar: {reject_url}\n')
-        html_body = (f'<p><strong>Propiedad propuesta</strong> por {request.user.get_username()} - {labs}</p>'
-                     f'<p>Tipo: {tipo}<br>Valor: {valor}<br>Descripción: {desc or "(sin descripción)"}.</p>'
-                     f'<p>'
-                     f'<a href="{accept_url}" style="padding:.5rem 1rem; background:#198754; color:#fff; text-decoration:none; border-radius:6px;">Aceptar</a> '
-                     f'<a href="{reject_url}" style="padding:.5rem 1rem; background:#dc3545; color:#fff; text-decoration:none; border-radius:6px; margin-left:.5rem;">Rechazar</a>'
-                     f'</p>')
-        send_mail(subj_staff, text_body, getattr(settings, 'DEFAULT_FROM_EMAIL', None), recipients, html_message=html_body, fail_silently=False)
+
+    # La propuesta y sus correos se registran juntos; el envío lo hace `enviar_correos`
+    with transaction.atomic():
+        prop = PropiedadARevisar(
+            tipoElemento=tipo, valor=valor, descripcion=desc, status=0, propuesto_por=request.user
+        )
+        prop.ensure_nonce(force=True)
+        prop.save()
+
+        payload = {'id': prop.id, 'n': prop.moderation_nonce}
+        token = signing.dumps(payload, salt='prop-moderation')
+        accept_url = request.build_absolute_uri(reverse('lab:proposal_accept') + f'?t={token}')
+        reject_url = request.build_absolute_uri(reverse('lab:proposal_reject') + f'?t={token}')
+        ts = timezone.now().strftime('%Y%m%d-%H%M%S')
+
+        # Acuse al proponente (subject único)
+        subj_user = f'[Evaluat] Propuesta registrada #{prop.id} — {tipo} — {valor} — {ts}'
+        if request.user.email:
+            encolar_correo(
+                subj_user,
+                f'Propiedad propuesta por {request.user.get_username()} - {labs}\nTipo: {tipo}\nValor: {valor}\nDescripción: {desc or "(sin descripción)"}',
+                [request.user.email],
+            )
+
+        # Aviso al staff (subject único)
+        if recipients:
+            subj_staff = f'[Evaluat] Nueva propuesta #{prop.id} — {tipo} — {valor} — {ts}'
+            text_body = (f'Propiedad propuesta por {request.user.get_username()} - {labs}\n'
+                         f'Tipo: {tipo}\nValor: {valor}\nDescripción: {desc or "(sin descripción)"}\n\n'
+                         f'Aceptar: {accept_url}\nRechazar: {reject_url}\n')
+            html_body = (f'<p><strong>Propiedad propuesta</strong> por {request.user.get_username()} - {labs}</p>'
+                         f'<p>Tipo: {tipo}<br>Valor: {valor}<br>Descripción: {desc or "(sin descripción)"}.</p>'
+                         f'<p>'
+                         f'<a href="{accept_url}" style="padding:.5rem 1rem; background:#198754; color:#fff; text-decoration:none; border-radius:6px;">Aceptar</a> '
+                         f'<a href="{reject_url}" style="padding:.5rem 1rem; background:#dc3545; color:#fff; text-decoration:none; border-radius:6px; margin-left:.5rem;">Rechazar</a>'
+                         f'</p>')
+            encolar_correo(subj_staff, text_body, recipients, html=html_body)
 
     return JsonResponse({'ok': True, 'id': prop.id})
 
@@ -941,51 +911,8 @@ def proposal_accept(request):
         prop.resolved_at = timezone.now()
         prop.moderation_nonce = None
         prop.save(update_fields=['status','resolved_by','resolved_at','moderation_nonce'])
+        _encolar_correos_resolucion(prop, request.user, 'aceptada', 'Aceptada')
 
-    # Correos
-    # correo a usuario proponente
-    if prop.propuesto_por and prop.propuesto_por.email:
-        labs = user_labs_str(prop.propuesto_por)
-        moderator = request.user.get_username()
-        nombre = prop.valor
-        tipo = prop.tipoElemento
-        desc = prop.descripcion or "(sin descripción)"
-        send_mail(
-            subject=f'[Evaluat] Propuesta aceptada #{prop.id} — {nombre}',
-            message=(
-                f'La propuesta "{nombre}" fue aceptada\n\n'
-                f'Propiedad propuesta por {prop.propuesto_por.get_username()} - {labs}\n'
-                f'Tipo: {tipo}\n'
-                f'Valor: {nombre}\n'
-                f'Descripción: {desc}\n'
-            ),
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-            recipient_list=[prop.propuesto_por.email],
-            fail_silently=True
-        )
-
-    # correo a staff
-    User = get_user_model()
-    staff = list(User.objects.filter(is_staff=True, is_active=True).exclude(email='').values_list('email', flat=True))
-    if staff:
-        labs = user_labs_str(prop.propuesto_por)
-        moderator = request.user.get_username()
-        nombre = prop.valor
-        tipo = prop.tipoElemento
-        desc = prop.descripcion or "(sin descripción)"
-        send_mail(
-            subject=f'[Evaluat] Propuesta resuelta (Aceptada) #{prop.id} — {nombre}',
-            message=(
-                f'La propuesta "{nombre}" fue aceptada por {moderator}\n\n'
-                f'Propiedad propuesta por {prop.propuesto_por.get_username()} - {labs}\n'
-                f'Tipo: {tipo}\n'
-                f'Valor: {nombre}\n'
-                f'Descripción: {desc}\n'
-            ),
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-            recipient_list=staff,
-            fail_silently=True
-        )
     return redirect('lab:labmainview')
 
 @login_required(login_url='lab:homepage')
@@ -1009,50 +936,8 @@ def proposal_reject(request):
         prop.resolved_at = timezone.now()
         prop.moderation_nonce = None
         prop.save(update_fields=['status','resolved_by','resolved_at','moderation_nonce'])
+        _encolar_correos_resolucion(prop, request.user, 'rechazada', 'Rechazada')
 
-    # correo a usuario proponente
-    if prop.propuesto_por and prop.propuesto_por.email:
-        labs = user_labs_str(prop.propuesto_por)
-        moderator = request.user.get_username()
-        nombre = prop.valor
-        tipo = prop.tipoElemento
-        desc = prop.descripcion or "(sin descripción)"
-        send_mail(
-            subject=f'[Evaluat] Propuesta rechazada #{prop.id} — {nombre}',
-            message=(
-                f'La propuesta "{nombre}" fue rechazada\n\n'
-                f'Propiedad propuesta por {prop.propuesto_por.get_username()} - {labs}\n'
-                f'Tipo: {tipo}\n'
-                f'Valor: {nombre}\n'
-                f'Descripción: {desc}\n'
-            ),
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-            recipient_list=[prop.propuesto_por.email],
-            fail_silently=True
-        )
-
-    # correo a staff
-    User = get_user_model()
-    staff = list(User.objects.filter(is_staff=True, is_active=True).exclude(email='').values_list('email', flat=True))
-    if staff:
-        labs = user_labs_str(prop.propuesto_por)
-        moderator = request.user.get_username()
-        nombre = prop.valor
-        tipo = prop.tipoElemento
-        desc = prop.descripcion or "(sin descripción)"
-        send_mail(
-            subject=f'[Evaluat] Propuesta resuelta (Rechazada) #{prop.id} — {nombre}',
-            message=(
-                f'La propuesta "{nombre}" fue rechazada por {moderator}\n\n'
-                f'Propiedad propuesta por {prop.propuesto_por.get_username()} - {labs}\n'
-                f'Tipo: {tipo}\n'
-                f'Valor: {nombre}\n'
-                f'Descripción: {desc}\n'
-            ),
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-            recipient_list=staff,
-            fail_silently=True
-        )
     return redirect('lab:labmainview')
 
 
@@ -1125,33 +1010,24 @@ def proposal_reject(request):
 #                 errors[key] = 'Duplicado en el mes'
 #     return JsonResponse({'saved': saved, 'errors': errors})
 
-def filled_all_month(lab, mes):
-    """True si todas las pruebas configuradas del laboratorio tienen Dato en ese mes."""
-    req_ids = set(LaboratorioPruebaConfig.objects.filter(laboratorio_id=lab.id).values_list('prueba_id', flat=True))
-    if not req_ids:
-        return False
-    capturadas = Dato.objects.filter(laboratorio_id=lab.id, mes=mes, prueba_id_id__in=req_ids).count()
-    return capturadas >= len(req_ids)
-
 # ---------------------------------------------
 # POST: Captura de datos del laboratorio (mes vigente)
 # - Crea si no existe
 # - Actualiza solo si cambió
 # - Omite si es idéntico
-# - NO promueve 2→3 en POST (solo en GET y fuera de ventana)
+# - Todo en bloque: consultas constantes sin importar cuántas pruebas se envíen
+# - NO promueve 2→3 (lo hace el comando `avanzar_estados`)
 # ---------------------------------------------
 @login_required
 @require_POST
 def lab_data_entry(request):
-    lab_id = request.session.get('laboratorio_seleccionado')
-    if not lab_id:
+    lab = request.lab
+    if not lab:
         return JsonResponse(
             {'success': False, 'errors': {'non_field': 'Laboratorio no seleccionado'}},
             status=400
         )
 
-    lab = get_object_or_404(Laboratorio, pk=lab_id)
-
     # Estado 1 (Configuración) no permite registro
     if lab.estado == 1:
         return JsonResponse(
@@ -1163,57 +1039,37 @@ def lab_data_entry(request):
     mes = date.today().replace(day=1)
 
     errors = {}
-    saved_count = 0
-    saved_list = []              # [{'prueba_id': int, 'valor': float}]
-    skipped_existing_list = []   # [{'prueba_id': int}]
+    valores = {}                 # {prueba_id: valor} en orden de envío
+    keys_por_prueba = {}
 
     sci_re = re.compile(r'^[+-]?(?:\d+(?:\.\d*)?|\d*\.\d+)(?:[eE][+-]?\d+)?$')
 
-    with transaction.atomic():
-        for key, val in request.POST.items():
-            if not key.startswith('valor_'):
-                continue
-            if val is None or str(val).strip() == '':
-                continue
-
-            raw = str(val).strip().replace(',', '.')
-            if not sci_re.match(raw):
-                errors[key] = 'Valor inválido'
-                continue
-
-            try:
-                prueba_id = int(key.split('_', 1)[1])
-                valor = float(raw)
-            except Exception:
-                errors[key] = 'Valor inválido'
-                continue
-
-            prueba = get_object_or_404(Prueba, pk=prueba_id)
-
-            # Buscar existente y decidir create/update/skip
-            obj = Dato.objects.filter(
-                laboratorio_id_id=lab.id,
-                prueba_id_id=prueba.id,
-                mes=mes
-            ).first()
-
-            if obj is None:
-                obj = Dato.objects.create(
-                    laboratorio_id_id=lab.id,
-                    prueba_id_id=prueba.id,
-                    mes=mes,
-                    valor=valor
-                )
-                saved_count += 1
-                saved_list.append({'prueba_id': prueba.id, 'valor': obj.valor})
-            else:
-                if obj.valor != valor:
-                    obj.valor = valor
-                    obj.save(update_fields=['valor'])
-                    saved_count += 1
-                    saved_list.append({'prueba_id': prueba.id, 'valor': obj.valor})
-                else:
-                    skipped_existing_list.append({'prueba_id': prueba.id})
+    for key, val in request.POST.items():
+        if not key.startswith('valor_'):
+            continue
+        if val is None or str(val).strip() == '':
+            continue
+
+        raw = str(val).strip().replace(',', '.')
+        if not sci_re.match(raw):
+            errors[key] = 'Valor inválido'
+            continue
+
+        try:
+            prueba_id = int(key.split('_', 1)[1])
+            valor = float(raw)
+        except Exception:
+            errors[key] = 'Valor inválido'
+            continue
+
+        valores[prueba_id] = valor
+        keys_por_prueba[prueba_id] = key
+
+    # Validación, lectura de existentes y escritura en bloque (consultas constantes)
+    saved_list, skipped_existing_list, no_configuradas = guardar_datos_mes(lab, mes, valores)
+    for prueba_id in no_configuradas:
+        errors[keys_por_prueba[prueba_id]] = 'Prueba no configurada para el laboratorio'
+    saved_count = len(saved_list)
 
     # Ventana de captura (edición) abierta/cerrada según override o día de corte
     cap_window_open = puede_capturar_datos(lab)
@@ -1228,9 +1084,78 @@ def lab_data_entry(request):
         'closed': closed
     }, status=200)
 
+# --------------------------
+# Importación CSV de resultados
+#   - lab: archivo del laboratorio seleccionado para el mes vigente
+#   - staff: archivo multi-laboratorio de una ronda (?mes=YYYY-MM por defecto si no viene columna mes)
+# --------------------------
+@login_required
+@require_POST
+def lab_import_csv(request):
+    lab = request.lab
+    if not lab:
+        return JsonResponse({'success': False, 'errors': {'non_field': 'Laboratorio no seleccionado'}}, status=400)
+    if lab.estado == 1:
+        return JsonResponse(
+            {'success': False, 'errors': {'non_field': 'Modo configuración activo; no se permite registro'}},
+            status=403
+        )
+    archivo = request.FILES.get('archivo')
+    if not archivo:
+        return JsonResponse({'success': False, 'errors': {'archivo': 'Selecciona un archivo CSV'}}, status=400)
+
+    mes = date.today().replace(day=1)
+    try:
+        guardados, errores = importar_datos_csv(archivo, lab=lab, mes=mes, meses_permitidos={mes})
+    except ImportacionError as e:
+        return JsonResponse({'success': False, 'errors': {'archivo': str(e)}}, status=400)
+    return JsonResponse({'success': True, 'saved': guardados, 'row_errors': errores,
+                         'closed': not puede_capturar_datos(lab)}, status=200)
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff, login_url='lab:homepage')
+@require_POST
+def staff_import_csv(request):
+    archivo = request.FILES.get('archivo')
+    if not archivo:
+        return JsonResponse({'success': False, 'errors': {'archivo': 'Selecciona un archivo CSV'}}, status=400)
+    try:
+        mes = _parse_mes_param(request.POST.get('mes'))
+    except ValueError:
+        return JsonResponse({'success': False, 'errors': {'mes': 'Mes inválido (usa YYYY-MM)'}}, status=400)
+    try:
+        guardados, errores = importar_datos_csv(archivo, mes=mes)
+    except ImportacionError as e:
+        return JsonResponse({'success': False, 'errors': {'archivo': str(e)}}, status=400)
+    return JsonResponse({'success': True, 'saved': guardados, 'row_errors': errores}, status=200)
+
+# --------------------------
+# Asignación masiva de programas (staff)
+#   POST JSON {"programas": [ids], "laboratorios": [ids] | "todos": true, "provisionar": true}
+# --------------------------
+@login_required
+@user_passes_test(lambda u: u.is_staff, login_url='lab:homepage')
+@require_POST
+def staff_asignar_programas(request):
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+        programa_ids = [int(p) for p in payload.get('programas') or []]
+        if payload.get('todos'):
+            lab_ids = list(Laboratorio.objects.values_list('id', flat=True))
+        else:
+            lab_ids = [int(l) for l in payload.get('laboratorios') or []]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'errors': {'non_field': 'Payload JSON inválido'}}, status=400)
+    try:
+        conteos = asignar_programas(programa_ids, lab_ids, provisionar=payload.get('provisionar', True) is not False)
+    except AsignacionError as e:
+        return JsonResponse({'success': False, 'errors': {'non_field': str(e)}}, status=400)
+    return JsonResponse({'success': True, **conteos}, status=200)
+
 # ------- Vistas PDF al final del archivo --------
 
-class ReportUploadView(View):
+class ReportUploadView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         lab_id = request.POST.get('laboratorio_id')
         mes_str = request.POST.get('mes')
@@ -1238,8 +1163,10 @@ class ReportUploadView(View):
         archivo = request.FILES.get('archivo')
         if not lab_id or not mes_str or not archivo:
             return JsonResponse({'success': False, 'errors': {'non_field': ['Faltan campos requeridos']}}, status=400)
-        if archivo.content_type != 'application/pdf':
+        # El content_type lo declara el cliente; se validan los bytes iniciales
+        if archivo.read(len(PDF_MAGIC)) != PDF_MAGIC:
             return JsonResponse({'success': False, 'errors': {'archivo': ['Solo PDF es permitido']}}, status=400)
+        archivo.seek(0)
         if len(mes_str) == 7:
             mes_str = f'{mes_str}-01'
         from datetime import date
@@ -1249,12 +1176,100 @@ class ReportUploadView(View):
         except Exception:
             return JsonResponse({'success': False, 'errors': {'mes': ['Formato inválido']}}, status=400)
         lab = get_object_or_404(Laboratorio, pk=lab_id)
+        if not es_miembro(request, lab):
+            return JsonResponse({'success': False, 'errors': {'non_field': ['Sin acceso al laboratorio']}}, status=403)
         from django.db import transaction
         with transaction.atomic():
             rep = Reporte.objects.create(laboratorio=lab, mes=mes, nombre=nombre, archivo=archivo)
         return JsonResponse({'success': True, 'data': {'id': rep.id, 'nombre': rep.nombre}})
 
-class ReportListView(View):
+
+# --------------------------
+# Subida por partes (reanudable) de reportes PDF
+#   POST lab/report-upload/start/            -> {id, tamano_parte, total_partes, partes_recibidas}
+#   PUT  lab/report-upload/<id>/<n>/         -> cuerpo crudo de la parte n (0..total-1)
+#   GET  lab/report-upload/<id>/             -> estado para reanudar desde partes_recibidas
+#   POST lab/report-upload/<id>/finalize/    -> crea/actualiza el Reporte
+# --------------------------
+def _subida_json(subida):
+    return {
+        'id': str(subida.id),
+        'tamano': subida.tamano,
+        'tamano_parte': subida.tamano_parte,
+        'total_partes': subida.total_partes,
+        'partes_recibidas': subida.partes_recibidas,
+        'estado': subida.estado,
+    }
+
+
+def _subida_del_usuario(request, subida_id):
+    subida = get_object_or_404(SubidaReporte.objects.select_related('laboratorio'), pk=subida_id)
+    if not es_miembro(request, subida.laboratorio):
+        return None
+    return subida
+
+
+@login_required
+@require_POST
+def reporte_subida_iniciar(request):
+    try:
+        mes = _parse_mes_param(request.POST.get('mes'))
+        tamano = int(request.POST.get('tamano') or 0)
+        lab_id = int(request.POST.get('laboratorio_id') or 0)
+    except ValueError:
+        return JsonResponse({'success': False, 'errors': {'non_field': ['Parámetros inválidos']}}, status=400)
+    tipo = request.POST.get('tipo') or 'mensual'
+    if not mes or tipo not in dict(Reporte.TIPO_CHOICES):
+        return JsonResponse({'success': False, 'errors': {'non_field': ['Faltan campos requeridos']}}, status=400)
+    lab = get_object_or_404(Laboratorio, pk=lab_id)
+    if not es_miembro(request, lab):
+        return JsonResponse({'success': False, 'errors': {'non_field': ['Sin acceso al laboratorio']}}, status=403)
+    try:
+        subida = iniciar_subida(lab, mes, tipo, request.POST.get('nombre') or 'Reporte',
+                                request.POST.get('nombre_archivo'), tamano, usuario=request.user)
+    except SubidaError as e:
+        return JsonResponse({'success': False, 'errors': {e.campo: [str(e)]}}, status=e.status)
+    return JsonResponse({'success': True, 'data': _subida_json(subida)}, status=201)
+
+
+@login_required
+def reporte_subida_estado(request, subida_id):
+    subida = _subida_del_usuario(request, subida_id)
+    if subida is None:
+        return HttpResponseForbidden('Sin acceso a la subida')
+    return JsonResponse({'success': True, 'data': _subida_json(subida)})
+
+
+@login_required
+def reporte_subida_parte(request, subida_id, n):
+    if request.method != 'PUT':
+        return HttpResponse(status=405, headers={'Allow': 'PUT'})
+    subida = _subida_del_usuario(request, subida_id)
+    if subida is None:
+        return HttpResponseForbidden('Sin acceso a la subida')
+    try:
+        longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+        recibir_parte(subida, n, request, longitud)
+    except SubidaError as e:
+        return JsonResponse({'success': False, 'errors': {e.campo: [str(e)]}, 'data': _subida_json(subida)},
+                            status=e.status)
+    return JsonResponse({'success': True, 'data': _subida_json(subida)})
+
+
+@login_required
+@require_POST
+def reporte_subida_finalizar(request, subida_id):
+    subida = _subida_del_usuario(request, subida_id)
+    if subida is None:
+        return HttpResponseForbidden('Sin acceso a la subida')
+    try:
+        rep = finalizar_subida(subida)
+    except SubidaError as e:
+        return JsonResponse({'success': False, 'errors': {e.campo: [str(e)]}, 'data': _subida_json(subida)},
+                            status=e.status)
+    return JsonResponse({'success': True, 'data': {'id': rep.id, 'nombre': rep.nombre}})
+
+class ReportListView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         lab_id = request.GET.get('laboratorio_id')
         mes_str = request.GET.get('mes')
@@ -1269,9 +1284,21 @@ class ReportListView(View):
         except Exception:
             return JsonResponse({'success': False, 'errors': {'mes': ['Formato inválido']}}, status=400)
         lab = get_object_or_404(Laboratorio, pk=lab_id)
-        data = [{'id': r.id, 'nombre': r.nombre, 'url': r.archivo.url} for r in lab.reportes.filter(mes=mes).order_by('-creado_en')]
+        if not es_miembro(request, lab):
+            return JsonResponse({'success': False, 'errors': {'non_field': ['Sin acceso al laboratorio']}}, status=403)
+        reportes = lab.reportes.filter(mes=mes).exclude(archivo='').exclude(archivo__isnull=True).order_by('-creado_en')
+        data = [{'id': r.id, 'nombre': r.nombre, 'url': reverse('lab:descargar_reporte', args=[r.id])} for r in reportes]
         return JsonResponse({'success': True, 'data': data})
 
+@login_required
+def descargar_reporte(request, reporte_id):
+    """PDF del reporte solo para miembros del laboratorio (o staff); ver lab/utils/descargas.py."""
+    rep = get_object_or_404(Reporte.objects.select_related('laboratorio')
+                            .only('id', 'archivo', 'laboratorio__id', 'laboratorio__membresia_version'), pk=reporte_id)
+    if not rep.archivo or not es_miembro(request, rep.laboratorio):
+        return HttpResponseForbidden('Sin acceso al reporte')
+    return respuesta_archivo(request, rep.archivo.storage, rep.archivo.name, os.path.basename(rep.archivo.name))
+
 @login_required
 @require_POST
 def bulk_save_configs(request):
@@ -1285,8 +1312,8 @@ def bulk_save_configs(request):
       ...
     ]
     """
-    lab_id = request.session.get('laboratorio_seleccionado')
-    if not lab_id:
+    lab = request.lab
+    if not lab:
         return JsonResponse({"success": False, "errors": {"non_field": "Laboratorio no seleccionado"}}, status=400)
 
     try:
@@ -1299,56 +1326,8 @@ def bulk_save_configs(request):
     except Exception:
         return JsonResponse({"success": False, "errors": {"non_field": "Payload JSON inválido"}}, status=400)
 
-    saved = []
-    errors = {}
-
-    for it in items:
-        mode = (it.get("mode") or "").strip().lower()
-        ins_id = it.get("instrumento_id")
-        met_id = it.get("metodo_analitico_id")
-        rea_id = it.get("reactivo_id")
-        uni_id = it.get("unidad_de_medida_id")
-
-        if not all([ins_id, met_id, rea_id, uni_id]):
-            key = str(it.get("config_id") or it.get("prueba_id") or "unknown")
-            errors[key] = "Faltan campos obligatorios"
-            continue
-
-        try:
-            with transaction.atomic():
-                if mode == "update":
-                    cfg = LaboratorioPruebaConfig.objects.select_for_update().get(
-                        id=it.get("config_id"), laboratorio_id=lab_id
-                    )
-                elif mode == "create":
-                    # crear o actualizar por (lab, prueba)
-                    cfg, _created = LaboratorioPruebaConfig.objects.select_for_update().get_or_create(
-                        laboratorio_id_id=lab_id,          # usar *_id para entero
-                        prueba_id_id=int(it.get("prueba_id")),
-                    )
-                else:
-                    key = str(it.get("config_id") or it.get("prueba_id") or "unknown")
-                    errors[key] = "Modo inválido"
-                    continue
-
-                # Asignación de FKs: usa *_id con enteros para evitar consultas extra
-                cfg.instrumento_id_id = int(ins_id)
-                cfg.metodo_analitico_id_id = int(met_id)
-                cfg.reactivo_id_id = int(rea_id)
-                cfg.unidad_de_medida_id_id = int(uni_id)
-                cfg.save()
-
-                saved.append({
-                    "mode": mode,
-                    "config_id": cfg.id,
-                    "prueba_id": it.get("prueba_id")
-                })
-        except LaboratorioPruebaConfig.DoesNotExist:
-            key = str(it.get("config_id"))
-            errors[key] = "Configuración no encontrada"
-        except Exception as ex:
-            key = str(it.get("config_id") or it.get("prueba_id") or "unknown")
-            errors[key] = f"Error: {ex}"
+    # Validación de catálogos y escritura en bloque (una transacción para todo el lote)
+    saved, errors = guardar_configuraciones_bulk(lab.id, items)
 
     return JsonResponse({"success": True, "saved": saved, "errors": errors}, status=200)
 
@@ -1356,19 +1335,24 @@ def bulk_save_configs(request):
 @user_passes_test(lambda u: u.is_staff)
 @require_POST
 def staff_toggle_edit_window(request):
-    lab_id = request.session.get('laboratorio_seleccionado')
-    lab = get_object_or_404(Laboratorio, pk=lab_id)
+    lab = request.lab
+    if not lab:
+        raise Http404("Laboratorio no seleccionado")
 
     # Parámetros opcionales: estado, override_edicion_activa, override_edicion_hasta (YYYY-MM-DD)
     estado = request.POST.get('estado')
     override_activa = request.POST.get('override_edicion_activa')
     override_hasta = request.POST.get('override_edicion_hasta')
 
+    # Solo se guardan los campos editados (grid_version/membresia_version se incrementan con F())
+    campos = []
     if estado in ('1','2','3'):
         lab.estado = int(estado)
+        campos.append('estado')
 
     if override_activa is not None:
         lab.override_edicion_activa = str(override_activa).lower() in ('1','true','on','yes')
+        campos.append('override_edicion_activa')
 
     if override_hasta:
         try:
@@ -1377,7 +1361,211 @@ def staff_toggle_edit_window(request):
             lab.override_edicion_hasta = date(y,m,d)
         except Exception:
             return JsonResponse({'ok': False, 'error': 'Fecha de override inválida'}, status=400)
+        campos.append('override_edicion_hasta')
 
-    lab.save()
+    lab.save(update_fields=campos)
     allow = get_allow_edit_now(lab)
     return JsonResponse({'ok': True, 'estado': lab.estado, 'allow_edit_now': bool(allow)})
+
+
+# --------------------------
+# Catálogos en JSON (con ETag por versión para que el navegador los reutilice)
+# --------------------------
+@login_required
+def catalogos_json(request):
+    versiones = versiones_catalogo()
+    etag = f'"{etag_catalogos(versiones)}"'
+    if etag in [e.strip() for e in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=304)
+    else:
+        catalogos = cargar_catalogos(versiones)
+        response = JsonResponse({
+            'versiones': versiones,
+            **{
+                tabla: [{'id': pk, 'nombre': nombre} for pk, nombre in nombres.items()]
+                for tabla, nombres in catalogos['nombres'].items()
+            },
+        })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# --------------------------
+# Feed de propuestas paginado por keyset (?cursor=&status=&mias=1&limite=)
+# --------------------------
+@login_required
+def propuestas_feed(request):
+    try:
+        limite = max(1, min(int(request.GET.get('limite') or PROPUESTAS_POR_PAGINA), 100))
+    except ValueError:
+        limite = PROPUESTAS_POR_PAGINA
+    items, next_cursor = pagina_propuestas(_propuestas_filtradas(request), request.GET.get('cursor'), limite)
+    return JsonResponse({
+        'items': [{
+            'id': p.id,
+            'tipoElemento': p.tipoElemento,
+            'valor': p.valor,
+            'descripcion': p.descripcion or '',
+            'status': p.status,
+            'status_text': p.get_status_display(),
+            'created_at': p.created_at.isoformat(),
+        } for p in items],
+        'next_cursor': next_cursor,
+    })
+
+
+# --------------------------
+# Exportación CSV de Dato (solo staff, en streaming)
+#   ?desde=YYYY-MM&hasta=YYYY-MM&programa=<id>&lab=<id>  (programa/lab repetibles)
+#   ?formato=pivote&mes=YYYY-MM  -> laboratorios × pruebas de un mes
+# --------------------------
+def _parse_mes_param(valor):
+    if not valor:
+        return None
+    yyyy, mm = map(int, valor.split('-')[:2])
+    return date(yyyy, mm, 1)
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff, login_url='lab:homepage')
+def exportar_datos_csv(request):
+    try:
+        desde = _parse_mes_param(request.GET.get('desde'))
+        hasta = _parse_mes_param(request.GET.get('hasta'))
+        mes = _parse_mes_param(request.GET.get('mes'))
+        programa_ids = [int(v) for v in request.GET.getlist('programa') if v]
+        lab_ids = [int(v) for v in request.GET.getlist('lab') if v]
+    except ValueError:
+        return HttpResponseBadRequest('Parámetros inválidos (meses YYYY-MM, ids numéricos)')
+
+    if request.GET.get('formato') == 'pivote':
+        if not mes:
+            return HttpResponseBadRequest('El formato pivote requiere ?mes=YYYY-MM')
+        filas = filas_csv_pivote(mes, programa_ids, lab_ids)
+        filename = f'datos_pivote_{mes:%Y-%m}.csv'
+    else:
+        filas = filas_csv(datos_export_qs(desde, hasta, programa_ids, lab_ids))
+        filename = 'datos_{}_{}.csv'.format(f'{desde:%Y-%m}' if desde else 'inicio',
+                                            f'{hasta:%Y-%m}' if hasta else 'hoy')
+
+    response = StreamingHttpResponse(filas, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# --------------------------
+# Series históricas por prueba (sparklines de la revisión y tendencias de staff)
+#   GET lab/series/?pruebas=1,2&desde=YYYY-MM&hasta=YYYY-MM&puntos=24[&laboratorio_id=]
+#   Sin pruebas: las configuradas en el lab. Sin rango: los últimos SERIE_MESES_DEFAULT meses.
+# --------------------------
+@login_required
+def series_datos_json(request):
+    puntos_max = getattr(settings, 'SERIE_PUNTOS_MAX', 120)
+    try:
+        hasta = _parse_mes_param(request.GET.get('hasta')) or timezone.localdate().replace(day=1)
+        desde = (_parse_mes_param(request.GET.get('desde'))
+                 or restar_meses(hasta, getattr(settings, 'SERIE_MESES_DEFAULT', 24) - 1))
+        pruebas = request.GET.get('pruebas')
+        prueba_ids = sorted({int(x) for x in pruebas.split(',') if x.strip()}) if pruebas else None
+        puntos = int(request.GET.get('puntos') or getattr(settings, 'SERIE_PUNTOS_DEFAULT', 24))
+        lab_id = int(request.GET['laboratorio_id']) if request.GET.get('laboratorio_id') else None
+    except ValueError:
+        return JsonResponse({'success': False, 'errors': {'non_field': 'Parámetros inválidos'}}, status=400)
+    if desde > hasta or not 1 <= puntos <= puntos_max:
+        return JsonResponse({'success': False, 'errors': {'non_field': 'Rango o puntos inválidos'}}, status=400)
+
+    if lab_id is None:
+        lab = request.lab
+        if not lab:
+            return JsonResponse({'success': False, 'errors': {'non_field': 'Laboratorio no seleccionado'}}, status=400)
+    else:
+        lab = get_object_or_404(Laboratorio.objects.only('id', 'grid_version', 'membresia_version'), pk=lab_id)
+        if not es_miembro(request, lab):
+            return JsonResponse({'success': False, 'errors': {'non_field': 'Sin acceso al laboratorio'}}, status=403)
+    if prueba_ids is None:
+        # Pruebas configuradas (caché del grid): con la lista explícita la consulta usa el índice cubriente
+        prueba_ids = sorted(p.id for p in snapshot_grid(lab)['pruebas'])
+
+    etag = f'"{etag_serie(lab.id, desde, hasta, prueba_ids, puntos)}"'
+    if etag in [e.strip() for e in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=304)
+    else:
+        response = JsonResponse({
+            'success': True,
+            'laboratorio_id': lab.id,
+            'desde': desde.strftime('%Y-%m'),
+            'hasta': hasta.strftime('%Y-%m'),
+            **serie_datos(lab.id, desde, hasta, prueba_ids, puntos),
+        })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# --------------------------
+# Perfilado de peticiones (staff): buffer en memoria de PerfiladoMiddleware
+# --------------------------
+@staff_member_required
+def perfilado_staff(request):
+    entradas = perfilado.entradas()
+    return render(request, 'admin/perfilado.html', {
+        **admin.site.each_context(request),
+        'title': 'Perfilado de peticiones',
+        'activo': getattr(settings, 'PERFILADO_ACTIVO', False),
+        'total': len(entradas),
+        'capacidad': perfilado.capacidad(),
+        'por_url': perfilado.resumen_por_url(entradas),
+        'lentas': sorted(entradas, key=lambda e: e['total_ms'], reverse=True)[:50],
+    })
+
+
+# --------------------------
+# Tablero de la ronda (staff): avance, ventanas y reporte de todos los laboratorios
+#   ?mes=YYYY-MM&estado=1|2|3&incompletos=1&q=texto&page=N
+# --------------------------
+@staff_member_required
+def monitoreo_staff(request):
+    hoy = timezone.localdate()
+    try:
+        mes = _parse_mes_param(request.GET.get('mes')) or hoy.replace(day=1)
+        pagina = max(1, int(request.GET.get('page') or 1))
+    except ValueError:
+        mes, pagina = hoy.replace(day=1), 1
+    estado = request.GET.get('estado') if request.GET.get('estado') in ('1', '2', '3') else None
+    incompletos = request.GET.get('incompletos') == '1'
+    buscar = (request.GET.get('q') or '').strip()
+
+    base = tablero_base(mes, hoy, estado=estado, incompletos=incompletos, buscar=buscar)
+    resumen = resumen_tablero(base, hoy)                      # también da el total para paginar
+    por_pagina = getattr(settings, 'MONITOREO_POR_PAGINA', 200)
+    paginas = max(1, -(-resumen['total'] // por_pagina))
+    pagina = min(pagina, paginas)
+    filas = list(tablero_qs(base)[(pagina - 1) * por_pagina:pagina * por_pagina])
+
+    estados = dict(Laboratorio._meta.get_field('estado').choices)
+    estados_reporte = dict(Reporte.ESTADO_CHOICES)
+    # Un solo reverse: con cientos de filas, {% url %} por fila domina el render
+    cambio_lab = reverse('admin:lab_laboratorio_changelist')
+    for f in filas:
+        f['admin_url'] = f"{cambio_lab}{f['id']}/change/"
+        f['estado_display'] = estados.get(f['estado'], f['estado'])
+        f['reporte_display'] = estados_reporte.get(f['reporte_estado'], 'Sin reporte')
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    return render(request, 'admin/monitoreo.html', {
+        **admin.site.each_context(request),
+        'title': 'Monitoreo de la ronda',
+        'mes': mes,
+        'hoy': hoy,
+        'estado': estado,
+        'incompletos': incompletos,
+        'buscar': buscar,
+        'estados': estados.items(),
+        'resumen': resumen,
+        'filas': filas,
+        'pagina': pagina,
+        'paginas': paginas,
+        'query_sin_pagina': params.urlencode(),
+    })